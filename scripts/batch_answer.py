@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""
+Batch Question Answering
+========================
+Answers a JSONL file of questions offline, e.g. to pre-populate help
+content, without going through the Streamlit app.
+
+Questions are read lazily and processed in batches: each batch is embedded
+with one encoder call, and every local index is searched once for the whole
+batch (a single FAISS search over the query matrix, fused with BM25 as in
+the app). Each question then goes through the confidence gate and RAG
+generation on a pool of --concurrency workers, so at most that many LLM
+calls are in flight while the next batch is being retrieved.
+
+Answers are appended to --output as they complete, one JSON line each, and
+flushed immediately: re-running the same command skips questions whose id
+is already answered there (failed ones are retried). Use --restart to start
+over. Throughput in queries per second is reported per batch and at the end.
+
+Bulk runs answer from the local indexes only: Wikipedia/arXiv retrieval and
+the web fallback are skipped, and questions gated "web" are written with
+status "no_evidence" for review.
+
+Usage: python scripts/batch_answer.py --input questions.jsonl --output answers.jsonl
+                                      [--mode hardcoded|classifier|all_db] [--hardcoded-intent terms]
+                                      [--batch-size 64] [--concurrency 8] [--restart]
+       (JSONL lines: {"id": "...", "query": "..."}; id defaults to the line number)
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+
+def load_checkpoint(path: Path) -> set:
+    """Ids already answered in an earlier run (errors are not counted, so they are retried)."""
+    done = set()
+    if not path.exists():
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            if record.get("status") != "error":
+                done.add(record["id"])
+    return done
+
+
+def read_questions(path: Path, done: set):
+    """Yield {"id", "query"} rows not yet answered, one line at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            row_id = str(row.get("id", line_no))
+            if row_id not in done:
+                yield {"id": row_id, "query": row["query"]}
+
+
+def batches(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def retrieve_batch(queries: list, mode: str, intent: str | None, retrievers: dict) -> list:
+    """route_query for a batch of queries: one embedding call, one search per index. Returns docs per query."""
+    from src.config.constants import LOCAL_DOMAINS
+    from src.config.settings import Settings
+    from src.core.router import hybrid_search_many
+    from src.utils.classifiers import classify_intent
+    from src.utils.embeddings import get_embeddings, normalize_query
+    from src.utils.retrievers import title_match
+
+    if mode == "hardcoded" and intent:
+        domains = [[intent]] * len(queries)
+    elif mode == "classifier":
+        domains = [classify_intent(query) for query in queries]
+    else:  # all_db, local indexes only
+        domains = [LOCAL_DOMAINS] * len(queries)
+
+    # Same order of precedence as the router: exact term-title hits skip dense search
+    results = [{} for _ in queries]
+    dense = {}  # domain -> query positions that need a dense search there
+    for i, query in enumerate(queries):
+        for domain in domains[i]:
+            if domain not in retrievers:
+                continue
+            hits = title_match(retrievers[domain], query) if Settings.HYBRID_SEARCH_ENABLED else []
+            if hits:
+                results[i][domain] = hits
+            else:
+                dense.setdefault(domain, []).append(i)
+
+    if dense:
+        needed = sorted({i for positions in dense.values() for i in positions})
+        matrix = get_embeddings().embed_array([normalize_query(queries[i]) for i in needed])
+        row_of = {i: row for row, i in enumerate(needed)}
+        for domain, positions in dense.items():
+            found = hybrid_search_many(retrievers[domain], [queries[i] for i in positions],
+                                       matrix[[row_of[i] for i in positions]])
+            for i, docs in zip(positions, found):
+                results[i][domain] = docs
+
+    routed = []
+    for i, by_domain in enumerate(results):
+        docs = [doc for domain in domains[i] for doc in by_domain.get(domain, [])]
+        routed.append(list({doc.page_content: doc for doc in docs}.values()))
+    return routed
+
+
+def answer_one(chain, row: dict, docs: list) -> dict:
+    """Gate and generate one answer; never raises, failures are recorded with status "error"."""
+    from src.config.constants import NO_CONTEXT_PHRASES
+    from src.core.gate import gate
+
+    record = {"id": row["id"], "query": row["query"], "answer": None}
+    try:
+        start = time.perf_counter()
+        decision, docs, confidence = gate(row["query"], docs)
+        timings = {"gate": time.perf_counter() - start}
+        record.update(gate=decision, confidence=confidence)
+        if decision == "web":
+            record["status"] = "no_evidence"
+        else:
+            result = chain.invoke({"input": row["query"], "chat_history": [], "docs": docs})
+            timings.update(result["timings"])
+            record["answer"] = result["answer"]
+            no_context = any(phrase in result["answer"].lower() for phrase in NO_CONTEXT_PHRASES)
+            record["status"] = "no_context" if no_context else "answered"
+            record["sources"] = sorted({doc.metadata.get("source") for doc in docs if doc.metadata.get("source")})
+        record["timings"] = timings
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    return record
+
+
+def parse_args():
+    from src.config.settings import Settings
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in bulk.")
+    parser.add_argument("--input", required=True, help="JSONL questions")
+    parser.add_argument("--output", required=True, help="JSONL answers; also the resume checkpoint")
+    parser.add_argument("--mode", choices=["hardcoded", "classifier", "all_db"], default="all_db")
+    parser.add_argument("--hardcoded-intent", default="terms")
+    parser.add_argument("--batch-size", type=int, default=64, help="Questions embedded and searched together")
+    parser.add_argument("--concurrency", type=int, default=Settings.LLM_MAX_CONCURRENCY,
+                        help="Questions gated and generated at once")
+    parser.add_argument("--restart", action="store_true", help="Ignore and overwrite an existing output file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    from src.core.rag_chain import create_rag_chain
+    from src.models.llm import get_llm
+    from src.models.slm import get_slm
+    from src.utils.retrievers import get_vector_dbs
+    from src.utils.tracing import span
+
+    output = Path(args.output)
+    if args.restart and output.exists():
+        output.unlink()
+    done = load_checkpoint(output)
+    if done:
+        print(f"Resuming: {len(done)} questions already answered in {output}")
+
+    intent = args.hardcoded_intent if args.mode == "hardcoded" else None
+    retrievers = get_vector_dbs()
+    chain = create_rag_chain(get_slm() if args.mode != "all_db" else get_llm())
+
+    statuses = Counter()
+    stage_totals = Counter()
+    start = time.perf_counter()
+    pending = set()
+
+    def write(futures, out):
+        for future in futures:
+            record = future.result()
+            out.write(json.dumps(record) + "\n")
+            statuses[record["status"]] += 1
+            stage_totals.update(record.get("timings", {}))
+        out.flush()
+
+    with open(output, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for batch in batches(read_questions(Path(args.input), done), args.batch_size):
+            retrieval_start = time.perf_counter()
+            with span("batch_retrieval", queries=len(batch)):
+                routed = retrieve_batch([row["query"] for row in batch], args.mode, intent, retrievers)
+            stage_totals["batch_retrieval"] += time.perf_counter() - retrieval_start
+
+            for row, docs in zip(batch, routed):
+                pending.add(pool.submit(answer_one, chain, row, docs))
+            # Keep the workers busy while bounding how far retrieval runs ahead of generation
+            while len(pending) > 2 * args.concurrency:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write(finished, out)
+
+            answered = sum(statuses.values())
+            print(f"  {answered} done, {len(pending)} in flight, "
+                  f"{answered / (time.perf_counter() - start):.2f} q/s")
+
+        finished, _ = wait(pending)
+        write(finished, out)
+
+    elapsed = time.perf_counter() - start
+    total = sum(statuses.values())
+    print(f"\n{total} questions in {elapsed:.1f}s: {total / elapsed if elapsed else 0.0:.2f} q/s")
+    print("Status: " + ", ".join(f"{status}={n}" for status, n in sorted(statuses.items())))
+    print("Stage time (summed over workers): " + ", ".join(
+        f"{stage}={seconds:.1f}s" for stage, seconds in sorted(stage_totals.items())))
+    print(f"Answers written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+"""
+End-to-End Query Pipeline Benchmark
+===================================
+Replays a query corpus through each routing mode (hardcoded, classifier,
+all_db) on src/core/pipeline.QueryPipeline itself, the code the app and
+the API serve, with the LLM replaced by the offline fake backend and web
+search by a local stub.
+
+Reports, per mode:
+  - p50/p95/p99 latency per stage, taken from the pipeline's own tracing
+    spans (classification, title match, embedding, routing, hedged web/RAG
+    race, gate, rerank, context packing, LLM, web search, scrape), plus
+    time to first token and end to end as seen by the caller
+  - throughput under N concurrent sessions
+Plus cold start (fresh process to first answer), warm query latency and
+peak RSS. Every answer is checked as well: a run in which any query ends
+in the error answer or a no-context/fallback reply exits with status 1,
+since its timings would not describe working answers. Results can be saved as a baseline and compared against later
+runs to catch regressions. No baseline is committed: timings depend on the
+machine, so record one on the reference host (see benchmarks/README.md).
+
+Usage: python scripts/benchmark.py [--queries benchmarks/queries.jsonl] [--modes hardcoded,classifier,all_db]
+                                   [--concurrency 8] [--save-baseline benchmarks/baseline.json]
+                                   [--compare benchmarks/baseline.json] [--tolerance 0.2]
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import resource
+import subprocess
+import tempfile
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCHMARK_DIR = Path(__file__).parent.parent / "benchmarks"
+# Span names reported as stages, then the caller-side timings
+SPAN_STAGES = ["classification", "title_match", "embedding", "routing", "hedge", "gate",
+               "rerank", "pack_context", "llm", "web_search", "scrape"]
+STAGES = SPAN_STAGES + ["first_token", "total"]
+PROBE_QUERY = "What is collateral value?"
+
+
+def configure_stubs(args) -> Path:
+    """Point the pipeline at offline stand-ins. Must run before any src import reads Settings."""
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["FAKE_LLM_TOKENS_PER_SECOND"] = str(args.llm_tokens_per_second)
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"  # replayed queries would all be cache hits
+    os.environ["HISTORY_BACKEND"] = "memory"  # benchmark sessions stay out of the shared history
+    os.environ["SERPER_API_KEY"] = "stub"
+    os.environ["FIRECRAWL_API_KEY"] = "stub"
+    if args.skip_external:
+        os.environ["EXTERNAL_RETRIEVAL_ENABLED"] = "false"
+    # Stage timings are read back from the pipeline's span log
+    trace_file = Path(tempfile.mkdtemp(prefix="benchmark-")) / "trace.jsonl"
+    os.environ["TRACE_ENABLED"] = "false" if args.cold_probe else "true"
+    os.environ["TRACE_FILE"] = str(trace_file)
+    return trace_file
+
+
+def make_stub_web_fallback(latency: float):
+    """WebFallback with search and scrape answered locally after a fixed delay."""
+    from src.utils.web_search import WebFallback
+
+    class StubWebFallback(WebFallback):
+        def search(self, query):
+            time.sleep(latency)
+            return [
+                {"title": f"Stub result {i}", "link": f"https://example.com/{i}", "snippet": f"Snippet about {query}"}
+                for i in range(5)
+            ]
+
+        def scrape(self, url):
+            time.sleep(latency)
+            return f"# Stub page {url}\n\nCurrent figures as of today."
+
+    return StubWebFallback()
+
+
+def make_pipeline(args):
+    from src.core.pipeline import QueryPipeline
+    from src.utils.retrievers import get_vector_dbs
+    return QueryPipeline(get_vector_dbs(), web_fallback=make_stub_web_fallback(args.web_latency))
+
+
+def answer_status(answer: str | None) -> str:
+    """Classify an answer: "answered", "fallback" (no-context reply or search notice) or "error"."""
+    from src.core.pipeline import ERROR_ANSWER, cacheable
+    if answer is None or answer == ERROR_ANSWER:
+        return "error"
+    return "answered" if cacheable(answer) else "fallback"
+
+
+def ask(pipeline, query: str, mode: str, intent: str | None, session_id: str, timings: dict) -> str:
+    """Stream one answer from the pipeline, timing first token and total as the caller sees them."""
+    start = time.perf_counter()
+    first_token = answer = None
+    for event in pipeline.stream(query, mode, intent, session_id):
+        if event["event"] == "token" and first_token is None:
+            first_token = time.perf_counter() - start
+        elif event["event"] == "done":
+            answer = event["answer"]
+    timings.setdefault("total", []).append(time.perf_counter() - start)
+    if first_token is not None:  # conversational and cached answers arrive whole
+        timings.setdefault("first_token", []).append(first_token)
+    return answer
+
+
+def span_timings(trace_file: Path, mode: str, since: float, expected: int, timeout: float = 10.0) -> dict:
+    """
+    Per-query stage durations from the spans of the `expected` queries started after `since`.
+    Spans of one query share its trace id; repeated spans (e.g. one LLM call per retry) are summed.
+    """
+    deadline = time.monotonic() + timeout
+    while True:  # the trace writer is a background thread
+        records = []
+        if trace_file.exists():
+            with open(trace_file, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        records = [r for r in records if r["start"] >= since]
+        traces = {r["trace_id"] for r in records if r["name"] == "query" and r.get("mode") == mode}
+        if len(traces) >= expected or time.monotonic() > deadline:
+            break
+        time.sleep(0.1)
+
+    per_query = {}
+    for record in records:
+        if record["trace_id"] in traces and record["name"] in SPAN_STAGES:
+            stages = per_query.setdefault(record["trace_id"], {})
+            stages[record["name"]] = stages.get(record["name"], 0.0) + record["duration_ms"] / 1000
+    timings = {}
+    for stages in per_query.values():
+        for name, seconds in stages.items():
+            timings.setdefault(name, []).append(seconds)
+    return timings
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(timings: dict) -> dict:
+    return {
+        name: {
+            "count": len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+        for name, values in timings.items() if values
+    }
+
+
+def run_session(pipeline, queries: list, mode: str, intent: str | None) -> tuple:
+    """One simulated user session: its own chat history, queries in order. Returns (timings, answer statuses)."""
+    session_id = f"benchmark-{uuid.uuid4().hex}"
+    timings = {}
+    statuses = Counter()
+    for query in queries:
+        status = answer_status(ask(pipeline, query, mode, intent, session_id, timings))
+        statuses[status] += 1
+        if status != "answered":
+            print(f"  [{mode}] {status} answer for: {query}")
+    return timings, statuses
+
+
+def benchmark_mode(pipeline, queries: list, mode: str, args, trace_file: Path) -> dict:
+    intent = args.hardcoded_intent if mode == "hardcoded" else None
+
+    # Sequential pass: clean per-stage latencies
+    since = time.time()
+    timings, statuses = run_session(pipeline, queries, mode, intent)
+    timings.update(span_timings(trace_file, mode, since, len(queries)))
+
+    # Concurrent pass: N sessions replaying the corpus at once
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _, session_statuses in pool.map(lambda _: run_session(pipeline, queries, mode, intent),
+                                            range(args.concurrency)):
+            statuses.update(session_statuses)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "stages": summarize(timings),
+        "throughput_qps": len(queries) * args.concurrency / elapsed,
+        "concurrency": args.concurrency,
+        "answers": dict(statuses),
+    }
+
+
+def measure_cold_start(args) -> dict:
+    """Time a fresh process from launch to its first answer."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, __file__, "--cold-probe",
+         "--llm-latency", str(args.llm_latency),
+         "--llm-tokens-per-second", str(args.llm_tokens_per_second),
+         "--web-latency", str(args.web_latency),
+         "--hardcoded-intent", args.hardcoded_intent]
+        + (["--skip-external"] if args.skip_external else []),
+        capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    probe = json.loads(result.stdout.strip().splitlines()[-1]) if result.returncode == 0 else {"answer_status": "error"}
+    return {"cold_start_s": elapsed, **probe}
+
+
+def cold_probe(args):
+    """Child process for measure_cold_start: load everything, answer one query, report."""
+    start = time.perf_counter()
+    pipeline = make_pipeline(args)
+    load_time = time.perf_counter() - start
+    done = pipeline.answer(PROBE_QUERY, "hardcoded", args.hardcoded_intent, f"benchmark-{uuid.uuid4().hex}")
+    print(json.dumps({
+        "answer_status": answer_status(done and done["answer"]),
+        "index_load_s": load_time,
+        "first_answer_s": time.perf_counter() - start,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions beyond tolerance: slower p95 stages, lower throughput, slower startup."""
+    regressions = []
+    for mode, current in results["modes"].items():
+        base = baseline.get("modes", {}).get(mode)
+        if not base:
+            continue
+        for name, stats in current["stages"].items():
+            base_p95 = base["stages"].get(name, {}).get("p95_ms")
+            if base_p95 and stats["p95_ms"] > base_p95 * (1 + tolerance):
+                regressions.append(f"{mode}/{name} p95 {stats['p95_ms']:.1f}ms > baseline {base_p95:.1f}ms")
+        if current["throughput_qps"] < base["throughput_qps"] * (1 - tolerance):
+            regressions.append(f"{mode} throughput {current['throughput_qps']:.2f} qps "
+                               f"< baseline {base['throughput_qps']:.2f} qps")
+    base_cold = baseline.get("startup", {}).get("cold_start_s")
+    if base_cold and results["startup"]["cold_start_s"] > base_cold * (1 + tolerance):
+        regressions.append(f"cold start {results['startup']['cold_start_s']:.2f}s > baseline {base_cold:.2f}s")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the query pipeline with stubbed LLM and web services.")
+    parser.add_argument("--queries", default=str(BENCHMARK_DIR / "queries.jsonl"))
+    parser.add_argument("--modes", default="hardcoded,classifier,all_db")
+    parser.add_argument("--hardcoded-intent", default="banking_loans_payments")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent sessions for the throughput pass")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Fake LLM time to first token (s)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--web-latency", type=float, default=0.2, help="Stub search/scrape delay (s)")
+    parser.add_argument("--skip-external", action="store_true",
+                        help="Drop Wikipedia/arXiv in all_db mode (for air-gapped runs)")
+    parser.add_argument("--save-baseline", help="Write results to this baseline file")
+    parser.add_argument("--compare", help="Compare against this baseline file; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--cold-probe", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    trace_file = configure_stubs(args)
+
+    if args.cold_probe:
+        cold_probe(args)
+        return
+
+    with open(args.queries, 'r', encoding='utf-8') as f:
+        queries = [json.loads(line)["query"] for line in f if line.strip()]
+
+    print("Measuring cold start...")
+    startup = measure_cold_start(args)
+
+    start = time.perf_counter()
+    pipeline = make_pipeline(args)
+    startup["index_load_in_process_s"] = time.perf_counter() - start
+
+    # Warm: everything loaded, same query as the cold probe
+    pipeline.answer(PROBE_QUERY, "hardcoded", args.hardcoded_intent, f"benchmark-{uuid.uuid4().hex}")
+    start = time.perf_counter()
+    done = pipeline.answer(PROBE_QUERY, "hardcoded", args.hardcoded_intent, f"benchmark-{uuid.uuid4().hex}")
+    startup["warm_answer_s"] = time.perf_counter() - start
+    startup["warm_answer_status"] = answer_status(done and done["answer"])
+
+    results = {"queries": len(queries), "startup": startup, "modes": {}}
+    for mode in args.modes.split(","):
+        print(f"Benchmarking mode '{mode}'...")
+        results["modes"][mode] = benchmark_mode(pipeline, queries, mode, args, trace_file)
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f"\nStartup: cold {startup['cold_start_s']:.2f}s "
+          f"(index load {startup.get('index_load_s', 0):.2f}s), warm answer {startup['warm_answer_s'] * 1000:.1f}ms")
+    for mode, result in results["modes"].items():
+        print(f"\n[{mode}] throughput {result['throughput_qps']:.2f} qps with {result['concurrency']} sessions; "
+              "answers: " + ", ".join(f"{status}={n}" for status, n in sorted(result["answers"].items())))
+        print(f"  {'stage':<16} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name in STAGES:
+            if name in result["stages"]:
+                s = result["stages"][name]
+                print(f"  {name:<16} {s['count']:>5} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f}")
+    print(f"\nPeak RSS: {results['peak_rss_mb']:.0f} MB (cold process: {startup.get('peak_rss_mb', 0):.0f} MB)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    # Timings of failed answers say nothing about the pipeline; never keep them as a baseline
+    failures = [f"{mode}: {n} {status}" for mode, result in results["modes"].items()
+                for status, n in sorted(result["answers"].items()) if status != "answered"]
+    failures += [f"{probe}: {startup[key]}" for probe, key in (("cold start", "answer_status"),
+                                                                ("warm answer", "warm_answer_status"))
+                 if startup.get(key, "answered") != "answered"]
+    if failures:
+        print("\nFAILED ANSWERS:")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
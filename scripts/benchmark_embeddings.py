@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Embedding Throughput Benchmark
+==============================
+Measures embeddings per second for the DPEmbeddings backends (torch, onnx,
+onnx-int8) across batch sizes and thread counts, against the previous
+per-vector path (encode, then noise and list-convert one vector at a time).
+
+For every non-torch backend it also reports the mean cosine similarity of
+its noise-free vectors to the torch ones, so quantization error is visible
+next to the speedup.
+
+Texts are the chunks of the shared store when it exists, otherwise the
+benchmark query corpus repeated to --texts.
+
+Usage: python scripts/benchmark_embeddings.py [--backends torch,onnx,onnx-int8] [--batch-sizes 16,32,64,128]
+                                              [--threads 0] [--texts 2000] [--output report.json]
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import sqlite3
+import time
+from pathlib import Path
+import numpy as np
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from src.config.settings import Settings
+from src.utils.embeddings import DPEmbeddings
+from src.utils.privacy import add_dp_noise
+from src.utils.vector_store import CHUNKS_FILE
+
+SHARED_INDEX_DIR = Path(__file__).parent.parent / "data" / "faiss_indexes" / "shared"
+QUERIES_FILE = Path(__file__).parent.parent / "benchmarks" / "queries.jsonl"
+
+
+def load_texts(limit: int) -> list:
+    chunks_path = SHARED_INDEX_DIR / CHUNKS_FILE
+    if chunks_path.exists():
+        conn = sqlite3.connect(str(chunks_path))
+        texts = [row[0] for row in conn.execute("SELECT text FROM texts LIMIT ?", (limit,))]
+        conn.close()
+        if texts:
+            return texts
+    with open(QUERIES_FILE, "r", encoding="utf-8") as f:
+        queries = [json.loads(line)["query"] for line in f if line.strip()]
+    return (queries * (limit // len(queries) + 1))[:limit]
+
+
+def legacy_embed(model: HuggingFaceEmbeddings, texts: list) -> list:
+    """The pre-vectorization DPEmbeddings.embed_documents."""
+    return [add_dp_noise(np.array(emb)).tolist() for emb in model.embed_documents(texts)]
+
+
+def timed(fn, texts: list, repeats: int) -> float:
+    """Best-of-N embeddings per second, after one warmup batch."""
+    fn(texts[:8])
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(texts)
+        best = min(best, time.perf_counter() - start)
+    return len(texts) / best
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> float:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return float(np.mean(np.sum(a * b, axis=1)))
+
+
+def parse_args():
+    int_list = lambda value: [int(v) for v in value.split(",")]
+    parser = argparse.ArgumentParser(description="Embeddings per second per backend, batch size and thread count.")
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--batch-sizes", type=int_list, default=[16, 32, 64, 128])
+    parser.add_argument("--threads", type=int_list, default=[Settings.EMBED_NUM_THREADS],
+                        help="Comma-separated thread counts (0 = backend default)")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="Write the report as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    texts = load_texts(args.texts)
+    print(f"Benchmarking on {len(texts)} texts with {Settings.EMBEDDING_MODEL}")
+
+    legacy = HuggingFaceEmbeddings(model_name=Settings.EMBEDDING_MODEL,
+                                   encode_kwargs={"batch_size": Settings.EMBED_BATCH_SIZE})
+    baseline = timed(lambda t: legacy_embed(legacy, t), texts, args.repeats)
+    print(f"\n{'backend':<10} {'batch':>6} {'threads':>8} {'emb/s':>10} {'speedup':>8} {'cos vs torch':>13}")
+    print(f"{'legacy':<10} {'-':>6} {'-':>8} {baseline:>10.1f} {1.0:>8.2f} {'-':>13}")
+
+    report = [{"backend": "legacy", "embeddings_per_second": baseline}]
+    reference = None
+    for backend in args.backends.split(","):
+        for threads in args.threads:
+            for batch_size in args.batch_sizes:
+                try:
+                    model = DPEmbeddings(batch_size=batch_size, num_threads=threads, backend=backend)
+                except ImportError as e:
+                    print(f"{backend:<10} skipped: {e}")
+                    break
+                rate = timed(model.embed_array, texts, args.repeats)
+
+                fidelity = None
+                raw = model.embed_raw(texts[:256])
+                if backend == "torch" and reference is None:
+                    reference = raw
+                elif backend != "torch" and reference is not None:
+                    fidelity = cosine(raw, reference)
+
+                report.append({
+                    "backend": backend, "batch_size": batch_size, "threads": threads,
+                    "embeddings_per_second": rate, "speedup": rate / baseline,
+                    "cosine_vs_torch": fidelity,
+                })
+                shown = f"{fidelity:.4f}" if fidelity is not None else "-"
+                print(f"{backend:<10} {batch_size:>6} {threads or 'auto':>8} {rate:>10.1f} "
+                      f"{rate / baseline:>8.2f} {shown:>13}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
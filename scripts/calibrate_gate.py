@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Retrieval Confidence Gate Calibration
+=====================================
+Routes a labeled query set through the retrievers and computes the gate's
+evidence confidence for each query (exactly as src/core/gate.py does),
+then sweeps thresholds and suggests GATE_LOW / GATE_HIGH:
+
+  GATE_HIGH: lowest threshold at which the queries gated "rag" are
+             answerable from the local corpus with --target-precision
+  GATE_LOW:  highest threshold that sends at most --max-miss of the
+             answerable queries straight to the web
+
+Labels say whether the local corpus can answer the query.
+
+Usage: python scripts/calibrate_gate.py [--file labeled.jsonl] [--mode all_db] [--skip-external]
+                                        [--target-precision 0.9] [--max-miss 0.05] [--output report.json]
+       (JSONL lines: {"query": "...", "answerable": true})
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import time
+
+LABELED_QUERIES = [
+    ("What is a problem loan ratio?", True),
+    ("What does double exempt mean?", True),
+    ("How does compound interest work?", True),
+    ("What is the difference between a Roth IRA and a traditional IRA?", True),
+    ("How can I improve my credit score?", True),
+    ("What is an ETF?", True),
+    ("How does the Federal Reserve control inflation?", True),
+    ("What is a blockchain?", True),
+    ("How do mortgage interest rates work?", True),
+    ("What is dollar cost averaging?", True),
+    ("What is a bond yield?", True),
+    ("How are capital gains taxed?", True),
+    ("Who won the football match last night?", False),
+    ("What is the weather in Mumbai today?", False),
+    ("Give me a recipe for banana bread", False),
+    ("What did the CEO of Nvidia say in this week's earnings call?", False),
+    ("How many moons does Jupiter have?", False),
+    ("Translate 'good morning' into Japanese", False),
+    ("What time does the Apple store close on Sunday?", False),
+    ("Who is the current prime minister of Japan?", False),
+]
+
+
+def load_queries(path: str | None) -> list:
+    if not path:
+        return LABELED_QUERIES
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["query"], bool(row["answerable"])) for row in rows]
+
+
+def sweep(scored: list) -> list:
+    """Precision/recall of "answerable" for every candidate threshold (conf >= t)."""
+    positives = sum(1 for _, label in scored if label)
+    rows = []
+    for threshold in sorted({conf for conf, _ in scored} | {0.0, 1.0}):
+        kept = [label for conf, label in scored if conf >= threshold]
+        true_positives = sum(kept)
+        rows.append({
+            "threshold": threshold,
+            "precision": true_positives / len(kept) if kept else 1.0,
+            "recall": true_positives / positives if positives else 0.0,
+            # Answerable queries a GATE_LOW at this threshold would send to the web
+            "miss_rate": sum(1 for conf, label in scored if label and conf <= threshold) / positives
+                         if positives else 0.0,
+            "web_rate": sum(1 for conf, _ in scored if conf <= threshold) / len(scored),
+        })
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pick RAG/web gate thresholds on a labeled query set.")
+    parser.add_argument("--file", help="JSONL file of labeled queries")
+    parser.add_argument("--mode", choices=["hardcoded", "classifier", "all_db"], default="all_db")
+    parser.add_argument("--hardcoded-intent", default="terms")
+    parser.add_argument("--skip-external", action="store_true", help="Leave out Wikipedia and arXiv")
+    parser.add_argument("--target-precision", type=float, default=0.9)
+    parser.add_argument("--max-miss", type=float, default=0.05)
+    parser.add_argument("--output", help="Write per-query scores and the sweep as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.skip_external:
+        os.environ["EXTERNAL_RETRIEVAL_ENABLED"] = "false"
+
+    from src.config.settings import Settings
+    from src.core.gate import evidence_confidence
+    from src.core.router import route_query
+    from src.utils.retrievers import get_vector_dbs
+
+    queries = load_queries(args.file)
+    retrievers = get_vector_dbs()
+    intent = args.hardcoded_intent if args.mode == "hardcoded" else None
+    if not Settings.RERANK_ENABLED:
+        sys.exit("The gate only scores evidence with the cross-encoder; set RERANK_ENABLED=true to calibrate it.")
+    print(f"Scoring {len(queries)} queries in {args.mode} mode (cross-encoder confidence)\n")
+
+    scored, per_query = [], []
+    for query, label in queries:
+        start = time.perf_counter()
+        docs = route_query(query, args.mode, intent, retrievers)
+        _, confidence = evidence_confidence(query, docs)
+        ms = (time.perf_counter() - start) * 1000
+        scored.append((confidence, label))
+        per_query.append({"query": query, "answerable": label, "confidence": confidence, "ms": ms})
+        print(f"  {confidence:6.3f}  {'yes' if label else 'no ':<4} {ms:7.0f} ms  {query}")
+
+    rows = sweep(scored)
+    print(f"\n{'threshold':>9} {'precision':>10} {'recall':>7} {'miss':>6} {'web':>6}")
+    for row in rows:
+        print(f"{row['threshold']:>9.3f} {row['precision']:>10.3f} {row['recall']:>7.3f} "
+              f"{row['miss_rate']:>6.3f} {row['web_rate']:>6.3f}")
+
+    precise = [r for r in rows if r["precision"] >= args.target_precision and r["recall"] > 0]
+    high = min(precise, key=lambda r: r["threshold"])["threshold"] if precise else 1.0
+    safe = [r for r in rows if r["miss_rate"] <= args.max_miss and r["threshold"] < high]
+    low = max(safe, key=lambda r: r["threshold"])["threshold"] if safe else 0.0
+    print(f"\nSuggested: GATE_LOW={low:.3f} GATE_HIGH={high:.3f} "
+          f"(current {Settings.GATE_LOW} / {Settings.GATE_HIGH})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"queries": per_query, "sweep": rows, "suggested": {"GATE_LOW": low, "GATE_HIGH": high}},
+                      f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Intent Classifier Parity Check
+==============================
+Runs a labeled query set through both intent classifier backends and reports
+top-1 accuracy, agreement between backends and latency per query, so the
+lightweight embedding backend can be compared against the NLI pipeline.
+
+Usage: python scripts/eval_classifier.py [--file queries.jsonl]
+       (JSONL lines: {"query": "...", "label": "<domain>"})
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import time
+from src.utils.classifiers import classify_scores, get_label_centroids, get_nli_classifier
+
+LABELED_QUERIES = [
+    ("Should I buy index funds or individual stocks?", "stocks_investments"),
+    ("What is a good dividend yield for a blue chip stock?", "stocks_investments"),
+    ("How do ETFs differ from mutual funds?", "stocks_investments"),
+    ("How much should I put in my 401k each year?", "stocks_investments"),
+    ("What does a high P/E ratio tell me about a company?", "stocks_investments"),
+    ("How does inflation affect the economy?", "economic_government"),
+    ("Why does the Federal Reserve raise interest rates?", "economic_government"),
+    ("What are the signs of a recession?", "economic_government"),
+    ("How is GDP calculated?", "economic_government"),
+    ("What does the SEC regulate?", "economic_government"),
+    ("How can I improve my credit score?", "banking_loans_payments"),
+    ("Should I refinance my mortgage?", "banking_loans_payments"),
+    ("How do I activate my new debit card?", "banking_loans_payments"),
+    ("What is the difference between APR and APY on a loan?", "banking_loans_payments"),
+    ("How long does a wire transfer take?", "banking_loans_payments"),
+    ("What is bitcoin halving?", "currency_crypto"),
+    ("How do I store ethereum in a hardware wallet?", "currency_crypto"),
+    ("What is staking in crypto?", "currency_crypto"),
+    ("How are forex exchange rates determined?", "currency_crypto"),
+    ("What is an NFT?", "currency_crypto"),
+]
+
+
+def load_queries(path: str | None) -> list:
+    if not path:
+        return LABELED_QUERIES
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["query"], row["label"]) for row in rows]
+
+
+def evaluate(queries: list, backend: str) -> tuple:
+    """Top-1 predictions and mean latency. Each query is new to the memo cache for this backend."""
+    predictions = []
+    start = time.perf_counter()
+    for query, _ in queries:
+        predictions.append(classify_scores(query, backend)[0][0])
+    return predictions, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare intent classifier backends.")
+    parser.add_argument("--file", help="JSONL file of labeled queries")
+    args = parser.parse_args()
+
+    queries = load_queries(args.file)
+    labels = [label for _, label in queries]
+
+    # Load both models up front so load time is not counted as query latency
+    start = time.perf_counter()
+    get_nli_classifier()
+    nli_load = time.perf_counter() - start
+    start = time.perf_counter()
+    get_label_centroids()
+    embedding_load = time.perf_counter() - start
+
+    results = {}
+    for backend in ("nli", "embedding"):
+        predictions, ms = evaluate(queries, backend)
+        accuracy = sum(p == l for p, l in zip(predictions, labels)) / len(labels)
+        results[backend] = predictions
+        print(f"{backend:<10} accuracy {accuracy:.3f}  {ms:8.1f} ms/query")
+
+    agreement = sum(a == b for a, b in zip(results["nli"], results["embedding"])) / len(labels)
+    print(f"\nBackend agreement: {agreement:.3f} on {len(labels)} queries")
+    print(f"Load time: nli {nli_load:.1f}s, embedding centroids {embedding_load:.1f}s")
+
+    for (query, label), nli, emb in zip(queries, results["nli"], results["embedding"]):
+        if nli != label or emb != label:
+            print(f"  [{label}] nli={nli} embedding={emb}: {query}")
+
+
+if __name__ == "__main__":
+    main()
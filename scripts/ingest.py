@@ -5,24 +5,122 @@ Data Ingestion Script for Financial Chatbot
 This script builds FAISS vector indexes from the dataset JSON files
 and saves them to disk for fast loading by the application.
 
-Usage: python scripts/ingest.py
+Each chunk is embedded exactly once; the combined "all" index is
+assembled from the per-domain vectors instead of re-encoding every chunk.
+
+Ingestion is incremental: chunk embeddings are cached on disk, and a
+manifest of per-file hashes decides which indexes need rewriting. Only
+new or changed chunks are embedded; use --full to ignore the manifest.
+
+With --storage shared (the default) all vectors are written to a single
+file under data/faiss_indexes/shared/, laid out so each domain is a
+contiguous ID range; the app serves domains as views over that file.
+
+--index-type selects an exact (flat) or approximate index (ivf, hnsw,
+pq, ivfpq); the type and its search settings are saved in index.json.
+Use scripts/tune_index.py to compare recall and latency against flat.
+
+A BM25 index (bm25.json, with a term-title table for the terms domain) is
+written next to every index for hybrid lexical + vector retrieval.
+
+Embeddings are encoded in batches into float32 matrices; --embedding-backend
+onnx / onnx-int8 run the encoder on ONNX Runtime (see
+scripts/benchmark_embeddings.py for throughput per backend).
+
+Usage: python scripts/ingest.py [--batch-size N] [--threads N] [--embedding-backend torch|onnx|onnx-int8]
+                                [--full] [--storage shared|faiss]
+                                [--index-type TYPE] [--nlist N] [--hnsw-m N] [--pq-m N]
+                                [--nprobe N] [--ef-search N]
 """
 import sys
 import os
+import argparse
+import time
 
 # Add project root to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import json
 from pathlib import Path
+import numpy as np
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from src.utils.embeddings import DPEmbeddings
+from langchain_core.embeddings import Embeddings
+from src.utils.bm25 import build_for_docs
+from src.utils.embeddings import EMBEDDING_BACKENDS, DPEmbeddings, embedding_model_key
+from src.utils.embedding_cache import EmbeddingCache, hash_file
+from src.utils.vector_store import (
+    INDEX_TYPES, SharedVectorStore, build_index, index_factory_string,
+    write_descriptor, write_shared_store
+)
 from src.config.settings import Settings
 
 # Where to save FAISS indexes
 FAISS_INDEX_DIR = Path(__file__).parent.parent / "data" / "faiss_indexes"
+SHARED_INDEX_DIR = FAISS_INDEX_DIR / "shared"
+MANIFEST_PATH = FAISS_INDEX_DIR / "manifest.json"
+
+# Datasets to process
+DATASETS = [
+    {
+        "name": "investments",
+        "path": Settings.DATASET_DIR / "investing" / "investing.json",
+        "type": "file",
+        "content_key": "markdown"
+    },
+    {
+        "name": "terms",
+        "path": Settings.DATASET_DIR / "terms",
+        "type": "directory",
+        "content_key": "markdown"
+    },
+    {
+        "name": "economic_government",
+        "path": Settings.DATASET_DIR / "economic_government" / "economic_government.json",
+        "type": "file",
+        "content_key": "markdown"
+    },
+    {
+        "name": "banking_loans_payments",
+        "path": Settings.DATASET_DIR / "banking_loans_payments" / "banking_loans_payments.json",
+        "type": "file",
+        "content_key": "content"
+    },
+    {
+        "name": "currency_crypto",
+        "path": Settings.DATASET_DIR / "currency_crypto" / "currency_crypto.json",
+        "type": "file",
+        "content_key": "markdown"
+    },
+]
+
+
+class LazyEmbeddings(Embeddings):
+    """Loads the embedding model only when a cache miss actually needs it."""
+
+    def __init__(self, batch_size: int, num_threads: int, backend: str):
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.backend = backend
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            print(f"  Loading embeddings model ({self.backend})...")
+            self._model = DPEmbeddings(self.batch_size, self.num_threads, self.backend)
+        return self._model
+
+    def embed_array(self, texts):
+        return self.model.embed_array(texts)
+
+    def embed_documents(self, texts):
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.model.embed_query(text)
 
 
 def load_json_documents(file_path: str, content_key: str = "markdown"):
@@ -53,24 +151,120 @@ def load_directory_json_documents(dir_path: str, content_key: str = "markdown"):
     return docs
 
 
-def build_and_save_index(name: str, docs: list, embeddings, save_dir: Path):
-    """Build a FAISS index and save it to disk."""
+def dataset_files(dataset: dict) -> list:
+    """Source files that make up a dataset."""
+    if dataset["type"] == "file":
+        return [Path(dataset["path"])]
+    return sorted(Path(dataset["path"]).glob("*.json"))
+
+
+def load_manifest() -> dict:
+    if MANIFEST_PATH.exists():
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(manifest: dict):
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def embed_chunks(docs: list, embeddings, cache: EmbeddingCache) -> list:
+    """Embed chunk texts once, reusing cached vectors for unchanged chunks."""
+    start = time.time()
+    misses_before = cache.misses
+    vectors = cache.embed([doc.page_content for doc in docs], embeddings)
+    embedded = cache.misses - misses_before
+    print(f"  {len(docs) - embedded} chunks from cache, {embedded} embedded in {time.time() - start:.2f}s")
+    return vectors
+
+
+def search_defaults(args) -> dict:
+    """Query-time settings saved in the index descriptor."""
+    if args.index_type in ("ivf", "ivfpq"):
+        return {"nprobe": args.nprobe}
+    if args.index_type == "hnsw":
+        return {"ef_search": args.ef_search}
+    return {}
+
+
+def build_and_save_index(name: str, docs: list, vectors: np.ndarray, embeddings, save_dir: Path, args,
+                         lexical_domains: list | None = None):
+    """
+    Build a FAISS index from precomputed vectors and save it to disk, with its
+    BM25 index. lexical_domains is [(domain, docs)] in index order (default: this domain).
+    """
+    lexical_domains = lexical_domains or [(name, docs)]
     print(f"  Building index '{name}' with {len(docs)} documents...")
     
     if not docs:
         print(f"  WARNING: No documents for '{name}', skipping.")
         return None
         
-    vectorstore = FAISS.from_documents(docs, embeddings)
+    factory = index_factory_string(args.index_type, len(docs), args.nlist, args.hnsw_m, args.pq_m)
+    # PQ types fall back to flat when a domain has too few vectors to train them
+    index_type = "flat" if factory == "Flat" else args.index_type
+    if index_type == "flat":
+        vectorstore = FAISS.from_embeddings(
+            text_embeddings=list(zip([doc.page_content for doc in docs], vectors)),
+            embedding=embeddings,
+            metadatas=[doc.metadata for doc in docs]
+        )
+    else:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        vectorstore = FAISS(
+            embedding_function=embeddings,
+            index=build_index(matrix, factory),
+            docstore=InMemoryDocstore({str(i): doc for i, doc in enumerate(docs)}),
+            index_to_docstore_id={i: str(i) for i in range(len(docs))}
+        )
     
     index_path = save_dir / name
     vectorstore.save_local(str(index_path))
+    build_for_docs(lexical_domains).save(index_path)
+    write_descriptor(index_path, {
+        "type": index_type,
+        "factory": factory,
+        "dim": int(vectorstore.index.d),
+        "ntotal": int(vectorstore.index.ntotal),
+        "search": {"default": search_defaults(args) if index_type != "flat" else {}},
+    })
     print(f"  Saved index to: {index_path}")
     
     return vectorstore
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build FAISS indexes from the dataset JSON files.")
+    parser.add_argument("--batch-size", type=int, default=Settings.EMBED_BATCH_SIZE,
+                        help="Number of chunks encoded per forward pass")
+    parser.add_argument("--threads", type=int, default=Settings.EMBED_NUM_THREADS,
+                        help="CPU threads used by the embedding model (0 = backend default)")
+    parser.add_argument("--embedding-backend", choices=EMBEDDING_BACKENDS, default=Settings.EMBEDDING_BACKEND,
+                        help="Encoder runtime; onnx-int8 is the quantized CPU model")
+    parser.add_argument("--full", action="store_true",
+                        help="Rebuild every index, ignoring the manifest")
+    parser.add_argument("--storage", choices=["shared", "faiss"], default=Settings.INDEX_STORAGE,
+                        help="shared: one vector file with per-domain ranges; faiss: one index per domain")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=Settings.INDEX_TYPE,
+                        help="flat (exact) or an approximate type for large corpora")
+    parser.add_argument("--nlist", type=int, default=0,
+                        help="IVF cells (0 = ~4*sqrt(N))")
+    parser.add_argument("--hnsw-m", type=int, default=32,
+                        help="HNSW graph degree")
+    parser.add_argument("--pq-m", type=int, default=16,
+                        help="PQ sub-quantizers (must divide the embedding dimension)")
+    parser.add_argument("--nprobe", type=int, default=Settings.INDEX_NPROBE,
+                        help="IVF cells visited per query")
+    parser.add_argument("--ef-search", type=int, default=Settings.INDEX_EF_SEARCH,
+                        help="HNSW candidate list size per query")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+
     print("=" * 60)
     print("Financial Chatbot - Data Ingestion")
     print("=" * 60)
@@ -79,52 +273,66 @@ def main():
     FAISS_INDEX_DIR.mkdir(parents=True, exist_ok=True)
     print(f"\nOutput directory: {FAISS_INDEX_DIR}")
     
-    # Initialize embeddings and splitter
-    print("\nInitializing embeddings model...")
-    embeddings = DPEmbeddings()
+    # Settings that force a full rebuild when they change
+    model_key = embedding_model_key(args.embedding_backend)
+    build_config = {
+        "model_key": model_key,
+        "chunk_size": Settings.CHUNK_SIZE,
+        "chunk_overlap": Settings.CHUNK_OVERLAP,
+        "storage": args.storage,
+        "index": [args.index_type, args.nlist, args.hnsw_m, args.pq_m, args.nprobe, args.ef_search],
+        "lexical": "bm25",
+    }
+    old_manifest = load_manifest()
+    full_rebuild = args.full or old_manifest.get("config") != build_config
+
+    if args.storage == "shared":
+        index_exists = lambda name: SharedVectorStore.exists(SHARED_INDEX_DIR)
+    else:
+        index_exists = lambda name: (FAISS_INDEX_DIR / name).exists()
+
+    # Hash source files and work out which domains changed
+    current_files = {}
+    changed = []
+    for dataset in DATASETS:
+        name = dataset["name"]
+        files = {
+            os.path.relpath(path, Settings.DATASET_DIR): hash_file(path)
+            for path in dataset_files(dataset)
+        }
+        current_files[name] = files
+        previous = old_manifest.get("domains", {}).get(name)
+        if full_rebuild or previous != files or not index_exists(name):
+            changed.append(name)
+            if previous is not None and not full_rebuild:
+                added = len(files.keys() - previous.keys())
+                removed = len(previous.keys() - files.keys())
+                modified = sum(1 for f in files.keys() & previous.keys() if files[f] != previous[f])
+                print(f"  {name}: {added} added, {modified} modified, {removed} removed")
+
+    if not changed and index_exists("all"):
+        print("\nAll indexes are up to date.")
+        return
+    print(f"\nIndexes to rebuild: {', '.join(changed + ['all'])}")
+
+    # Initialize embeddings, cache and splitter
+    embeddings = LazyEmbeddings(args.batch_size, args.threads, args.embedding_backend)
+    cache = EmbeddingCache(Settings.EMBEDDING_CACHE_PATH, model_key)
+    print(f"  Backend: {args.embedding_backend}, batch size: {args.batch_size}, "
+          f"threads: {args.threads or 'default'}")
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=Settings.CHUNK_SIZE,
         chunk_overlap=Settings.CHUNK_OVERLAP
     )
     
     all_docs = []
+    all_vectors = []
+    lexical_domains = []
+    shared_domains = []
     
-    # Define datasets to process
-    datasets = [
-        {
-            "name": "investments",
-            "path": Settings.DATASET_DIR / "investing" / "investing.json",
-            "type": "file",
-            "content_key": "markdown"
-        },
-        {
-            "name": "terms",
-            "path": Settings.DATASET_DIR / "terms",
-            "type": "directory",
-            "content_key": "markdown"
-        },
-        {
-            "name": "economic_government",
-            "path": Settings.DATASET_DIR / "economic_government" / "economic_government.json",
-            "type": "file",
-            "content_key": "markdown"
-        },
-        {
-            "name": "banking_loans_payments",
-            "path": Settings.DATASET_DIR / "banking_loans_payments" / "banking_loans_payments.json",
-            "type": "file",
-            "content_key": "content"
-        },
-        {
-            "name": "currency_crypto",
-            "path": Settings.DATASET_DIR / "currency_crypto" / "currency_crypto.json",
-            "type": "file",
-            "content_key": "markdown"
-        },
-    ]
-    
-    # Process each dataset
-    for dataset in datasets:
+    # Process each dataset. Unchanged domains are still loaded (from cache)
+    # because the combined index is rebuilt from every domain's vectors.
+    for dataset in DATASETS:
         print(f"\n[{dataset['name'].upper()}]")
         
         if dataset["type"] == "file":
@@ -136,14 +344,39 @@ def main():
         docs = splitter.split_documents(raw_docs)
         print(f"  Split into {len(docs)} chunks")
         
-        # Build and save index
-        build_and_save_index(dataset["name"], docs, embeddings, FAISS_INDEX_DIR)
+        # Embed once (cached), then rebuild the index only if its files changed
+        vectors = embed_chunks(docs, embeddings, cache) if docs else []
+        if args.storage == "shared":
+            if docs:
+                shared_domains.append((dataset["name"], docs, vectors))
+        elif dataset["name"] in changed:
+            build_and_save_index(dataset["name"], docs, vectors, embeddings, FAISS_INDEX_DIR, args)
         all_docs.extend(docs)
+        if docs:
+            all_vectors.append(vectors)
+            lexical_domains.append((dataset["name"], docs))
     
-    # Build combined "all" index
-    print(f"\n[ALL - COMBINED]")
-    print(f"  Total documents: {len(all_docs)}")
-    build_and_save_index("all", all_docs, embeddings, FAISS_INDEX_DIR)
+    if args.storage == "shared":
+        # One vector file; "all" is the full ID range, so nothing is stored twice
+        print(f"\n[SHARED STORE]")
+        print(f"  Total documents: {len(all_docs)}")
+        write_shared_store(
+            SHARED_INDEX_DIR, shared_domains, args.index_type,
+            args.nlist, args.hnsw_m, args.pq_m, search_defaults(args)
+        )
+        print(f"  Saved shared store to: {SHARED_INDEX_DIR}")
+    else:
+        # Build combined "all" index from the vectors computed above (no re-embedding)
+        print(f"\n[ALL - COMBINED]")
+        print(f"  Total documents: {len(all_docs)}")
+        build_and_save_index("all", all_docs, np.vstack(all_vectors) if all_vectors else [], embeddings,
+                             FAISS_INDEX_DIR, args, lexical_domains=lexical_domains)
+
+    save_manifest({"config": build_config, "domains": current_files})
+    # Every domain was embedded through the cache above, so anything else belongs to deleted chunks
+    removed = cache.prune()
+    print(f"\nEmbedding cache: {cache.hits} hits, {cache.misses} misses, {removed} stale entries removed")
+    cache.close()
     
     print("\n" + "=" * 60)
     print("Ingestion complete!")
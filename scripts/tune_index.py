@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+Index Tuning Report for Financial Chatbot
+=========================================
+Compares approximate FAISS index types (IVF, HNSW, PQ, IVF-PQ) against the
+exact flat baseline on the vectors of the shared store, per domain.
+For every query-time setting it reports recall@k and latency per query,
+so nprobe/efSearch can be chosen domain by domain.
+
+Vectors are read from the ingest embedding cache, so nothing is re-embedded.
+Query vectors are held-out chunks: a sample of each domain's vectors is
+removed before the indexes are built, so no query finds itself (which
+would inflate recall). Domains that hold PQ codes are searched by
+over-fetching and filtering to the domain's range, as the app does.
+
+Usage: python scripts/tune_index.py [--types ivf,hnsw,pq,ivfpq] [--k 5] [--queries 200]
+                                    [--target-recall 0.95] [--apply] [--output report.json]
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import sqlite3
+import time
+from pathlib import Path
+import numpy as np
+from src.config.settings import Settings
+from src.utils.embedding_cache import EmbeddingCache, hash_text
+from src.utils.embeddings import embedding_model_key
+from src.utils.vector_store import (
+    CHUNKS_FILE, build_index, index_factory_string, read_descriptor,
+    search_index, write_descriptor
+)
+
+# At most this share of a domain is held out as queries
+MAX_HELD_OUT = 0.2
+
+SHARED_INDEX_DIR = Path(__file__).parent.parent / "data" / "faiss_indexes" / "shared"
+
+
+def load_vectors() -> tuple:
+    """Rebuild the full-precision vector matrix of the shared store from the embedding cache."""
+    with open(SHARED_INDEX_DIR / "ranges.json", "r", encoding="utf-8") as f:
+        ranges = json.load(f)
+
+    conn = sqlite3.connect(str(SHARED_INDEX_DIR / CHUNKS_FILE))
+    texts = [row[0] for row in conn.execute(
+        "SELECT texts.text FROM chunks JOIN texts ON texts.id = chunks.text_id ORDER BY chunks.id"
+    )]
+    conn.close()
+
+    model_key = embedding_model_key()
+    cache = EmbeddingCache(Settings.EMBEDDING_CACHE_PATH, model_key)
+    keys = [hash_text(text, model_key) for text in texts]
+    cached = cache.get_many(list(set(keys)))
+    cache.close()
+    missing = sum(1 for key in keys if key not in cached)
+    if missing:
+        raise SystemExit(f"{missing} chunks are not in the embedding cache; run scripts/ingest.py first.")
+
+    return np.asarray([cached[key] for key in keys], dtype=np.float32), ranges
+
+
+def sweep_settings(index_type: str, args) -> list:
+    """Query-time settings to evaluate for an index type."""
+    if index_type in ("ivf", "ivfpq"):
+        return [{"nprobe": n} for n in args.nprobe]
+    if index_type == "hnsw":
+        return [{"ef_search": ef} for ef in args.ef_search]
+    return [{}]
+
+
+def hold_out(matrix: np.ndarray, ranges: dict, per_domain: int, rng) -> tuple:
+    """
+    Split off query vectors per domain. Returns (indexed matrix, its ranges, {domain: queries});
+    the "all" queries are drawn from every domain's held-out vectors.
+    """
+    held = {}
+    for name, (start, end) in ranges.items():
+        if name != "all":
+            size = min(per_domain, max(1, int((end - start) * MAX_HELD_OUT)))
+            held[name] = rng.choice(np.arange(start, end), size=size, replace=False)
+
+    keep = np.ones(len(matrix), dtype=bool)
+    for ids in held.values():
+        keep[ids] = False
+    # Indexed position of each original id: ranges shrink by the vectors held out before them
+    position = np.cumsum(keep) - 1
+    indexed_ranges = {name: (int(position[start - 1] + 1) if start else 0, int(position[end - 1] + 1))
+                      for name, (start, end) in ranges.items()}
+
+    queries = {name: matrix[ids] for name, ids in held.items()}
+    union = np.concatenate(list(held.values()))
+    queries["all"] = matrix[rng.choice(union, size=min(per_domain, len(union)), replace=False)]
+    return matrix[keep], indexed_ranges, queries
+
+
+def timed_search(index, queries: np.ndarray, k: int, id_range: tuple | None, setting: dict | None = None) -> tuple:
+    start = time.perf_counter()
+    _, ids = search_index(index, queries, k, id_range, setting)
+    return ids, (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def recall_at_k(ids: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(true_row)) for row, true_row in zip(ids, truth))
+    return hits / truth.size
+
+
+def parse_args():
+    int_list = lambda value: [int(v) for v in value.split(",")]
+    parser = argparse.ArgumentParser(description="Recall vs latency of approximate index types.")
+    parser.add_argument("--types", default="ivf,hnsw,pq,ivfpq")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200,
+                        help=f"Held-out queries per domain (at most {MAX_HELD_OUT:.0%} of its vectors)")
+    parser.add_argument("--nlist", type=int, default=0)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--nprobe", type=int_list, default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--ef-search", type=int_list, default=[16, 32, 64, 128, 256])
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--apply", action="store_true",
+                        help="Save the fastest setting meeting the target recall per domain into index.json")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    matrix, ranges = load_vectors()
+    print(f"Loaded {len(matrix)} vectors (dim {matrix.shape[1]}) across {len(ranges) - 1} domains")
+    matrix, ranges, queries = hold_out(matrix, ranges, args.queries, rng)
+    print(f"Held out {sum(len(q) for name, q in queries.items() if name != 'all')} query vectors; "
+          f"indexing the remaining {len(matrix)}")
+
+    flat = build_index(matrix, "Flat")
+    truth = {}
+    flat_ms = {}
+    for name, (start, end) in ranges.items():
+        id_range = None if name == "all" else (start, end)
+        truth[name], flat_ms[name] = timed_search(flat, queries[name], args.k, id_range)
+
+    report = []
+    print(f"\n{'domain':<24} {'type':<7} {'setting':<16} {'recall@' + str(args.k):>9} {'ms/query':>9} {'speedup':>8}")
+    for name in ranges:
+        print(f"{name:<24} {'flat':<7} {'-':<16} {1.0:>9.3f} {flat_ms[name]:>9.3f} {1.0:>8.2f}")
+
+    for index_type in args.types.split(","):
+        factory = index_factory_string(index_type, len(matrix), args.nlist, args.hnsw_m, args.pq_m)
+        if factory == "Flat" and index_type != "flat":
+            print(f"\n[{index_type}] skipped: {len(matrix)} vectors are too few to train it")
+            continue
+        start_build = time.perf_counter()
+        index = build_index(matrix, factory)
+        print(f"\n[{index_type}] {factory} built in {time.perf_counter() - start_build:.2f}s")
+
+        for name, (start, end) in ranges.items():
+            id_range = None if name == "all" else (start, end)
+            for setting in sweep_settings(index_type, args):
+                ids, ms = timed_search(index, queries[name], args.k, id_range, setting)
+                recall = recall_at_k(ids, truth[name])
+                report.append({
+                    "domain": name, "type": index_type, "factory": factory, "setting": setting,
+                    "recall": recall, "ms_per_query": ms, "flat_ms_per_query": flat_ms[name],
+                })
+                label = ",".join(f"{k}={v}" for k, v in setting.items()) or "-"
+                print(f"{name:<24} {index_type:<7} {label:<16} {recall:>9.3f} {ms:>9.3f} "
+                      f"{flat_ms[name] / ms if ms else 0:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.apply:
+        descriptor = read_descriptor(SHARED_INDEX_DIR)
+        rows = [r for r in report if r["type"] == descriptor["type"]]
+        if not rows:
+            print(f"\nThe shared store uses '{descriptor['type']}', which was not evaluated; nothing applied.")
+            return
+        for name in ranges:
+            candidates = [r for r in rows if r["domain"] == name]
+            good = [r for r in candidates if r["recall"] >= args.target_recall]
+            best = min(good, key=lambda r: r["ms_per_query"]) if good else max(candidates, key=lambda r: r["recall"])
+            descriptor.setdefault("search", {})[name] = best["setting"]
+            print(f"  {name}: {best['setting']} (recall {best['recall']:.3f})")
+        write_descriptor(SHARED_INDEX_DIR, descriptor)
+        print(f"Search settings saved to {SHARED_INDEX_DIR / 'index.json'}")
+
+
+if __name__ == "__main__":
+    main()
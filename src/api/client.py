@@ -0,0 +1,60 @@
+# src/api/client.py
+"""
+Client used by the Streamlit app. With API_URL set it streams answers from
+the query API over SSE; otherwise it runs the same pipeline in-process.
+Both yield the events documented in src/core/pipeline.py, and both read
+chat history from the shared history store.
+"""
+import json
+import requests
+from src.config.settings import Settings
+
+_session = requests.Session()
+
+
+def stream_query(query: str, mode: str, hardcoded_intent: str | None = None, session_id: str = "default",
+                 api_url: str = Settings.API_URL):
+    if not api_url:
+        from src.core.pipeline import get_pipeline
+        yield from get_pipeline().stream(query, mode, hardcoded_intent, session_id)
+        return
+
+    payload = {"query": query, "mode": mode, "hardcoded_intent": hardcoded_intent, "session_id": session_id}
+    try:
+        with _session.post(f"{api_url.rstrip('/')}/query/stream", json=payload, stream=True,
+                           timeout=Settings.API_TIMEOUT) as response:
+            if response.status_code == 503:
+                yield {"event": "error", "message": "The service is busy. Please try again shortly."}
+                return
+            response.raise_for_status()
+            finished = False
+            for line in response.iter_lines():
+                if line.startswith(b"data: "):
+                    event = json.loads(line[len(b"data: "):].decode("utf-8"))
+                    finished = event["event"] in ("done", "error")
+                    yield event
+            if not finished:
+                yield {"event": "error", "message": "The answer stream ended early. Please try again."}
+    except requests.RequestException as e:
+        yield {"event": "error", "message": f"Query API unavailable: {type(e).__name__}"}
+
+
+def history(session_id: str, limit: int = Settings.HISTORY_DISPLAY_MESSAGES, api_url: str = Settings.API_URL) -> list:
+    """A session's newest messages, [{"role", "content"}] oldest first; [] if the API is unreachable."""
+    if not api_url:
+        from src.core.pipeline import get_pipeline
+        return get_pipeline().history(session_id, limit)
+    try:
+        response = _session.get(f"{api_url.rstrip('/')}/sessions/{session_id}/messages",
+                                params={"limit": limit}, timeout=Settings.API_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException:
+        return []
+
+
+def warm_up(api_url: str = Settings.API_URL):
+    """Load the in-process pipeline (indexes, models) before the first query; no-op against the API."""
+    if not api_url:
+        from src.core.pipeline import get_pipeline
+        get_pipeline()
@@ -0,0 +1,92 @@
+# src/api/server.py
+"""
+Headless query API, independent of the Streamlit script.
+
+    POST /query          {"query", "mode", "hardcoded_intent", "session_id"} -> final answer JSON
+    POST /query/stream   same body -> Server-Sent Events, one JSON event per "data:" line
+    GET  /sessions/{session_id}/messages?limit=N   newest messages of a session
+    GET  /health
+    GET  /metrics        Prometheus text (see src/utils/tracing.py)
+
+Run: uvicorn src.api.server:app --host 0.0.0.0 --port 8000
+Retrievers, models and caches load once at startup and are shared by all
+requests; chat history is read from the shared history store by session_id,
+so several API replicas can sit behind one load balancer.
+"""
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from src.api.service import QueryService, ServiceBusy
+from src.config.constants import Mode
+from src.config.settings import Settings
+from src.utils.logger import get_logger
+from src.utils.tracing import metrics
+
+logger = get_logger()
+
+service: QueryService | None = None
+
+
+class QueryRequest(BaseModel):
+    query: str
+    mode: Mode = Mode.ALL_DB
+    hardcoded_intent: str | None = None
+    session_id: str = "default"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global service
+    service = QueryService()  # loads the indexes before the first request
+    logger.info("Query API ready")
+    yield
+    service.shutdown()
+
+
+app = FastAPI(title="Private Financial Advisor API", lifespan=lifespan)
+
+
+def _busy(e: ServiceBusy):
+    return HTTPException(status_code=503, detail=f"Server busy: {e}", headers={"Retry-After": "1"})
+
+
+@app.post("/query")
+async def query(request: QueryRequest):
+    try:
+        return await service.answer(request.query, request.mode.value, request.hardcoded_intent, request.session_id)
+    except ServiceBusy as e:
+        raise _busy(e)
+
+
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    events = service.stream(request.query, request.mode.value, request.hardcoded_intent, request.session_id)
+    try:
+        first = await anext(events)  # admission errors become a status code, not a broken stream
+    except ServiceBusy as e:
+        raise _busy(e)
+
+    async def sse():
+        yield f"data: {json.dumps(first)}\n\n"
+        async for event in events:
+            yield f"data: {json.dumps(event)}\n\n"
+
+    # Disconnects cancel sse(), which closes the stream and stops its worker
+    return StreamingResponse(sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/sessions/{session_id}/messages")
+async def session_messages(session_id: str, limit: int = Settings.HISTORY_DISPLAY_MESSAGES):
+    return await service.history(session_id, limit)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "in_flight": service.in_flight, "capacity": service.capacity}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return metrics.render()
@@ -0,0 +1,93 @@
+# src/api/service.py
+"""
+Async front of the query pipeline for the HTTP API.
+
+The pipeline is synchronous (LangChain streaming, requests, FAISS), so each
+query runs on a bounded worker pool and the event loop only relays events.
+Admission control caps the queries running plus waiting: past that the
+service answers "busy" at once instead of letting latency grow without bound.
+A stream whose client disconnects stops its pipeline at the next event.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.config.settings import Settings
+from src.core.pipeline import ERROR_ANSWER, get_pipeline
+from src.utils.logger import get_logger
+from src.utils.tracing import count
+
+logger = get_logger()
+
+_DONE = object()
+
+
+class ServiceBusy(Exception):
+    """Raised when the worker pool and its queue are full."""
+
+
+class QueryService:
+    def __init__(self, pipeline=None, workers: int = Settings.API_WORKERS, queue_size: int = Settings.API_QUEUE_SIZE):
+        self.pipeline = pipeline or get_pipeline()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self.capacity = workers + queue_size
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def _admit(self):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                count("api_rejected")
+                raise ServiceBusy(f"{self.in_flight} queries in flight")
+            self.in_flight += 1
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    async def answer(self, query: str, mode: str, hardcoded_intent: str | None = None,
+                     session_id: str = "default") -> dict:
+        """Run a query to completion; returns the final "done" event."""
+        self._admit()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.pipeline.answer, query, mode, hardcoded_intent, session_id)
+        finally:
+            self._release()
+
+    async def stream(self, query: str, mode: str, hardcoded_intent: str | None = None, session_id: str = "default"):
+        """Yield the pipeline's events as they are produced (see src/core/pipeline.py)."""
+        self._admit()
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce():
+            if stop.is_set():  # client left while the query was queued
+                return
+            events_iter = self.pipeline.stream(query, mode, hardcoded_intent, session_id)
+            try:
+                for event in events_iter:
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+                    if stop.is_set():  # client went away
+                        break
+            except Exception as e:
+                logger.error(f"Query worker failed for {query}: {e}")
+                loop.call_soon_threadsafe(events.put_nowait, {"event": "error", "message": ERROR_ANSWER})
+            finally:
+                events_iter.close()
+                loop.call_soon_threadsafe(events.put_nowait, _DONE)
+
+        future = loop.run_in_executor(self.executor, produce)
+        try:
+            while (event := await events.get()) is not _DONE:
+                yield event
+        finally:
+            stop.set()
+            # The slot stays taken until the worker has actually stopped
+            future.add_done_callback(lambda _: self._release())
+
+    async def history(self, session_id: str, limit: int) -> list:
+        return await asyncio.get_running_loop().run_in_executor(None, self.pipeline.history, session_id, limit)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -5,18 +5,12 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import streamlit as st
-import time
-from src.utils.retrievers import load_vector_dbs
-from src.core.router import route_query
-from src.core.rag_chain import create_rag_chain
-from src.core.memory import get_memory
-from src.models.slm import get_slm
-from src.models.llm import get_llm
-from src.utils.web_search import WebFallback
+import uuid
+from src.api.client import history, stream_query, warm_up
 from src.utils.visualizer import display_chart_in_response
-from src.utils.conversation import get_conversational_response
 from src.config.constants import Mode, DOMAINS
 from src.utils.logger import get_logger
+from src.utils.tracing import start_metrics_server
 
 logger = get_logger()
 
@@ -24,99 +18,53 @@ st.set_page_config(page_title="Private Financial Advisor", layout="centered")
 st.title("Private GenAI Financial Advisor")
 st.caption("End-to-end private ")
 
-if "memory" not in st.session_state:
-    st.session_state.memory = get_memory()
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+# Chat history lives in the shared history store under this id; keeping it in the
+# URL lets a reload (or a different app replica) pick up the same conversation
+if "session" not in st.query_params:
+    st.query_params["session"] = uuid.uuid4().hex
+session_id = st.query_params["session"]
 
-retrievers = load_vector_dbs()
-web_fallback = WebFallback()
+warm_up()
+start_metrics_server()
 
 mode = st.selectbox("Mode", [m.value for m in Mode])
 hardcoded_intent = st.selectbox("Hardcoded Domain", [""] + DOMAINS) if mode == "hardcoded" else None
 
-for msg in st.session_state.messages:
+messages = history(session_id)
+for msg in messages:
     with st.chat_message(msg["role"]):
         st.write(msg["content"])
 
 if prompt := st.chat_input("Ask anything about finance..."):
-    start_time = time.time()
-    logger.info(f"Received user query: {prompt} in mode {mode}")
-
-    st.session_state.messages.append({"role": "user", "content": prompt})
     with st.chat_message("user"):
         st.write(prompt)
 
     with st.chat_message("assistant"):
+        # Tokens are rendered here as they arrive; a later stream replaces an earlier one
+        answer_area = st.empty()
+        text = ""
+        answer = ""  # the streamed text so far, until "done" gives the final answer
+        error = None
         with st.spinner("Thinking..."):
-            try:
-                # Check for conversational queries first (greetings, identity, etc.)
-                conversational_answer = get_conversational_response(prompt)
-                if conversational_answer:
-                    answer = conversational_answer
-                else:
-                    # Check if query is about current/latest information - use web search directly
-                    current_event_keywords = ["latest", "recent", "current", "today", "2024", "2025", "new", "update", "now"]
-                    is_current_query = any(keyword in prompt.lower() for keyword in current_event_keywords)
-                    
-                    if is_current_query:
-                        # For current events, use web search directly for up-to-date info with sources
-                        answer = web_fallback.search_and_scrape(prompt)
-                        if not answer or "unavailable" in answer.lower():
-                            # Fall back to RAG if web search fails
-                            docs = route_query(prompt, mode, hardcoded_intent or None, retrievers)
-                            if docs:
-                                model = get_slm() if mode != "all_db" else get_llm()
-                                chain = create_rag_chain(model, retrievers["all"], st.session_state.memory)
-                                chat_history = st.session_state.memory.messages
-                                result = chain.invoke({"input": prompt, "chat_history": chat_history})
-                                answer = result["answer"]
-                    else:
-                        docs = route_query(prompt, mode, hardcoded_intent or None, retrievers)
-
-                        if not docs:
-                            # No local documents found - use web search
-                            answer = web_fallback.search_and_scrape(prompt)
-                        else:
-                            model = get_slm() if mode != "all_db" else get_llm()
-                            chain = create_rag_chain(model, retrievers["all"], st.session_state.memory)
-                            
-                            # Get chat history from memory (ChatMessageHistory has .messages directly)
-                            chat_history = st.session_state.memory.messages
-                            
-                            result = chain.invoke({"input": prompt, "chat_history": chat_history})
-                            answer = result["answer"]
-                            
-                            # Check if RAG response indicates no relevant context found
-                            no_context_phrases = [
-                                "does not contain",
-                                "no information",
-                                "not mentioned",
-                                "cannot find",
-                                "don't have information",
-                                "no relevant",
-                                "outside the scope",
-                                "not available in"
-                            ]
-                            
-                            # If RAG couldn't answer from context, try web search
-                            if any(phrase in answer.lower() for phrase in no_context_phrases):
-                                web_answer = web_fallback.search_and_scrape(prompt)
-                                if web_answer and "unavailable" not in web_answer.lower():
-                                    answer = web_answer
-                    
-                    # Update memory with the new exchange
-                    st.session_state.memory.add_user_message(prompt)
-                    st.session_state.memory.add_ai_message(answer)
-
-                logger.info(f"Generated answer for query: {prompt}")
-
-            except Exception as e:
-                answer = "An error occurred. Please try again."
-                logger.error(f"Error processing query {prompt}: {str(e)}")
-
-        st.write(answer)
-        st.session_state.messages.append({"role": "assistant", "content": answer})
+            for event in stream_query(prompt, mode, hardcoded_intent or None, session_id):
+                if event["event"] == "token":
+                    text += event["data"]
+                    answer = text
+                    answer_area.markdown(text)
+                elif event["event"] == "replace":
+                    text = ""
+                elif event["event"] == "done":
+                    answer = event["answer"]
+                elif event["event"] == "error":
+                    error = event["message"]
+                    logger.error(f"Query failed: {error}")
+
+        # Final render: settles the streamed text, or shows a non-streamed answer;
+        # on an error whatever was streamed stays visible above the message
+        if answer:
+            answer_area.write(answer)
+        if error:
+            st.error(error)
 
         # Visualization (dummy data; parse from docs/result in production)
         chart_data = {'dates': ['2025-01-01', '2025-12-13'], 'prices': [100, 150]}  # Replace with real extraction
@@ -126,13 +74,10 @@ if prompt := st.chat_input("Ask anything about finance..."):
         st.markdown("**Rate the response:**")
         col1, col2, col3 = st.columns([1, 1, 4])
         with col1:
-            if st.button("👍 Good", key=f"good_{len(st.session_state.messages)}"):
+            if st.button("👍 Good", key=f"good_{len(messages)}"):
                 st.success("Thanks for the feedback!")
                 logger.info(f"User feedback: POSITIVE for query: {prompt}")
         with col2:
-            if st.button("👎 Bad", key=f"bad_{len(st.session_state.messages)}"):
+            if st.button("👎 Bad", key=f"bad_{len(messages)}"):
                 st.warning("Thanks! We'll improve.")
                 logger.info(f"User feedback: NEGATIVE for query: {prompt}")
-
-    end_time = time.time()
-    logger.info(f"Query processed in {end_time - start_time:.2f} seconds")
\ No newline at end of file
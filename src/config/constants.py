@@ -11,8 +11,52 @@ DOMAINS = [
     "banking_loans_payments", "currency_crypto"
 ]
 
+# Label descriptions for the embedding classifier backend; each label's
+# centroid is the mean embedding of its phrases
+DOMAIN_DESCRIPTIONS = {
+    "stocks_investments": [
+        "stocks, shares and the stock market",
+        "investing in ETFs, mutual funds, index funds and bonds",
+        "portfolio diversification, dividends and capital gains",
+        "retirement accounts like 401k and Roth IRA",
+    ],
+    "economic_government": [
+        "the economy, GDP, inflation and recession",
+        "government policy, taxes and regulation",
+        "central banks, the Federal Reserve and interest rate policy",
+        "unemployment, trade and economic indicators",
+    ],
+    "banking_loans_payments": [
+        "bank accounts, deposits and savings",
+        "loans, mortgages, credit cards and credit scores",
+        "payments, transfers, ATMs and debit cards",
+        "loan interest rates, APR and refinancing",
+    ],
+    "currency_crypto": [
+        "cryptocurrency like bitcoin and ethereum",
+        "blockchain, tokens, NFTs, staking and crypto wallets",
+        "foreign exchange and currency exchange rates",
+        "fiat currencies, the dollar and forex trading",
+    ],
+}
+
 LOCAL_DOMAINS = ["investments", "terms", "economic_government", "banking_loans_payments", "currency_crypto"]
 
+# Queries about current/latest information go to web search first
+CURRENT_EVENT_KEYWORDS = ["latest", "recent", "current", "today", "2024", "2025", "new", "update", "now"]
+
+# Phrases in a RAG answer that mean the context did not cover the question
+NO_CONTEXT_PHRASES = [
+    "does not contain",
+    "no information",
+    "not mentioned",
+    "cannot find",
+    "don't have information",
+    "no relevant",
+    "outside the scope",
+    "not available in"
+]
+
 PROMPT_TEMPLATE = """
 You are a transparent, privacy-focused financial education assistant (as per project abstract).
 Use only the retrieved context and chat history to answer.
@@ -32,6 +32,97 @@ class Settings:
     DATASET_DIR = BASE_DIR / "dataset"
     EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L12-v2"
     VECTOR_DB_PATH = BASE_DIR / "faiss_index"
+    # "shared": one memory-mapped vector file with per-domain ID ranges
+    # "faiss": one LangChain FAISS index (index.faiss + index.pkl) per domain
+    INDEX_STORAGE = os.getenv("INDEX_STORAGE", "shared")
+    # flat | ivf | hnsw | pq | ivfpq (see scripts/tune_index.py)
+    INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+    INDEX_NPROBE = int(os.getenv("INDEX_NPROBE", "8"))
+    INDEX_EF_SEARCH = int(os.getenv("INDEX_EF_SEARCH", "64"))
     CHUNK_SIZE = 500
     CHUNK_OVERLAP = 50
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+    EMBEDDING_CACHE_PATH = BASE_DIR / "data" / "embedding_cache.sqlite"
+    EMBED_NUM_THREADS = int(os.getenv("EMBED_NUM_THREADS", "0"))  # 0 = let the backend decide
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # torch | onnx | onnx-int8
+    EMBEDDING_ONNX_INT8_FILE = os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_qint8_avx512.onnx")
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+    QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "86400"))  # seconds
+    # "nli": facebook/bart-large-mnli zero-shot pipeline
+    # "embedding": similarity to label centroids using the MiniLM embedding model
+    CLASSIFIER_BACKEND = os.getenv("CLASSIFIER_BACKEND", "nli")
+    CLASSIFIER_CACHE_SIZE = int(os.getenv("CLASSIFIER_CACHE_SIZE", "1024"))
+    # Semantic answer cache (see src/core/answer_cache.py)
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+    ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+    ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))  # seconds
+    ANSWER_CACHE_CURRENT_TTL = float(os.getenv("ANSWER_CACHE_CURRENT_TTL", "900"))  # web-sourced answers
+    # Retrieval fan-out (seconds): each source has its own timeout, the whole fan-out a budget
+    RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "16"))
+    LOCAL_RETRIEVAL_TIMEOUT = float(os.getenv("LOCAL_RETRIEVAL_TIMEOUT", "2.0"))
+    EXTERNAL_RETRIEVAL_TIMEOUT = float(os.getenv("EXTERNAL_RETRIEVAL_TIMEOUT", "4.0"))
+    # false: Wikipedia/arXiv are never queried (air-gapped runs, benchmarks)
+    EXTERNAL_RETRIEVAL_ENABLED = os.getenv("EXTERNAL_RETRIEVAL_ENABLED", "true").lower() == "true"
+    # Wikipedia/arXiv run on their own pool, so calls stuck past their timeout never hold local search threads
+    EXTERNAL_RETRIEVAL_WORKERS = int(os.getenv("EXTERNAL_RETRIEVAL_WORKERS", "8"))
+    EXTERNAL_MAX_IN_FLIGHT = int(os.getenv("EXTERNAL_MAX_IN_FLIGHT", "4"))  # per source; past it the source is skipped
+    RETRIEVAL_BUDGET = float(os.getenv("RETRIEVAL_BUDGET", "5.0"))
+    HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"  # BM25 + vector
+    RRF_K = int(os.getenv("RRF_K", "60"))  # reciprocal rank fusion constant
+    # Reranking and context packing (see src/core/reranker.py)
+    RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+    RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+    CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))  # shingle Jaccard
+    # Retrieval confidence gate (see src/core/gate.py; calibrate with scripts/calibrate_gate.py)
+    GATE_ENABLED = os.getenv("GATE_ENABLED", "true").lower() == "true"
+    GATE_LOW = float(os.getenv("GATE_LOW", "0.1"))    # at or below: web only
+    GATE_HIGH = float(os.getenv("GATE_HIGH", "0.5"))  # at or above: RAG only
+    # Hedged RAG/web race for time-sensitive queries (see src/core/hedge.py)
+    HEDGE_DELAY = float(os.getenv("HEDGE_DELAY", "1.0"))  # web starts first; RAG after this many seconds
+    HEDGE_WEB_DEADLINE = float(os.getenv("HEDGE_WEB_DEADLINE", "8.0"))
+    HEDGE_RAG_DEADLINE = float(os.getenv("HEDGE_RAG_DEADLINE", "6.0"))
+    HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", "16"))
+    # Chat memory (see src/core/memory.py)
+    MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1000"))  # recent turns kept verbatim
+    MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "200"))
+    # Chat history store, shared by all workers (see src/utils/history_store.py)
+    HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "sqlite")  # sqlite | memory
+    HISTORY_DB_PATH = Path(os.getenv("HISTORY_DB_PATH", str(BASE_DIR / "data" / "history.sqlite")))
+    HISTORY_BUSY_TIMEOUT = float(os.getenv("HISTORY_BUSY_TIMEOUT", "5.0"))  # seconds to wait on another writer
+    HISTORY_TAIL_MESSAGES = int(os.getenv("HISTORY_TAIL_MESSAGES", "40"))  # newest messages read per question
+    HISTORY_DISPLAY_MESSAGES = int(os.getenv("HISTORY_DISPLAY_MESSAGES", "100"))  # shown in the chat UI
+    # Query API (see src/api/server.py)
+    API_URL = os.getenv("API_URL", "")  # empty = the Streamlit app runs the pipeline in-process
+    API_WORKERS = int(os.getenv("API_WORKERS", "16"))  # pipeline runs at once
+    API_QUEUE_SIZE = int(os.getenv("API_QUEUE_SIZE", "64"))  # waiting requests before 503
+    API_TIMEOUT = float(os.getenv("API_TIMEOUT", "120"))
+    # Web fallback HTTP (endpoints are overridable, e.g. to point at a local stub server)
+    SERPER_API_URL = os.getenv("SERPER_API_URL", "https://google.serper.dev/search")
+    FIRECRAWL_API_URL = os.getenv("FIRECRAWL_API_URL", "https://api.firecrawl.dev/v1/scrape")
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+    SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "5.0"))
+    SCRAPE_TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "4.0"))  # per URL
+    SCRAPE_DEADLINE = float(os.getenv("SCRAPE_DEADLINE", "5.0"))  # all URLs together
+    SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "8"))
+    SCRAPE_CACHE_SIZE = int(os.getenv("SCRAPE_CACHE_SIZE", "256"))
+    SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", "900"))
+    # Shared model clients (see src/models/registry.py)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")  # groq | local | fake
+    LOCAL_LLM_PATH = os.getenv("LOCAL_LLM_PATH")  # GGUF files for the "local" backend
+    LOCAL_SLM_PATH = os.getenv("LOCAL_SLM_PATH") or LOCAL_LLM_PATH
+    LOCAL_LLM_CONTEXT = int(os.getenv("LOCAL_LLM_CONTEXT", "4096"))
+    LOCAL_LLM_THREADS = int(os.getenv("LOCAL_LLM_THREADS", "0"))  # 0 = llama.cpp default
+    LOCAL_LLM_MAX_TOKENS = int(os.getenv("LOCAL_LLM_MAX_TOKENS", "512"))
+    FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.3"))  # seconds to first token
+    FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # in-flight calls per provider
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+    # Tracing and metrics (see src/utils/tracing.py)
+    TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+    TRACE_FILE = Path(os.getenv("TRACE_FILE", str(LOG_DIR / "trace.jsonl")))
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 = no /metrics endpoint
     EPSILON_DP = 1.0  # Differential privacy strength (from project PDF)
\ No newline at end of file
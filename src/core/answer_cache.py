@@ -0,0 +1,77 @@
+# src/core/answer_cache.py
+"""
+Semantic answer cache in front of the RAG pipeline.
+Answers are keyed by the query embedding: a new query whose embedding is
+close enough (cosine similarity >= threshold) to a cached one, in the same
+scope, reuses that answer and skips retrieval and generation entirely.
+"""
+import itertools
+import threading
+from functools import lru_cache
+import numpy as np
+from src.config.settings import Settings
+from src.utils.cache import TTLCache
+from src.utils.tracing import count
+
+
+class SemanticAnswerCache:
+    def __init__(self, threshold: float = Settings.ANSWER_CACHE_THRESHOLD,
+                 maxsize: int = Settings.ANSWER_CACHE_SIZE,
+                 ttl: float = Settings.ANSWER_CACHE_TTL,
+                 current_ttl: float = Settings.ANSWER_CACHE_CURRENT_TTL):
+        self.threshold = threshold
+        self.current_ttl = current_ttl
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, vector, scope: str) -> tuple:
+        """Return (answer, similarity) for the closest cached query in scope, or (None, best similarity)."""
+        query = self._unit(vector)
+        candidates = [(key, entry) for key, entry in self._entries.items() if entry["scope"] == scope]
+
+        best_key, best_entry, best_sim = None, None, 0.0
+        if candidates:
+            similarities = np.stack([entry["vector"] for _, entry in candidates]) @ query
+            i = int(np.argmax(similarities))
+            best_key, best_entry = candidates[i]
+            best_sim = float(similarities[i])
+
+        with self._lock:
+            if best_entry is not None and best_sim >= self.threshold:
+                self.hits += 1
+                self._entries.touch(best_key)
+                count("cache_hits", cache="answer")
+                return best_entry["answer"], best_sim
+            self.misses += 1
+            count("cache_misses", cache="answer")
+            return None, best_sim
+
+    def store(self, vector, scope: str, answer: str, is_current: bool = False):
+        """Cache an answer. Answers to time-sensitive ("current") queries expire sooner."""
+        self._entries.set(
+            next(self._ids),
+            {"vector": self._unit(vector), "scope": scope, "answer": answer},
+            ttl=self.current_ttl if is_current else None
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@lru_cache(maxsize=1)
+def get_answer_cache() -> SemanticAnswerCache:
+    """Process-wide answer cache, shared by every Streamlit session."""
+    return SemanticAnswerCache()
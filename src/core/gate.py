@@ -0,0 +1,72 @@
+# src/core/gate.py
+"""
+Retrieval confidence gate: decides, before any tokens are generated, whether
+the retrieved evidence is good enough for RAG.
+
+Confidence is the best evidence score among the routed documents: 1.0 for an
+exact term-title hit, else the sigmoid of the top cross-encoder logit when
+reranking is enabled. Without a reranker there is no usable score (vector
+distances are dominated by the DP noise: ~4*dim/epsilon^2 squared distance
+for any pair), so the gate is skipped and any documents go to RAG, as with
+GATE_ENABLED=false.
+  confidence >= GATE_HIGH  -> "rag"   answer from the documents only
+  confidence <= GATE_LOW   -> "web"   skip generation on weak evidence
+  otherwise                -> "both"  generate from the documents while the
+                                      web search and scrape run alongside
+Use scripts/calibrate_gate.py to pick the thresholds on a labeled query set.
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+from src.config.settings import Settings
+from src.core.reranker import rerank
+from src.utils.tracing import span, submit_with_context
+
+DECISIONS = ["rag", "both", "web"]
+
+# Web prefetches for the "both" band; shared by every session in the process
+_prefetch_executor = ThreadPoolExecutor(max_workers=Settings.SCRAPE_WORKERS, thread_name_prefix="web-prefetch")
+
+
+def sigmoid(x: float) -> float:
+    return 1.0 / (1.0 + math.exp(-x)) if x >= 0 else math.exp(x) / (1.0 + math.exp(x))
+
+
+def evidence_confidence(query: str, docs: list) -> tuple:
+    """
+    Return (docs, confidence in 0..1), or (docs, None) when there is no score to gate on.
+    With reranking enabled the docs come back reranked (scores in metadata), so the
+    context packer does not score them again.
+    """
+    if not docs:
+        return docs, 0.0
+    if any(doc.metadata.get("title_match") for doc in docs):
+        return docs, 1.0
+    if Settings.RERANK_ENABLED:
+        docs = rerank(query, docs)
+        return docs, sigmoid(max(doc.metadata["rerank_score"] for doc in docs))
+    return docs, None
+
+
+def decide(confidence: float, low: float = Settings.GATE_LOW, high: float = Settings.GATE_HIGH) -> str:
+    if confidence >= high:
+        return "rag"
+    if confidence <= low:
+        return "web"
+    return "both"
+
+
+def gate(query: str, docs: list) -> tuple:
+    """Return (decision, docs, confidence) for routed docs; "rag" for any docs when the gate is off or has no score."""
+    with span("gate") as s:
+        confidence = None
+        if Settings.GATE_ENABLED:
+            docs, confidence = evidence_confidence(query, docs)
+        decision = decide(confidence) if confidence is not None else ("rag" if docs else "web")
+        s.set("decision", decision)
+        s.set("confidence", confidence)
+    return decision, docs, confidence
+
+
+def prefetch(fn, *args):
+    """Start fn(*args) in the background (e.g. WebFallback.gather) and return its future."""
+    return submit_with_context(_prefetch_executor, fn, *args)
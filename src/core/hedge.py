@@ -0,0 +1,90 @@
+# src/core/hedge.py
+"""
+Hedged execution for time-sensitive queries.
+
+Rather than running web search to completion and only then falling back to
+RAG, both evidence paths race: the preferred path starts at once, the next
+one starts after a hedge delay (or immediately if every running path has
+already failed), and the first result that passes its quality check wins.
+Each path has its own deadline; the loser is cancelled, and a web path that
+is still running stops before scraping when it sees the cancel event.
+
+Only evidence gathering is raced (search + scrape vs. retrieval + gate),
+so at most one answer is ever generated.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from src.config.settings import Settings
+from src.core.gate import gate
+from src.core.router import route_query
+from src.utils.logger import get_logger
+from src.utils.tracing import span, submit_with_context
+
+logger = get_logger()
+
+# Long-lived pool so an abandoned path never blocks the request that started it
+_executor = ThreadPoolExecutor(max_workers=Settings.HEDGE_WORKERS, thread_name_prefix="hedge")
+
+
+def local_evidence(query: str, mode: str, hardcoded_intent: str | None, retrievers: dict) -> tuple:
+    """The RAG path's evidence: (gate decision, docs, confidence)."""
+    return gate(query, route_query(query, mode, hardcoded_intent, retrievers))
+
+
+def race(paths: list, hedge_delay: float = Settings.HEDGE_DELAY, cancel: threading.Event | None = None) -> tuple:
+    """
+    Race [(name, fn, args, deadline seconds, accept(result) -> bool), ...], given in
+    order of preference. Returns (winner name, result, finished), where finished holds
+    the results of paths that completed but were not accepted; winner is None when
+    no path produced an acceptable result before its deadline.
+    """
+    start = time.monotonic()
+    waiting = list(paths)
+    running = {}  # future -> (name, deadline, accept)
+    finished = {}
+    next_start = start
+
+    with span("hedge") as s:
+        try:
+            while waiting or running:
+                now = time.monotonic()
+                # Start the next path when the hedge delay is up, or at once if nothing is in flight
+                if waiting and (now >= next_start or not running):
+                    name, fn, args, deadline, accept = waiting.pop(0)
+                    running[submit_with_context(_executor, fn, *args)] = (name, now + deadline, accept)
+                    next_start = now + hedge_delay
+                    s.set(f"{name}_start_ms", round((now - start) * 1000, 3))
+                    continue
+
+                for future in [f for f, (_, deadline, _) in running.items() if deadline <= now]:
+                    future.cancel()
+                    logger.warning(f"Hedged path '{running.pop(future)[0]}' missed its deadline")
+                if not running:
+                    continue
+
+                timeout = min(deadline for _, deadline, _ in running.values()) - now
+                if waiting:
+                    timeout = min(timeout, next_start - now)
+                done, _ = wait(running, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, _, accept = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.warning(f"Hedged path '{name}' failed: {e}")
+                        continue
+                    if accept(result):
+                        for loser in running:
+                            loser.cancel()
+                        s.set("winner", name)
+                        logger.info(f"Hedged race won by '{name}' after {time.monotonic() - start:.3f}s")
+                        return name, result, finished
+                    finished[name] = result
+                    logger.info(f"Hedged path '{name}' finished without a usable result")
+
+            s.set("winner", None)
+            return None, None, finished
+        finally:
+            if cancel is not None:
+                cancel.set()
@@ -1,10 +1,156 @@
 # src/core/memory.py
 """
-Simple chat memory using langchain_community.
+Chat memory with a bounded prompt footprint.
 Compatible with langchain 0.3+ which removed langchain.memory.
+
+Recent turns are kept verbatim within a token budget; older turns are
+folded into a running summary by the SLM on a background thread, so the
+history sent with each question stays roughly the same size however long
+the conversation runs.
+
+Messages and the summary live in the history store keyed by session id
+(src/utils/history_store.py), the one copy read by both the chain and the UI.
 """
-from langchain_community.chat_message_histories import ChatMessageHistory
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, get_buffer_string
+from src.config.settings import Settings
+from src.core.reranker import CHARS_PER_TOKEN, estimate_tokens
+from src.utils.history_store import InMemoryHistoryStore, get_history_store
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and a financial education assistant.
+Keep facts the user stated about themselves, their goals and the topics already covered. At most {words} words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+MESSAGE_TYPES = {"human": HumanMessage, "ai": AIMessage, "system": SystemMessage}
+# Messages summarized per model call when catching up
+FOLD_BATCH = 20
+# After a failed summary, wait this long (doubling per failure, up to the max) before folding again
+FOLD_RETRY_DELAY = 5.0
+FOLD_RETRY_MAX_DELAY = 300.0
+
+# Summaries run off the request thread; shared by every session in the process
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summary")
+# Sessions with a fold running in this process (other processes are kept out by set_summary)
+_folding = set()
+# Sessions whose last summary failed: key -> (failures, monotonic time of the next attempt)
+_fold_backoff = {}
+_folding_lock = threading.Lock()
+
+
+class SummarizingChatHistory(BaseChatMessageHistory):
+    """
+    A session's history in the history store: nothing is held in the object,
+    so any worker can serve any session and every reader sees the same turns.
+    """
+
+    def __init__(self, session_id: str, store=None, token_budget: int = Settings.MEMORY_TOKEN_BUDGET,
+                 summary_tokens: int = Settings.MEMORY_SUMMARY_TOKENS, summarizer=None,
+                 tail_messages: int = Settings.HISTORY_TAIL_MESSAGES):
+        self.session_id = session_id
+        self.store = store or get_history_store()
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer  # chat model; defaults to the SLM on first fold
+        self.tail_messages = tail_messages
+
+    def _window(self) -> tuple:
+        """(summary, seq it covers, recent unsummarized messages that fit the token budget)."""
+        summary, upto = self.store.get_summary(self.session_id)
+        window = self.store.tail(self.session_id, self.tail_messages, after=upto)
+        # Drop whole user/assistant turns from the front, always keeping the latest one
+        while len(window) > 2 and sum(estimate_tokens(m.content) for m in window) > self.token_budget:
+            window = window[2:]
+        return summary, upto, window
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        """The summary (as a system message) followed by the recent window."""
+        summary, _, window = self._window()
+        summary = [SystemMessage(content=f"Summary of the earlier conversation: {summary}")] if summary else []
+        return summary + [MESSAGE_TYPES[m.role](content=m.content) for m in window]
+
+    def has_messages(self) -> bool:
+        """Whether the session has any stored message (one indexed row read)."""
+        return bool(self.store.tail(self.session_id, 1))
+
+    def transcript(self, limit: int = Settings.HISTORY_DISPLAY_MESSAGES) -> list:
+        """The newest messages verbatim, summarized or not, as (seq, role, content) for display."""
+        return self.store.tail(self.session_id, limit)
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.store.append(self.session_id, message.type, message.content)
+        _, upto, window = self._window()
+        # Messages older than the window but not yet in the summary are folded in the background
+        if self.store.count(self.session_id, after=upto) > len(window):
+            key = (id(self.store), self.session_id)
+            with _folding_lock:
+                _, retry_at = _fold_backoff.get(key, (0, 0.0))
+                if key in _folding or time.monotonic() < retry_at:
+                    return
+                _folding.add(key)
+            _summary_executor.submit(self._fold, key, window[0].seq if window else float("inf"))
+
+    def _fold(self, key: tuple, before):
+        """Fold messages older than `before` into the summary until none are left."""
+        try:
+            while True:
+                summary, upto = self.store.get_summary(self.session_id)
+                pending = self.store.range(self.session_id, upto, before, FOLD_BATCH)
+                if not pending:
+                    return
+                try:
+                    summary = self._summarize(summary, pending)
+                except Exception as e:
+                    # The messages stay pending (upto is not advanced) and are retried after a backoff
+                    with _folding_lock:
+                        failures = _fold_backoff.get(key, (0, 0.0))[0] + 1
+                        delay = min(FOLD_RETRY_MAX_DELAY, FOLD_RETRY_DELAY * 2 ** (failures - 1))
+                        _fold_backoff[key] = (failures, time.monotonic() + delay)
+                    logger.warning(f"Memory summary update failed ({failures}x); retrying in {delay:.0f}s: {e}")
+                    return
+                with _folding_lock:
+                    _fold_backoff.pop(key, None)
+                if not self.store.set_summary(self.session_id, summary, pending[-1].seq, expected_upto=upto):
+                    return  # another worker folded these messages first
+        finally:
+            with _folding_lock:
+                _folding.discard(key)
+
+    def _summarize(self, summary: str, messages: list) -> str:
+        if self.summarizer is None:
+            from src.models.slm import get_slm
+            self.summarizer = get_slm()
+        prompt = SUMMARY_PROMPT.format(
+            words=self.summary_tokens * 3 // 4, summary=summary or "(none)",
+            messages=get_buffer_string([MESSAGE_TYPES[m.role](content=m.content) for m in messages])
+        )
+        text = self.summarizer.invoke(prompt).content.strip()
+        # The model is asked for a bounded summary; enforce it regardless
+        return text[:self.summary_tokens * CHARS_PER_TOKEN]
+
+    def clear(self) -> None:
+        self.store.clear(self.session_id)
+
 
-def get_memory():
-    """Returns a simple chat message history for storing conversation."""
-    return ChatMessageHistory()
\ No newline at end of file
+def get_memory(session_id: str | None = None):
+    """
+    Chat history of a session in the shared history store. Without a session id,
+    an ephemeral history (in-memory, this object only) for one-off runs and benchmarks.
+    """
+    if session_id is None:
+        return SummarizingChatHistory(uuid.uuid4().hex, InMemoryHistoryStore())
+    return SummarizingChatHistory(session_id)
@@ -0,0 +1,205 @@
+# src/core/pipeline.py
+"""
+The query pipeline, independent of any UI: conversational check, semantic
+answer cache, hedged web/RAG race for current events, routing, confidence
+gate, RAG generation and web fallback, then cache and memory updates.
+
+QueryPipeline.stream() yields events as the answer is produced:
+    {"event": "token", "source": "rag" | "web", "data": "..."}
+    {"event": "replace", "source": "web"}   later tokens replace the text so far
+    {"event": "done", "answer": "...", "source": ..., "cached": bool, "elapsed": seconds}
+Transports add {"event": "error", "message": "..."} when a query cannot finish
+(service busy, API unreachable, worker failure); no "done" follows it.
+It is synchronous and thread-safe; src/api/service.py runs it on a worker
+pool behind the HTTP API, and the Streamlit app can also run it in-process.
+Chat history is read from and written to the shared history store, so any
+worker or replica can serve any session.
+"""
+import threading
+import time
+from functools import lru_cache
+from src.config.constants import CURRENT_EVENT_KEYWORDS, NO_CONTEXT_PHRASES
+from src.config.settings import Settings
+from src.core.answer_cache import get_answer_cache
+from src.core.gate import gate, prefetch
+from src.core.hedge import local_evidence, race
+from src.core.memory import get_memory
+from src.core.rag_chain import create_rag_chain
+from src.core.router import route_query
+from src.models.llm import get_llm
+from src.models.slm import get_slm
+from src.utils.conversation import get_conversational_response
+from src.utils.embeddings import get_embeddings
+from src.utils.logger import get_logger
+from src.utils.retrievers import get_vector_dbs
+from src.utils.tracing import span
+from src.utils.web_search import WebFallback
+
+logger = get_logger()
+
+ERROR_ANSWER = "An error occurred. Please try again."
+
+# Markers of fallback notices that must not be served again from the answer cache
+UNCACHEABLE_MARKERS = ["unavailable", "search error", "search cancelled", "timed out"]
+
+
+def cacheable(answer: str) -> bool:
+    """Real answers only: not search errors, unavailability notices or "no context" replies."""
+    text = answer.lower()
+    return bool(answer) and not any(phrase in text for phrase in NO_CONTEXT_PHRASES + UNCACHEABLE_MARKERS)
+
+
+class QueryPipeline:
+    def __init__(self, retrievers: dict | None = None, web_fallback: WebFallback | None = None):
+        self.retrievers = retrievers if retrievers is not None else get_vector_dbs()
+        self.web_fallback = web_fallback or WebFallback()
+        self.answer_cache = get_answer_cache()
+
+    def history(self, session_id: str, limit: int = Settings.HISTORY_DISPLAY_MESSAGES) -> list:
+        """The session's newest messages as [{"role": "user" | "assistant", "content"}], oldest first."""
+        return [
+            {"role": "user" if m.role == "human" else "assistant", "content": m.content}
+            for m in get_memory(session_id).transcript(limit) if m.role != "system"
+        ]
+
+    def answer(self, query: str, mode: str, hardcoded_intent: str | None = None,
+               session_id: str = "default") -> dict:
+        """Run the pipeline to completion and return the final "done" event."""
+        for event in self.stream(query, mode, hardcoded_intent, session_id):
+            if event["event"] == "done":
+                return event
+
+    def stream(self, query: str, mode: str, hardcoded_intent: str | None = None, session_id: str = "default"):
+        start_time = time.time()
+        logger.info(f"Received user query: {query} in mode {mode}")
+        state = {"source": None, "cached": False}
+        memory = get_memory(session_id)
+
+        def relay(tokens, source):
+            """Forward a token stream as events, log time-to-first-token, return the full text."""
+            if state["source"] is not None:
+                yield {"event": "replace", "source": source}
+            state["source"] = source
+            parts = []
+            for token in tokens:
+                if not parts:
+                    logger.info(f"Time to first token ({source}): {time.time() - start_time:.3f}s")
+                parts.append(token)
+                yield {"event": "token", "source": source, "data": token}
+            return "".join(parts)
+
+        def rag(docs, route_time):
+            model = get_slm() if mode != "all_db" else get_llm()
+            chain = create_rag_chain(model, memory=memory)
+            # Chat history: running summary plus the recent turns that fit the memory budget;
+            # the routed docs are reused so the query is only searched once
+            answer = yield from relay(chain.stream(
+                {"input": query, "chat_history": memory.messages, "docs": docs}), "rag")
+            logger.info(f"Stage timings: routing={route_time:.3f}s " + " ".join(
+                f"{stage}={seconds:.3f}s" for stage, seconds in chain.last_timings.items()))
+            return answer
+
+        with span("query", mode=mode) as query_span:
+            try:
+                # Check for conversational queries first (greetings, identity, etc.)
+                conversational_answer = get_conversational_response(query)
+                if conversational_answer:
+                    answer = conversational_answer
+                    state["source"] = "conversation"
+                else:
+                    answer = yield from self._answer(query, mode, hardcoded_intent, state,
+                                                     query_span, relay, rag, memory)
+                # Record the exchange; the UI and later questions read it from the store
+                memory.add_user_message(query)
+                memory.add_ai_message(answer)
+                logger.info(f"Generated answer for query: {query}")
+            except Exception as e:
+                answer = ERROR_ANSWER
+                logger.error(f"Error processing query {query}: {str(e)}")
+
+        elapsed = time.time() - start_time
+        logger.info(f"Query processed in {elapsed:.2f} seconds")
+        yield {"event": "done", "answer": answer, "source": state["source"],
+               "cached": state["cached"], "elapsed": elapsed}
+
+    def _answer(self, query, mode, hardcoded_intent, state, query_span, relay, rag, memory):
+        web_fallback = self.web_fallback
+        # Check if query is about current/latest information - use web search directly
+        is_current_query = any(keyword in query.lower() for keyword in CURRENT_EVENT_KEYWORDS)
+
+        # Near-duplicate questions in the same mode/domain reuse a cached answer. Only the
+        # opening question of a session: later answers build on that session's history
+        cache_scope = f"{mode}:{hardcoded_intent or ''}"
+        use_cache = Settings.ANSWER_CACHE_ENABLED and not memory.has_messages()
+        query_vector = get_embeddings().embed_query_raw(query) if use_cache else None
+        cached_answer = None
+        if query_vector is not None:
+            cached_answer, similarity = self.answer_cache.lookup(query_vector, cache_scope)
+            logger.info(f"Answer cache {'hit' if cached_answer else 'miss'} (similarity={similarity:.3f}, "
+                        f"hit rate={self.answer_cache.hit_rate:.1%}, entries={len(self.answer_cache)})")
+
+        query_span.set("cache_hit", bool(cached_answer))
+        query_span.set("current", is_current_query)
+        if cached_answer:
+            answer = cached_answer
+            state["cached"] = True
+        elif is_current_query:
+            # For current events, race web search (preferred) against local retrieval,
+            # which starts after the hedge delay; only the winner's answer is generated
+            race_start = time.perf_counter()
+            cancel = threading.Event()
+            winner, result, finished = race([
+                ("web", web_fallback.gather, (query, cancel), Settings.HEDGE_WEB_DEADLINE,
+                 lambda gathered: "error" not in gathered),
+                ("rag", local_evidence, (query, mode, hardcoded_intent or None, self.retrievers),
+                 Settings.HEDGE_RAG_DEADLINE, lambda evidence: evidence[0] == "rag"),
+            ], cancel=cancel)
+            route_time = time.perf_counter() - race_start
+            query_span.set("hedge_winner", winner)
+
+            if winner is None and finished.get("rag", (None, []))[1]:
+                # Web failed; weak local evidence still beats no answer
+                winner, result = "rag", finished["rag"]
+            if winner == "web":
+                answer = yield from relay(web_fallback.stream_search_and_scrape(query, result), "web")
+            elif winner is None:
+                answer = finished.get("web", {}).get("error", "Web search timed out. Please try again.")
+            else:
+                # Accepted local evidence always has documents
+                answer = yield from rag(result[1], route_time)
+        else:
+            route_start = time.perf_counter()
+            docs = route_query(query, mode, hardcoded_intent or None, self.retrievers)
+            # Decide RAG vs web from the retrieval scores, before generating anything
+            decision, docs, confidence = gate(query, docs)
+            route_time = time.perf_counter() - route_start
+            logger.info(f"Retrieval gate: {decision} (confidence={confidence})")
+            query_span.set("gate", decision)
+
+            if decision == "web":
+                # No or weak local evidence - use web search
+                answer = yield from relay(web_fallback.stream_search_and_scrape(query), "web")
+            else:
+                # Uncertain evidence: search and scrape the web while RAG generates
+                web_prefetch = prefetch(web_fallback.gather, query) if decision == "both" else None
+                answer = yield from rag(docs, route_time)
+
+                # If RAG still couldn't answer from context, try web search
+                # (checked on the accumulated streamed text; prefetched when gated "both")
+                if any(phrase in answer.lower() for phrase in NO_CONTEXT_PHRASES):
+                    gathered = web_prefetch.result() if web_prefetch else None
+                    web_answer = yield from relay(web_fallback.stream_search_and_scrape(query, gathered), "web")
+                    if web_answer and "unavailable" not in web_answer.lower():
+                        answer = web_answer
+                    else:
+                        state["source"] = "rag"  # the final answer stays the RAG one
+
+        if query_vector is not None and not cached_answer and cacheable(answer):
+            self.answer_cache.store(query_vector, cache_scope, answer, is_current=is_current_query)
+        return answer
+
+
+@lru_cache(maxsize=1)
+def get_pipeline() -> QueryPipeline:
+    """Process-wide pipeline: retrievers, caches and sessions are shared by all requests."""
+    return QueryPipeline()
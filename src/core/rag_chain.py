@@ -3,50 +3,119 @@
 RAG Chain implementation using LCEL (LangChain Expression Language).
 Compatible with langchain 0.3+ which removed the chains module.
 """
+import time
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough, RunnableLambda
 from src.config.constants import PROMPT_TEMPLATE
+from src.core.reranker import select_context
 
 def format_docs(docs):
     """Format retrieved documents into a single context string."""
     return "\n\n".join(doc.page_content for doc in docs)
 
-def create_rag_chain(llm, retriever, memory):
+
+class RagChain:
     """
-    Creates a RAG chain using LCEL (LangChain Expression Language).
-    This is the modern langchain 0.3+ approach without using langchain.chains.
+    Answers a question from a set of context documents.
+
+    Documents come from one of three places, in order of preference:
+    the "docs" key of the inputs (already retrieved by route_query),
+    a context_provider callable, or a retriever. Passing pre-retrieved
+    docs means a query is embedded and searched exactly once.
+    Documents are reranked and packed into the context token budget
+    (src/core/reranker.py) before they reach the prompt.
     """
-    # Create the QA prompt
-    qa_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a transparent, privacy-focused financial education assistant.
+
+    def __init__(self, llm, retriever=None, memory=None, context_provider=None):
+        self.memory = memory
+        self.last_timings = {}
+        self.context_provider = context_provider
+        if context_provider is None and retriever is not None:
+            self.context_provider = lambda inputs: retriever.invoke(inputs["input"])
+
+        # Create the QA prompt
+        qa_prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are a transparent, privacy-focused financial education assistant.
 Use only the retrieved context and chat history to answer.
 Never give direct investment advice. Always add: "This is not financial advice. Consult a professional."
 
 Context: {context}"""),
-        MessagesPlaceholder(variable_name="chat_history"),
-        ("human", "{input}"),
-    ])
-    
-    # Build the chain using LCEL
-    # 1. Get context from retriever
-    # 2. Format it
-    # 3. Pass to prompt with chat history
-    # 4. Send to LLM
-    # 5. Parse output
-    
-    chain = (
-        RunnablePassthrough.assign(
-            context=lambda x: format_docs(retriever.invoke(x["input"]))
-        )
-        | qa_prompt
-        | llm
-        | StrOutputParser()
-    )
-    
-    # Wrap to return dict with "answer" key for compatibility
-    def invoke_and_wrap(inputs):
-        result = chain.invoke(inputs)
-        return {"answer": result}
-    
-    return RunnableLambda(invoke_and_wrap)
\ No newline at end of file
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", "{input}"),
+        ])
+
+        # Prompt -> LLM -> string; context is resolved before this runs
+        self.generation_chain = qa_prompt | llm | StrOutputParser()
+
+    def get_context_docs(self, inputs):
+        """Return the documents to answer from, without searching twice."""
+        if inputs.get("docs") is not None:
+            return inputs["docs"]
+        if self.context_provider is None:
+            return []
+        return self.context_provider(inputs)
+
+    def _prompt_inputs(self, inputs, timings):
+        """Resolve, rerank and format the context, recording the timing of each stage."""
+        start = time.perf_counter()
+        docs = self.get_context_docs(inputs)
+        timings["retrieval"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        docs = select_context(inputs["input"], docs)
+        timings["rerank"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        context = format_docs(docs)
+        timings["format"] = time.perf_counter() - start
+
+        return {
+            "context": context,
+            "chat_history": inputs.get("chat_history", []),
+            "input": inputs["input"],
+        }
+
+    def invoke(self, inputs):
+        """
+        Run the chain. Returns {"answer": str, "timings": {stage: seconds}}.
+        Timings are reported for the retrieval, rerank, formatting and generation stages.
+        """
+        timings = {}
+        prompt_inputs = self._prompt_inputs(inputs, timings)
+
+        start = time.perf_counter()
+        answer = self.generation_chain.invoke(prompt_inputs)
+        timings["generation"] = time.perf_counter() - start
+
+        self.last_timings = timings
+        return {"answer": answer, "timings": timings}
+
+    def stream(self, inputs):
+        """
+        Yield answer tokens as the LLM produces them (through StrOutputParser).
+        Once the stream is exhausted, self.last_timings holds the stage timings,
+        including "first_token": time from generation start to the first token.
+        """
+        timings = {}
+        prompt_inputs = self._prompt_inputs(inputs, timings)
+
+        start = time.perf_counter()
+        for token in self.generation_chain.stream(prompt_inputs):
+            if "first_token" not in timings:
+                timings["first_token"] = time.perf_counter() - start
+            yield token
+        timings["generation"] = time.perf_counter() - start
+
+        self.last_timings = timings
+
+
+def create_rag_chain(llm, retriever=None, memory=None, context_provider=None):
+    """
+    Creates a RAG chain using LCEL (LangChain Expression Language).
+    This is the modern langchain 0.3+ approach without using langchain.chains.
+
+    Invoke with {"input", "chat_history", "docs"} to reuse documents already
+    returned by route_query; the retriever is only consulted when "docs" is missing.
+    Call .stream() with the same inputs to receive tokens as they are generated.
+    """
+    return RagChain(llm, retriever, memory, context_provider)
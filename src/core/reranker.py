@@ -0,0 +1,140 @@
+# src/core/reranker.py
+"""
+Reranking and context packing between route_query and the prompt.
+
+Retrieved chunks are scored against the query by a small CPU cross-encoder
+in one batched call, then packed best-first into a token budget: chunks
+that nearly duplicate one already packed are dropped, text shared with an
+adjacent chunk of the same page (the splitter's overlap) is trimmed, and the
+last chunk that fits only partly is cut at a word boundary.
+"""
+import re
+import threading
+from langchain_core.documents import Document
+from src.config.settings import Settings
+from src.utils.tracing import span
+
+# Rough size of a token in characters, for budgeting without a tokenizer call
+CHARS_PER_TOKEN = 4
+# Shortest shared prefix/suffix treated as splitter overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+# Do not start a truncated chunk with less room than this
+MIN_PARTIAL_TOKENS = 50
+
+_WORD = re.compile(r"\w+")
+
+_cross_encoder = None
+_cross_encoder_lock = threading.Lock()
+
+
+def get_cross_encoder():
+    """Load the cross-encoder on first use instead of at import time."""
+    global _cross_encoder
+    if _cross_encoder is None:
+        with _cross_encoder_lock:
+            if _cross_encoder is None:
+                import torch
+                from sentence_transformers import CrossEncoder
+                model = CrossEncoder(Settings.RERANKER_MODEL, max_length=512, device="cpu")
+                # Raw logits whatever activation the model config names; the gate applies its own sigmoid
+                if hasattr(model, "activation_fn"):
+                    model.activation_fn = torch.nn.Identity()
+                else:
+                    model.default_activation_function = torch.nn.Identity()
+                _cross_encoder = model
+    return _cross_encoder
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def rerank(query: str, docs: list) -> list:
+    """Docs sorted by cross-encoder relevance; the logit is kept in metadata["rerank_score"]."""
+    if all("rerank_score" in doc.metadata for doc in docs):  # already scored by the confidence gate
+        return sorted(docs, key=lambda doc: doc.metadata["rerank_score"], reverse=True)
+    scores = get_cross_encoder().predict(
+        [(query, doc.page_content) for doc in docs],
+        batch_size=Settings.RERANK_BATCH_SIZE, show_progress_bar=False
+    )
+    ranked = sorted(zip(docs, scores), key=lambda pair: pair[1], reverse=True)
+    # Copies, so documents shared with an index docstore are not modified
+    return [
+        Document(page_content=doc.page_content, metadata={**doc.metadata, "rerank_score": float(score)})
+        for doc, score in ranked
+    ]
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD.findall(text.lower())
+    return {tuple(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _trim_overlap(text: str, source: str | None, packed: list) -> str:
+    """
+    Remove a prefix (or suffix) of text that repeats the end (or start) of a packed
+    chunk of the same source, i.e. the splitter's overlap with an adjacent chunk.
+    packed is [(source, original text)]; text without a source is left as is.
+    """
+    if source is None:
+        return text.strip()
+    longest = min(len(text) // 2, 2 * Settings.CHUNK_OVERLAP)
+    for other_source, other in packed:
+        if other_source != source:
+            continue
+        for size in range(min(longest, len(other)), MIN_OVERLAP_CHARS - 1, -1):
+            if text.startswith(other[-size:]):
+                text = text[size:]
+                break
+            if text.endswith(other[:size]):
+                text = text[:-size]
+                break
+    return text.strip()
+
+
+def _truncate(text: str, tokens: int) -> str:
+    cut = text[:tokens * CHARS_PER_TOKEN]
+    return cut[:cut.rfind(" ")] + " ..." if " " in cut else cut
+
+
+def pack_context(docs: list, budget: int = Settings.CONTEXT_TOKEN_BUDGET,
+                 dedup_threshold: float = Settings.CONTEXT_DEDUP_THRESHOLD) -> list:
+    """Best-first selection of docs that fits the token budget, without near-duplicates."""
+    packed, packed_shingles, packed_sources = [], [], []
+    remaining = budget
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(_jaccard(shingles, other) >= dedup_threshold for other in packed_shingles):
+            continue
+        source = doc.metadata.get("source")
+        text = _trim_overlap(doc.page_content, source, packed_sources)
+        if not text:
+            continue
+        tokens = estimate_tokens(text)
+        if tokens > remaining:
+            if remaining < MIN_PARTIAL_TOKENS:
+                break
+            text, tokens = _truncate(text, remaining), remaining
+        packed.append(Document(page_content=text, metadata=doc.metadata))
+        packed_shingles.append(shingles)
+        packed_sources.append((source, doc.page_content))
+        remaining -= tokens
+        if remaining <= 0:
+            break
+    return packed
+
+
+def select_context(query: str, docs: list) -> list:
+    """Rerank (if enabled) and pack retrieved docs into the context budget."""
+    if Settings.RERANK_ENABLED:
+        with span("rerank", docs=len(docs)):
+            docs = rerank(query, docs)
+    with span("pack_context") as s:
+        packed = pack_context(docs)
+        s.set("docs", len(packed))
+        s.set("tokens", sum(estimate_tokens(doc.page_content) for doc in packed))
+    return packed
@@ -1,23 +1,184 @@
 # src/core/router.py
+"""
+Query routing: picks the domains for a query and retrieves from them.
+All sources are searched concurrently. The query is embedded once and the
+vector shared by every local index; each source has its own timeout and
+the fan-out as a whole has a budget, so a slow source is dropped instead
+of delaying the answer. External APIs run on a separate pool with a cap on
+calls in flight per source: calls that outlive their timeout keep running,
+and must not take the threads local searches need.
+
+Local domains are searched hybrid: the dense results and the BM25 results
+of the same index are merged with reciprocal rank fusion. A query that is
+exactly a term title ("what is double exempt?") is answered from the
+title table of the lexical index, without embedding or dense search.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from langchain_core.documents import Document
 from src.config.constants import LOCAL_DOMAINS
+from src.config.settings import Settings
 from src.utils.classifiers import classify_intent
+from src.utils.embeddings import get_embeddings
+from src.utils.retrievers import lexical_search, search_by_vector, search_by_vectors, title_match
+from src.utils.logger import get_logger
+from src.utils.tracing import count, span, submit_with_context
+
+logger = get_logger()
+
+EXTERNAL_SOURCES = ("wiki", "arxiv")
+
+# Long-lived pools so an abandoned slow call never blocks the request that started it
+_executor = ThreadPoolExecutor(max_workers=Settings.RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+_external_executor = ThreadPoolExecutor(max_workers=Settings.EXTERNAL_RETRIEVAL_WORKERS,
+                                        thread_name_prefix="retrieval-external")
+_external_slots = {source: threading.BoundedSemaphore(Settings.EXTERNAL_MAX_IN_FLIGHT) for source in EXTERNAL_SOURCES}
+
+
+def fan_out(submitted: dict, budget_deadline: float) -> dict:
+    """
+    Collect results from {future: (source, deadline)} as they complete.
+    Sources that fail or miss their deadline are logged and left out.
+    """
+    results = {}
+    pending = set(submitted)
+    while pending:
+        now = time.monotonic()
+        expired = {f for f in pending if min(submitted[f][1], budget_deadline) <= now}
+        for future in expired:
+            future.cancel()
+            logger.warning(f"Retrieval source '{submitted[future][0]}' timed out; continuing without it")
+        pending -= expired
+        if not pending:
+            break
+
+        next_deadline = min(min(submitted[f][1], budget_deadline) for f in pending)
+        done, pending = wait(pending, timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+        for future in done:
+            source = submitted[future][0]
+            try:
+                results[source] = future.result()
+            except Exception as e:
+                logger.warning(f"Retrieval source '{source}' failed: {e}")
+    return results
+
+
+def reciprocal_rank_fusion(ranked_lists: list, k: int = Settings.RRF_K, limit: int | None = None) -> list:
+    """
+    Merge ranked document lists by sum of 1 / (k + rank); documents are identified
+    by content, and a document found by several lists keeps the scores of each.
+    """
+    scores, metadata = {}, {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked, start=1):
+            key = doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            metadata[key] = {**doc.metadata, **metadata.get(key, {})}
+    order = sorted(scores, key=scores.get, reverse=True)
+    return [
+        Document(page_content=key, metadata={**metadata[key], "rrf_score": scores[key]})
+        for key in order[:limit]
+    ]
+
+
+def hybrid_search(retriever, query: str, vector) -> list:
+    """Dense and BM25 search of one local index, fused; dense only without a lexical index."""
+    dense = search_by_vector(retriever, vector)
+    lexical = lexical_search(retriever, query) if Settings.HYBRID_SEARCH_ENABLED else []
+    if not lexical:
+        return dense
+    return reciprocal_rank_fusion([dense, lexical], limit=max(len(dense), len(lexical)))
+
+
+def hybrid_search_many(retriever, queries: list, vectors) -> list:
+    """hybrid_search for a batch of queries, with a single dense search over the (n, dim) matrix."""
+    results = []
+    for query, dense in zip(queries, search_by_vectors(retriever, vectors)):
+        lexical = lexical_search(retriever, query) if Settings.HYBRID_SEARCH_ENABLED else []
+        results.append(reciprocal_rank_fusion([dense, lexical], limit=max(len(dense), len(lexical)))
+                       if lexical else dense)
+    return results
+
+
+def _retrieve(source: str, fn, *args) -> list:
+    with span("retrieve", source=source) as s:
+        docs = fn(*args)
+        s.set("docs", len(docs))
+        return docs
+
 
 def route_query(query: str, mode: str, hardcoded_intent: str | None, retrievers: dict):
-    docs = []
-    intents = []
+    with span("routing", mode=mode) as s:
+        docs = _route_query(query, mode, hardcoded_intent, retrievers)
+        s.set("docs", len(docs))
+        return docs
+
+
+def _route_query(query: str, mode: str, hardcoded_intent: str | None, retrievers: dict):
+    start = time.monotonic()
+    budget_deadline = start + Settings.RETRIEVAL_BUDGET
+    submitted = {}
+    sources = []  # merge order
+
+    def submit(source, fn, *args, timeout, executor=_executor):
+        future = submit_with_context(executor, _retrieve, source, fn, *args)
+        submitted[future] = (source, time.monotonic() + timeout)
+        sources.append(source)
+        return future
 
     if mode == "hardcoded" and hardcoded_intent:
         intents = [hardcoded_intent]
     elif mode == "classifier":
-        intents = classify_intent(query)
+        with span("classification") as s:
+            intents = classify_intent(query)
+            s.set("intents", intents)
     else:  # all_db
         intents = LOCAL_DOMAINS
-        docs.extend(retrievers["wiki"].invoke(query))
-        docs.extend(retrievers["arxiv"].invoke(query))
+        # External APIs start first; local searches run while they are in flight
+        for source in EXTERNAL_SOURCES if Settings.EXTERNAL_RETRIEVAL_ENABLED else ():
+            slots = _external_slots[source]
+            if not slots.acquire(blocking=False):
+                # Earlier calls are still hanging; another one would only queue behind them
+                logger.warning(f"Retrieval source '{source}' has {Settings.EXTERNAL_MAX_IN_FLIGHT} calls "
+                               f"in flight; skipping it")
+                count("retrieval_skipped", source=source)
+                continue
+            future = submit(source, retrievers[source].invoke, query,
+                            timeout=Settings.EXTERNAL_RETRIEVAL_TIMEOUT, executor=_external_executor)
+            future.add_done_callback(lambda _, slots=slots: slots.release())
+
+    local = [intent for intent in intents if intent in retrievers]  # Check if DB exists for intent
+
+    # Fast path: exact term-title hits need no embedding and no dense search
+    title_hits = {}
+    if Settings.HYBRID_SEARCH_ENABLED:
+        with span("title_match") as s:
+            for intent in local:
+                matches = title_match(retrievers[intent], query)
+                if matches:
+                    title_hits[intent] = matches
+            s.set("hits", list(title_hits))
+        if title_hits:
+            logger.info(f"Exact title match in {', '.join(title_hits)}; skipping dense search there")
+            local = [intent for intent in local if intent not in title_hits]
+            sources.extend(title_hits)
 
-    for intent in intents:
-        if intent in retrievers:  # Check if DB exists for intent
-            docs.extend(retrievers[intent].invoke(query))
+    if local:
+        # One embedding (and one DP noise draw) shared by every local index;
+        # usually a cache hit, since the answer cache embedded the query already
+        with span("embedding", kind="query"):
+            vector = get_embeddings().embed_query(query)
+        for intent in local:
+            submit(intent, hybrid_search, retrievers[intent], query, vector, timeout=Settings.LOCAL_RETRIEVAL_TIMEOUT)
+
+    results = fan_out(submitted, budget_deadline)
+    results.update(title_hits)
+    logger.info(f"Retrieved from {len(results)}/{len(sources)} sources in {time.monotonic() - start:.3f}s")
+
+    docs = []
+    for source in sources:
+        docs.extend(results.get(source, []))
 
     # Deduplicate docs
-    return list({d.page_content: d for d in docs}.values())
\ No newline at end of file
+    return list({d.page_content: d for d in docs}.values())
@@ -0,0 +1,59 @@
+# src/models/fake.py
+"""
+Deterministic stand-in chat model for offline benchmarking and CI.
+Replies are derived from the question only, and timing follows a fixed
+first-token latency plus a steady token rate, so end-to-end latency can
+be measured without network access or model weights.
+"""
+import time
+from typing import Any, Iterator
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeChatModel(BaseChatModel):
+    model_name: str = "fake"
+    latency: float = 0.3  # seconds before the first token
+    tokens_per_second: float = 50.0
+    response_template: str = (
+        "Based on the provided context, here is an overview of {question} "
+        "It covers the key definitions, how it works in practice and the main risks to consider. "
+        "This is not financial advice. Consult a professional."
+    )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: list[BaseMessage]) -> list[str]:
+        """Reply tokens (words with their trailing space) for the last message."""
+        question = str(messages[-1].content).strip() if messages else ""
+        text = self.response_template.format(question=question[:200])
+        words = text.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def _usage(self, messages: list[BaseMessage], tokens: list[str]) -> dict:
+        input_tokens = sum(len(str(m.content).split()) for m in messages)
+        return {"input_tokens": input_tokens, "output_tokens": len(tokens),
+                "total_tokens": input_tokens + len(tokens)}
+
+    def _generate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._reply(messages)
+        time.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        tokens = self._reply(messages)
+        time.sleep(self.latency)
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(1.0 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
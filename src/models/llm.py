@@ -1,10 +1,10 @@
 # src/models/llm.py
-from langchain_groq import ChatGroq
+from src.models.registry import get_chat_model
 from src.config.settings import Settings
 
 def get_llm():
-    return ChatGroq(
+    return get_chat_model(
         model="llama-3.3-70b-versatile",
         temperature=0.7,
-        groq_api_key=Settings.GROQ_API_KEY
-    )
\ No newline at end of file
+        local_model_path=Settings.LOCAL_LLM_PATH
+    )
@@ -0,0 +1,151 @@
+# src/models/registry.py
+"""
+Process-wide chat model registry.
+One client per model configuration, shared by every session and thread.
+Clients of a provider share a keep-alive HTTP connection pool and a cap on
+in-flight requests; rate-limited calls are retried with exponential backoff.
+
+The backend is chosen by Settings.LLM_BACKEND:
+  groq  - hosted Groq models (default)
+  local - a GGUF model on CPU through llama.cpp (llama-cpp-python)
+  fake  - FakeChatModel, deterministic with configurable latency and token rate
+"""
+import threading
+import time
+import httpx
+from langchain_core.runnables import Runnable
+from langchain_groq import ChatGroq
+from src.config.settings import Settings
+from src.models.fake import FakeChatModel
+from src.utils.tracing import count, span, start_span
+
+_models = {}
+_semaphores = {}
+_http_clients = {}
+_lock = threading.Lock()
+
+
+class ThrottledChatModel(Runnable):
+    """Wraps a chat model so at most N calls per provider are in flight; the rest wait."""
+
+    def __init__(self, model, semaphore: threading.BoundedSemaphore):
+        self.model = model
+        self.semaphore = semaphore
+
+    def _record_usage(self, s, usage: dict | None):
+        if not usage:
+            return
+        for direction in ("input", "output"):
+            tokens = usage.get(f"{direction}_tokens", 0)
+            s.set(f"{direction}_tokens", tokens)
+            count("llm_tokens", tokens, direction=direction, model=self.model_label)
+
+    @property
+    def model_label(self) -> str:
+        return getattr(self.model, "model_name", None) or type(self.model).__name__
+
+    def invoke(self, input, config=None, **kwargs):
+        with span("llm", model=self.model_label, streaming=False) as s:
+            wait_start = time.perf_counter()
+            with self.semaphore:
+                s.set("queue_wait_ms", round((time.perf_counter() - wait_start) * 1000, 3))
+                result = self.model.invoke(input, config, **kwargs)
+            self._record_usage(s, getattr(result, "usage_metadata", None))
+            return result
+
+    def stream(self, input, config=None, **kwargs):
+        # Not span(): chain steps resume this generator in copied contexts
+        s = start_span("llm", model=self.model_label, streaming=True)
+        chunks = 0
+        usage = None
+        try:
+            wait_start = time.perf_counter()
+            with self.semaphore:
+                s.set("queue_wait_ms", round((time.perf_counter() - wait_start) * 1000, 3))
+                stream_start = time.perf_counter()
+                for chunk in self.model.stream(input, config, **kwargs):
+                    if chunks == 0:
+                        s.set("first_token_ms", round((time.perf_counter() - stream_start) * 1000, 3))
+                    chunks += 1
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    yield chunk
+        except Exception as e:
+            s.set("error", type(e).__name__)
+            raise
+        finally:
+            s.set("chunks", chunks)
+            self._record_usage(s, usage)
+            s.finish()
+
+    def __getattr__(self, name):
+        # model_name, temperature, ... come from the wrapped model
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+def _http_client(provider: str) -> httpx.Client:
+    """Keep-alive connection pool shared by every model of a provider."""
+    if provider not in _http_clients:
+        _http_clients[provider] = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=Settings.LLM_MAX_CONCURRENCY,
+                max_keepalive_connections=Settings.LLM_MAX_CONCURRENCY,
+            ),
+            timeout=Settings.LLM_TIMEOUT,
+        )
+    return _http_clients[provider]
+
+
+def _max_concurrency(provider: str) -> int:
+    # A llama.cpp model instance is not safe to call from several threads at once
+    return 1 if provider == "local" else Settings.LLM_MAX_CONCURRENCY
+
+
+def _build(provider: str, model: str, temperature: float, local_model_path: str | None):
+    if provider == "local":
+        from langchain_community.chat_models import ChatLlamaCpp
+        if not local_model_path:
+            raise ValueError(f"No GGUF model path configured for '{model}' (set LOCAL_LLM_PATH / LOCAL_SLM_PATH)")
+        return ChatLlamaCpp(
+            model_path=local_model_path,
+            temperature=temperature,
+            n_ctx=Settings.LOCAL_LLM_CONTEXT,
+            n_threads=Settings.LOCAL_LLM_THREADS or None,
+            max_tokens=Settings.LOCAL_LLM_MAX_TOKENS,
+        )
+    if provider == "fake":
+        return FakeChatModel(
+            model_name=f"fake-{model}",
+            latency=Settings.FAKE_LLM_LATENCY,
+            tokens_per_second=Settings.FAKE_LLM_TOKENS_PER_SECOND,
+        )
+    if provider == "groq":
+        return ChatGroq(
+            model=model,
+            temperature=temperature,
+            groq_api_key=Settings.GROQ_API_KEY,
+            # The Groq SDK retries 429/5xx with exponential backoff, honouring Retry-After
+            max_retries=Settings.LLM_MAX_RETRIES,
+            http_client=_http_client(provider),
+        )
+    raise ValueError(f"Unknown model provider '{provider}'")
+
+
+def get_chat_model(model: str, temperature: float = 0.7, local_model_path: str | None = None,
+                   provider: str | None = None):
+    """
+    Shared client for a model configuration, created on first use.
+    model names the hosted model; local_model_path is the GGUF file used instead
+    when the backend is "local".
+    """
+    provider = provider or Settings.LLM_BACKEND
+    key = (provider, model, temperature)
+    with _lock:
+        if key not in _models:
+            if provider not in _semaphores:
+                _semaphores[provider] = threading.BoundedSemaphore(_max_concurrency(provider))
+            _models[key] = ThrottledChatModel(
+                _build(provider, model, temperature, local_model_path), _semaphores[provider]
+            )
+        return _models[key]
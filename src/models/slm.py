@@ -1,10 +1,10 @@
 # src/models/slm.py
-from langchain_groq import ChatGroq
+from src.models.registry import get_chat_model
 from src.config.settings import Settings
 
 def get_slm():
-    return ChatGroq(
+    return get_chat_model(
         model="llama-3.1-8b-instant",  # Small/fast model for quick responses
         temperature=0.7,
-        groq_api_key=Settings.GROQ_API_KEY
-    )
\ No newline at end of file
+        local_model_path=Settings.LOCAL_SLM_PATH
+    )
@@ -0,0 +1,201 @@
+# src/utils/bm25.py
+"""
+Lexical (BM25) inverted index over chunk texts.
+
+Built by scripts/ingest.py and saved as bm25.json next to each FAISS index
+(or the shared vector file). Document ids are positions in that index, so a
+BM25 hit maps to the same chunk as a vector hit with the same id, and a
+domain view of the shared store can restrict the search to its ID range.
+
+The index also keeps a title table for glossary-style domains ("terms"):
+a query that is just a term name ("what is a problem loan ratio?") resolves
+to that term's chunks with a dictionary lookup, no dense search needed.
+"""
+import json
+import math
+import re
+from pathlib import Path
+import numpy as np
+
+BM25_FILE = "bm25.json"
+
+# Domains whose documents are one term per page, with the term as title
+TITLE_DOMAINS = ["terms"]
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its me my of on or "
+    "should the this to was what when where which who why will with you your".split()
+)
+# Wrappers around a bare term in definition questions
+_QUESTION = re.compile(
+    r"^(?:what\s+(?:is|are|does)|define|definition\s+of|meaning\s+of|explain|tell\s+me\s+about)\s+"
+    r"(?:an?\s+|the\s+)?|\s+mean$"
+)
+_HEADING = re.compile(r"^\s*(?:#+\s*(.+?)|\*\*(.+?)\*\*)\s*$", re.MULTILINE)
+_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_ZERO_WIDTH = re.compile("[\u200b\u200c\u200d\u2060\ufeff]")
+# Scraped glossary pages are saved as e.g. www.investopedia.com_terms_double-exempt.asp.json
+_SOURCE_TERM = re.compile(r"_terms_(?:[a-z0-9]_)?(.+?)(?:\.aspx?)?$", re.IGNORECASE)
+
+
+def tokenize(text: str) -> list:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def normalize_title(text: str) -> str:
+    """Lowercase words of a title, cut before subtitles such as "X: Definition and Examples"."""
+    text = re.split(r"[:(–—]| - ", text, maxsplit=1)[0]
+    return " ".join(_TOKEN.findall(text.lower()))
+
+
+def title_query(query: str) -> str:
+    """Strip definition-question wrappers so "What is a double exempt?" becomes "double exempt"."""
+    text = " ".join(_TOKEN.findall(query.lower()))
+    return _QUESTION.sub("", text).strip()
+
+
+def heading_title(text: str, definitions_only: bool = False) -> str:
+    """
+    Term named by the first heading of a page ("## What Is Double Exempt?" -> "double exempt"),
+    or "". With definitions_only, headings that are not a definition question give "".
+    """
+    heading = _HEADING.search(_IMAGE.sub("", _ZERO_WIDTH.sub("", text)))
+    if not heading:
+        return ""
+    title = normalize_title(heading.group(1) or heading.group(2))
+    term = title_query(title)
+    return "" if definitions_only and term == title else term
+
+
+def source_title(source: str | None) -> str:
+    """Term named by a source file: "..._terms_double-exempt.asp.json" -> "double exempt"."""
+    if not source:
+        return ""
+    stem = Path(source).stem
+    match = _SOURCE_TERM.search(stem)
+    return normalize_title((match.group(1) if match else stem).replace("-", " ").replace("_", " "))
+
+
+def document_titles(docs: list) -> list:
+    """
+    Title aliases of each chunk. A glossary file defines one term, so every chunk
+    of a source gets the same titles: metadata["title"] if set, else the term in
+    the file name and the first heading of the file's first chunk. For scraped
+    pages, whose file name already names the term, that heading only counts as
+    a "What is X?" question, so sections like "Key Takeaways" are never titles.
+    """
+    by_source = {}
+    titles = []
+    for doc in docs:
+        source = doc.metadata.get("source")
+        if source not in by_source or doc.metadata.get("title"):
+            if doc.metadata.get("title"):
+                aliases = [normalize_title(doc.metadata["title"])]
+            else:
+                scraped = bool(source and _SOURCE_TERM.search(Path(source).stem))
+                aliases = [source_title(source), heading_title(doc.page_content, definitions_only=scraped)]
+            by_source[source] = tuple(dict.fromkeys(alias for alias in aliases if alias))
+        titles.append(by_source[source])
+    return titles
+
+
+class BM25Index:
+    def __init__(self, postings: dict, doc_lengths: list, titles: dict | None = None,
+                 k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self.avgdl = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+        # term -> (doc ids, term frequencies); ids are ascending
+        self.postings = {
+            term: (np.asarray(ids, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+            for term, (ids, tfs) in postings.items()
+        }
+        self.titles = titles or {}  # normalized title -> [doc ids]
+
+    @classmethod
+    def build(cls, texts: list, titles: list | None = None, **kwargs) -> "BM25Index":
+        """Index texts (ids = positions); titles, if given, are a normalized title (or tuple of aliases) per text."""
+        postings = {}
+        doc_lengths = []
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, tf in counts.items():
+                ids, tfs = postings.setdefault(term, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+        title_table = {}
+        for doc_id, aliases in enumerate(titles or []):
+            for title in ([aliases] if isinstance(aliases, str) else aliases):
+                if title:
+                    title_table.setdefault(title, []).append(doc_id)
+        return cls(postings, doc_lengths, title_table, **kwargs)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def search(self, query: str, k: int, id_range: tuple | None = None) -> list:
+        """Return [(doc id, score)] of the k best BM25 matches, optionally inside [start, end)."""
+        start, end = id_range or (0, len(self))
+        scores = np.zeros(end - start, dtype=np.float32)
+        n = len(self)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, tfs = self.postings[term]
+            df = len(ids)
+            lo, hi = np.searchsorted(ids, [start, end])
+            if lo == hi:
+                continue
+            ids, tfs = ids[lo:hi], tfs[lo:hi]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[ids] / self.avgdl)
+            scores[ids - start] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(i) + start, float(scores[i])) for i in ranked]
+
+    def title_match(self, query: str, id_range: tuple | None = None) -> list:
+        """Doc ids of the term whose title is exactly the query, inside id_range."""
+        ids = self.titles.get(title_query(query), [])
+        if id_range is not None:
+            ids = [i for i in ids if id_range[0] <= i < id_range[1]]
+        return ids
+
+    def save(self, path: Path):
+        with open(Path(path) / BM25_FILE, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "doc_lengths": self.doc_lengths.astype(int).tolist(),
+                "postings": {term: [ids.tolist(), tfs.astype(int).tolist()]
+                             for term, (ids, tfs) in self.postings.items()},
+                "titles": self.titles,
+            }, f)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index | None":
+        """Load bm25.json from an index directory; None if it was built without one."""
+        file_path = Path(path) / BM25_FILE
+        if not file_path.exists():
+            return None
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["postings"], data["doc_lengths"], data["titles"], data["k1"], data["b"])
+
+
+def build_for_docs(domains: list) -> BM25Index:
+    """BM25 index over [(name, docs), ...] laid out back to back; titles only for TITLE_DOMAINS."""
+    texts, titles = [], []
+    for name, docs in domains:
+        texts.extend(doc.page_content for doc in docs)
+        titles.extend(document_titles(docs) if name in TITLE_DOMAINS else [()] * len(docs))
+    return BM25Index.build(texts, titles)
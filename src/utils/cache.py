@@ -0,0 +1,66 @@
+# src/utils/cache.py
+"""
+Thread-safe in-process cache with LRU eviction and per-entry expiry.
+Shared by the Streamlit sessions of one process.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: float | None = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def touch(self, key):
+        """Mark an entry as recently used without counting a hit."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+
+    def items(self) -> list:
+        """Live (key, value) pairs; expired entries are dropped on the way."""
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, (expires, _) in self._data.items() if expires <= now]:
+                del self._data[key]
+            return [(key, value) for key, (_, value) in self._data.items()]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
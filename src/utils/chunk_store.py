@@ -0,0 +1,84 @@
+# src/utils/chunk_store.py
+"""
+Compact chunk store keyed by FAISS vector id.
+Replaces the pickled InMemoryDocstore: chunk text and metadata live in
+SQLite and are fetched only for the top-k hits of a search. Identical
+chunk text is stored once, however many chunks reference it.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from langchain_core.documents import Document
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    text_id INTEGER NOT NULL REFERENCES texts(id),
+    metadata TEXT NOT NULL
+);
+"""
+
+
+def write_chunk_store(path: Path, docs: list):
+    """Write docs to a fresh store; chunk ids are the positions in docs (= FAISS ids)."""
+    path = Path(path)
+    if path.exists():
+        path.unlink()
+    conn = sqlite3.connect(str(path))
+    conn.executescript(SCHEMA)
+
+    text_ids = {}
+    for chunk_id, doc in enumerate(docs):
+        digest = hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+        if digest not in text_ids:
+            cursor = conn.execute(
+                "INSERT INTO texts (hash, text) VALUES (?, ?)", (digest, doc.page_content)
+            )
+            text_ids[digest] = cursor.lastrowid
+        conn.execute(
+            "INSERT INTO chunks (id, text_id, metadata) VALUES (?, ?, ?)",
+            (chunk_id, text_ids[digest], json.dumps(doc.metadata))
+        )
+
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+class ChunkStore:
+    """Read-only view of a chunk store, safe to share across Streamlit threads."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(
+            f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+
+    def get(self, ids: list) -> list:
+        """Return the Documents for ids, in the order given."""
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT chunks.id, texts.text, chunks.metadata FROM chunks "
+                f"JOIN texts ON texts.id = chunks.text_id WHERE chunks.id IN ({placeholders})",
+                [int(i) for i in ids]
+            ).fetchall()
+        by_id = {
+            row[0]: Document(page_content=row[1], metadata=json.loads(row[2]))
+            for row in rows
+        }
+        return [by_id[int(i)] for i in ids if int(i) in by_id]
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
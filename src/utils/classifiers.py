@@ -1,12 +1,80 @@
 # src/utils/classifiers.py
-from transformers import pipeline
-from src.config.constants import DOMAINS
+"""
+Intent classification for the classifier routing mode.
+Two backends: the facebook/bart-large-mnli zero-shot pipeline ("nli"), and
+similarity to precomputed label centroids using the already loaded MiniLM
+embedding model ("embedding"). Models load on first use and results are
+memoized per normalized query.
+"""
+import threading
+from functools import lru_cache
+import numpy as np
+from src.config.constants import DOMAINS, DOMAIN_DESCRIPTIONS
+from src.config.settings import Settings
+from src.utils.cache import TTLCache
+from src.utils.embeddings import get_embeddings, normalize_query
 
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+# Sharpens centroid similarities into a distribution comparable to NLI scores
+EMBEDDING_TEMPERATURE = 0.05
 
-def classify_intent(query: str, threshold: float = 0.3):
-    result = classifier(query, candidate_labels=DOMAINS)
+_nli_classifier = None
+_nli_lock = threading.Lock()
+
+# (backend, normalized query) -> [(label, score)]; entries never expire
+_scores_cache = TTLCache(maxsize=Settings.CLASSIFIER_CACHE_SIZE, ttl=float("inf"))
+
+
+def get_nli_classifier():
+    """Build the zero-shot pipeline on first use instead of at import time."""
+    global _nli_classifier
+    if _nli_classifier is None:
+        with _nli_lock:
+            if _nli_classifier is None:
+                from transformers import pipeline
+                _nli_classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+    return _nli_classifier
+
+
+def nli_scores(query: str) -> list:
+    # One batch holds every label hypothesis, so this is a single forward pass
+    result = get_nli_classifier()(query, candidate_labels=DOMAINS, batch_size=len(DOMAINS))
+    return list(zip(result["labels"], result["scores"]))
+
+
+@lru_cache(maxsize=1)
+def get_label_centroids() -> np.ndarray:
+    """Unit-length mean embedding of each label's descriptions, in DOMAINS order."""
+    embeddings = get_embeddings()
+    centroids = []
+    for label in DOMAINS:
+        vectors = np.asarray(embeddings.embed_raw(DOMAIN_DESCRIPTIONS[label]), dtype=np.float32)
+        centroid = vectors.mean(axis=0)
+        centroids.append(centroid / np.linalg.norm(centroid))
+    return np.stack(centroids)
+
+
+def embedding_scores(query: str) -> list:
+    vector = get_embeddings().embed_query_raw(query)
+    similarities = get_label_centroids() @ (vector / np.linalg.norm(vector))
+    weights = np.exp((similarities - similarities.max()) / EMBEDDING_TEMPERATURE)
+    scores = weights / weights.sum()
+    return sorted(zip(DOMAINS, scores.tolist()), key=lambda pair: pair[1], reverse=True)
+
+
+def classify_scores(query: str, backend: str | None = None) -> list:
+    """(label, score) pairs, highest first."""
+    backend = backend or Settings.CLASSIFIER_BACKEND
+    key = (backend, normalize_query(query))
+    scores = _scores_cache.get(key)
+    if scores is None:
+        # Only the memo key is normalized: the model sees the user's text (BART-MNLI is cased)
+        scores = embedding_scores(query) if backend == "embedding" else nli_scores(query)
+        _scores_cache.set(key, scores)
+    return list(scores)
+
+
+def classify_intent(query: str, threshold: float = 0.3, backend: str | None = None):
     return [
-        label for label, score in zip(result["labels"], result["scores"])
+        label for label, score in classify_scores(query, backend)
         if score > threshold
-    ]
\ No newline at end of file
+    ]
@@ -0,0 +1,103 @@
+# src/utils/embedding_cache.py
+"""
+Persistent embedding cache for ingestion.
+Vectors are stored in SQLite keyed by a hash of the model key and chunk text,
+so re-ingesting an unchanged chunk never runs the embedding model again.
+After a full pass over the corpus, prune() drops the vectors of chunks that
+no longer exist, so the cache does not grow with every re-ingest.
+"""
+import hashlib
+import sqlite3
+from pathlib import Path
+import numpy as np
+
+
+def hash_text(text: str, model_key: str = "") -> str:
+    """Stable content hash for a chunk under a given model."""
+    return hashlib.sha256(f"{model_key}\0{text}".encode("utf-8")).hexdigest()
+
+
+def hash_file(path) -> str:
+    """Content hash of a source file, used by the ingest manifest."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: Path, model_key: str):
+        self.path = Path(path)
+        self.model_key = model_key
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self.hits = 0
+        self.misses = 0
+        self._seen = set()  # keys passed to embed() since the cache was opened
+
+    def get_many(self, keys: list) -> dict:
+        """Return {key: vector} for the keys present in the cache."""
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: dict):
+        """Store {key: vector} pairs."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [(key, np.asarray(vec, dtype=np.float32).tobytes()) for key, vec in items.items()]
+        )
+        self.conn.commit()
+
+    def embed(self, texts: list, embeddings) -> np.ndarray:
+        """
+        Embed texts into a float32 matrix, running the model only for texts not
+        already cached. Uses embeddings.embed_array when available (no list round trip).
+        """
+        keys = [hash_text(text, self.model_key) for text in texts]
+        self._seen.update(keys)
+        cached = self.get_many(list(set(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            if hasattr(embeddings, "embed_array"):
+                new_vectors = embeddings.embed_array(list(missing.values()))
+            else:
+                new_vectors = np.asarray(embeddings.embed_documents(list(missing.values())), dtype=np.float32)
+            new_items = dict(zip(missing.keys(), new_vectors))
+            self.put_many(new_items)
+            cached.update(new_items)
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([cached[key] for key in keys])
+
+    def prune(self) -> int:
+        """Delete every entry not embedded through this cache since it was opened; returns how many."""
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM seen")
+        self.conn.executemany("INSERT INTO seen (key) VALUES (?)", [(key,) for key in self._seen])
+        removed = self.conn.execute("DELETE FROM embeddings WHERE key NOT IN (SELECT key FROM seen)").rowcount
+        self.conn.commit()
+        return removed
+
+    def close(self):
+        self.conn.close()
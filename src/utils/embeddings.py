@@ -1,17 +1,121 @@
 # src/utils/embeddings.py
+"""
+Differentially private sentence embeddings.
+
+Texts are encoded in batches straight into a float32 matrix and noised in
+one add_dp_noise call, so no per-vector NumPy/list round trips happen on
+the hot path. The encoder backend is chosen by Settings.EMBEDDING_BACKEND:
+"torch" (default), "onnx" (ONNX Runtime) or "onnx-int8" (ONNX Runtime with
+the int8-quantized export of the model, CPU only). The ONNX backends need
+`optimum[onnxruntime]`.
+
+Query embeddings are cached per process (all Streamlit sessions), keyed by
+the normalized query text. Each entry holds the noise-free vector and one
+noised vector drawn when the entry is created: every retriever, the answer
+cache and the classifier see the same vectors for the same question, and
+repeating a question does not draw fresh noise that could be averaged out.
+"""
+import threading
+from functools import lru_cache
 import numpy as np
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from src.config.settings import Settings
+from src.utils.cache import TTLCache
 from src.utils.privacy import add_dp_noise
+from src.utils.tracing import count
+
+EMBEDDING_BACKENDS = ["torch", "onnx", "onnx-int8"]
+
+_query_cache = TTLCache(maxsize=Settings.QUERY_EMBEDDING_CACHE_SIZE, ttl=Settings.QUERY_EMBEDDING_CACHE_TTL)
+_query_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query (the embedding model is uncased)."""
+    return " ".join(query.lower().split())
+
+
+def embedding_model_key(backend: str = Settings.EMBEDDING_BACKEND) -> str:
+    """Identifies the vectors a configuration produces (for the ingest cache and manifest)."""
+    key = f"{Settings.EMBEDDING_MODEL}|dp={Settings.EPSILON_DP}"
+    # Quantized vectors differ slightly from torch ones; keep torch keys unchanged
+    return key if backend == "torch" else f"{key}|backend={backend}"
+
+
+def _model_kwargs(backend: str, num_threads: int) -> dict:
+    """SentenceTransformer kwargs for a backend; also applies the thread count."""
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+    if backend == "torch":
+        if num_threads > 0:
+            import torch
+            torch.set_num_threads(num_threads)
+        return {}
+
+    import onnxruntime
+    session_options = onnxruntime.SessionOptions()
+    if num_threads > 0:
+        session_options.intra_op_num_threads = num_threads
+    onnx_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+    if backend == "onnx-int8":
+        onnx_kwargs["file_name"] = Settings.EMBEDDING_ONNX_INT8_FILE
+    return {"backend": "onnx", "model_kwargs": onnx_kwargs}
+
 
 class DPEmbeddings(HuggingFaceEmbeddings):
-    def __init__(self):
-        super().__init__(model_name=Settings.EMBEDDING_MODEL)
-    
+    backend: str = "torch"
+
+    def __init__(self, batch_size: int = Settings.EMBED_BATCH_SIZE,
+                 num_threads: int = Settings.EMBED_NUM_THREADS,
+                 backend: str = Settings.EMBEDDING_BACKEND):
+        super().__init__(
+            model_name=Settings.EMBEDDING_MODEL,
+            model_kwargs=_model_kwargs(backend, num_threads),
+            encode_kwargs={"batch_size": batch_size},
+            backend=backend
+        )
+
+    def embed_array(self, texts, noise: bool = True) -> np.ndarray:
+        """Encode texts into a (len(texts), dim) float32 matrix, noised as a whole."""
+        texts = [text.replace("\n", " ") for text in texts]
+        matrix = self.client.encode(
+            texts, convert_to_numpy=True, show_progress_bar=False, **self.encode_kwargs
+        ).astype(np.float32, copy=False)
+        return add_dp_noise(matrix) if noise else matrix
+
     def embed_documents(self, texts):
-        embeds = super().embed_documents(texts)
-        return [add_dp_noise(np.array(emb)).tolist() for emb in embeds]
-    
+        return self.embed_array(texts).tolist()
+
+    def query_vectors(self, text: str) -> tuple:
+        """(raw, noised) float32 vectors of a query, computed once per normalized text."""
+        key = (self.backend, normalize_query(text))
+        entry = _query_cache.get(key)
+        count("cache_hits" if entry is not None else "cache_misses", cache="query_embedding")
+        if entry is not None:
+            return entry
+
+        raw = self.embed_array([key[1]], noise=False)[0]
+        with _query_lock:
+            # A concurrent miss may have stored the query first; keep its noise draw
+            entry = _query_cache.get(key)
+            if entry is None:
+                entry = (raw, add_dp_noise(raw))
+                _query_cache.set(key, entry)
+        return entry
+
     def embed_query(self, text):
-        emb = super().embed_query(text)
-        return add_dp_noise(np.array(emb)).tolist()
\ No newline at end of file
+        return self.query_vectors(text)[1].tolist()
+
+    def embed_query_raw(self, text: str) -> np.ndarray:
+        """Noise-free query embedding (cached), for in-process comparisons."""
+        return self.query_vectors(text)[0]
+
+    def embed_raw(self, texts):
+        """Noise-free embeddings, for in-process comparisons that never reach an index."""
+        return self.embed_array(texts, noise=False)
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> DPEmbeddings:
+    """Process-wide embedding model, shared by the retrievers and the classifier."""
+    return DPEmbeddings()
@@ -0,0 +1,199 @@
+# src/utils/history_store.py
+"""
+Durable chat history keyed by session id, shared by every worker process.
+
+Messages are append-only rows (session, sequence number, role code, text);
+reads are bounded to the newest N messages of a session through the
+(session_id, seq) index, so their cost does not grow with the conversation.
+Each session also has one row holding its running summary and the last
+sequence number folded into it (see src/core/memory.py).
+
+The SQLite backend runs in WAL mode, so replicas on one host (or a shared
+volume) read while another writes. The in-memory backend keeps the same
+interface for single-process runs, benchmarks and ephemeral sessions.
+"""
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+from src.config.settings import Settings
+
+ROLES = {"human": 0, "ai": 1, "system": 2}
+ROLE_NAMES = {code: name for name, code in ROLES.items()}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, seq);
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL DEFAULT '',
+    summarized_upto INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+
+class StoredMessage(NamedTuple):
+    seq: int
+    role: str  # "human" | "ai" | "system"
+    content: str
+
+
+class HistoryStore(ABC):
+    """Interface of a history backend."""
+
+    @abstractmethod
+    def append(self, session_id: str, role: str, content: str) -> int:
+        """Append a message; returns its sequence number (increasing within a session)."""
+
+    @abstractmethod
+    def tail(self, session_id: str, limit: int, after: int = 0) -> list:
+        """The newest `limit` messages with seq > after, oldest first."""
+
+    @abstractmethod
+    def count(self, session_id: str, after: int = 0) -> int:
+        """Number of messages with seq > after."""
+
+    @abstractmethod
+    def range(self, session_id: str, after: int, before: int, limit: int) -> list:
+        """The oldest `limit` messages with after < seq < before, oldest first."""
+
+    @abstractmethod
+    def get_summary(self, session_id: str) -> tuple:
+        """(summary, seq of the last message folded into it)."""
+
+    @abstractmethod
+    def set_summary(self, session_id: str, summary: str, upto: int, expected_upto: int) -> bool:
+        """Store a summary only if nobody advanced it past expected_upto meanwhile."""
+
+    @abstractmethod
+    def clear(self, session_id: str):
+        """Delete a session's messages and summary."""
+
+
+class SQLiteHistoryStore(HistoryStore):
+    def __init__(self, path: Path = Settings.HISTORY_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: each statement commits on its own unless wrapped in BEGIN
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None,
+                                    timeout=Settings.HISTORY_BUSY_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # durable across crashes of the app, not of the OS
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, role: str, content: str) -> int:
+        with self._lock:
+            return self.conn.execute(
+                "INSERT INTO messages (session_id, role, content, created) VALUES (?, ?, ?, ?)",
+                (session_id, ROLES[role], content, time.time())
+            ).lastrowid
+
+    def _messages(self, rows) -> list:
+        return [StoredMessage(seq, ROLE_NAMES[role], content) for seq, role, content in rows]
+
+    def tail(self, session_id: str, limit: int, after: int = 0) -> list:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT seq, role, content FROM messages WHERE session_id = ? AND seq > ? "
+                "ORDER BY seq DESC LIMIT ?", (session_id, after, limit)
+            ).fetchall()
+        return self._messages(reversed(rows))
+
+    def count(self, session_id: str, after: int = 0) -> int:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ? AND seq > ?", (session_id, after)
+            ).fetchone()[0]
+
+    def range(self, session_id: str, after: int, before: int, limit: int) -> list:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT seq, role, content FROM messages WHERE session_id = ? AND seq > ? AND seq < ? "
+                "ORDER BY seq LIMIT ?", (session_id, after, before, limit)
+            ).fetchall()
+        return self._messages(rows)
+
+    def get_summary(self, session_id: str) -> tuple:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT summary, summarized_upto FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return tuple(row) if row else ("", 0)
+
+    def set_summary(self, session_id: str, summary: str, upto: int, expected_upto: int) -> bool:
+        with self._lock:
+            cursor = self.conn.execute(
+                "INSERT INTO sessions (session_id, summary, summarized_upto) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET summary = excluded.summary, "
+                "summarized_upto = excluded.summarized_upto WHERE sessions.summarized_upto = ?",
+                (session_id, summary, upto, expected_upto)
+            )
+            return cursor.rowcount > 0
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self.conn.execute("COMMIT")
+
+
+class InMemoryHistoryStore(HistoryStore):
+    def __init__(self):
+        self._messages = {}   # session_id -> [StoredMessage]
+        self._summaries = {}  # session_id -> (summary, upto)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, role: str, content: str) -> int:
+        with self._lock:
+            self._seq += 1
+            self._messages.setdefault(session_id, []).append(StoredMessage(self._seq, role, content))
+            return self._seq
+
+    def tail(self, session_id: str, limit: int, after: int = 0) -> list:
+        with self._lock:
+            return [m for m in self._messages.get(session_id, []) if m.seq > after][-limit:]
+
+    def count(self, session_id: str, after: int = 0) -> int:
+        with self._lock:
+            return sum(1 for m in self._messages.get(session_id, []) if m.seq > after)
+
+    def range(self, session_id: str, after: int, before: int, limit: int) -> list:
+        with self._lock:
+            return [m for m in self._messages.get(session_id, []) if after < m.seq < before][:limit]
+
+    def get_summary(self, session_id: str) -> tuple:
+        with self._lock:
+            return self._summaries.get(session_id, ("", 0))
+
+    def set_summary(self, session_id: str, summary: str, upto: int, expected_upto: int) -> bool:
+        with self._lock:
+            if self._summaries.get(session_id, ("", 0))[1] != expected_upto:
+                return False
+            self._summaries[session_id] = (summary, upto)
+            return True
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._messages.pop(session_id, None)
+            self._summaries.pop(session_id, None)
+
+
+HISTORY_BACKENDS = {"sqlite": SQLiteHistoryStore, "memory": InMemoryHistoryStore}
+
+
+@lru_cache(maxsize=1)
+def get_history_store() -> HistoryStore:
+    """Process-wide history backend chosen by HISTORY_BACKEND."""
+    return HISTORY_BACKENDS[Settings.HISTORY_BACKEND]()
@@ -1,27 +1,54 @@
 # src/utils/logger.py
 import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 from src.config.settings import LOG_DIR
 
+_listener = None
+_lock = threading.Lock()
+
 def get_logger():
+    """
+    Shared application logger. Handlers are attached once per process, however
+    often this is called (every module and every Streamlit rerun calls it).
+    Records go through a queue; file and console writes happen on a
+    background thread so logging never blocks the request thread.
+    """
+    global _listener
     logger = logging.getLogger("financial_chatbot")
-    logger.setLevel(logging.DEBUG)  # Capture all levels
+    if _listener is not None:
+        return logger
+
+    with _lock:
+        if _listener is not None:
+            return logger
+
+        logger.setLevel(logging.DEBUG)  # Capture all levels
+        logger.propagate = False
+
+        # Ensure log directory exists
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
 
-    # Ensure log directory exists
-    LOG_DIR.mkdir(parents=True, exist_ok=True)
+        # File handler (rotate if needed)
+        file_handler = logging.FileHandler(LOG_DIR / "app.log")
+        file_handler.setLevel(logging.DEBUG)
+        file_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        file_handler.setFormatter(file_format)
 
-    # File handler (rotate if needed)
-    file_handler = logging.FileHandler(LOG_DIR / "app.log")
-    file_handler.setLevel(logging.DEBUG)
-    file_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_format)
+        # Console handler
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)  # Show INFO+ on console
+        console_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        console_handler.setFormatter(console_format)
 
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)  # Show INFO+ on console
-    console_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    console_handler.setFormatter(console_format)
+        # Drop handlers left by earlier versions of this function
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+        log_queue = SimpleQueue()
+        logger.addHandler(QueueHandler(log_queue))
+        _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
 
-    return logger
\ No newline at end of file
+    return logger
@@ -3,6 +3,9 @@ import numpy as np
 from src.config.settings import Settings
 
 def add_dp_noise(embeds: np.ndarray) -> np.ndarray:
-    """Add Laplace noise for differential privacy (epsilon from settings)."""
+    """
+    Add Laplace noise for differential privacy (epsilon from settings).
+    Works on a single vector or a whole matrix; the input dtype is kept.
+    """
     noise = np.random.laplace(0, 1.0 / Settings.EPSILON_DP, embeds.shape)
-    return embeds + noise
\ No newline at end of file
+    return embeds + noise.astype(embeds.dtype, copy=False)
\ No newline at end of file
@@ -2,20 +2,32 @@
 """
 Vector database loading utilities.
 Loads pre-built FAISS indexes from disk, or builds in-memory as fallback.
+The shared storage mode opens one memory-mapped vector file lazily and
+serves every domain as an ID-range view over it.
+Every local retriever also answers lexical (BM25) searches and exact
+term-title lookups from the BM25 index saved next to its vectors.
 """
 import json
+from functools import lru_cache
 from pathlib import Path
+from typing import Any
+import numpy as np
 from langchain_community.vectorstores import FAISS
+from langchain_core.vectorstores import VectorStoreRetriever
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from src.utils.embeddings import DPEmbeddings
+from src.utils.bm25 import BM25Index, build_for_docs
+from src.utils.embeddings import get_embeddings
+from src.utils.vector_store import SharedVectorStore, apply_search_settings, read_descriptor
 from src.config.settings import Settings
+from src.utils.logger import get_logger
 from langchain_community.retrievers import WikipediaRetriever, ArxivRetriever
 
-import streamlit as st
+logger = get_logger()
 
 # Path to persisted FAISS indexes
 FAISS_INDEX_DIR = Path(__file__).parent.parent.parent / "data" / "faiss_indexes"
+SHARED_INDEX_DIR = FAISS_INDEX_DIR / "shared"
 
 
 def load_json_documents(file_path: str, content_key: str = "markdown"):
@@ -45,56 +57,143 @@ def load_directory_json_documents(dir_path: str, content_key: str = "markdown"):
     return docs
 
 
+class HybridFAISSRetriever(VectorStoreRetriever):
+    """FAISS retriever with the BM25 index built over the same document positions."""
+    lexical: Any = None
+
+    @property
+    def k(self) -> int:
+        return self.search_kwargs.get("k", 4)
+
+    def _docs(self, ids: list) -> list:
+        store = self.vectorstore
+        return [store.docstore.search(store.index_to_docstore_id[i]) for i in ids]
+
+    def lexical_search_with_score(self, query: str, k: int | None = None) -> list:
+        if self.lexical is None:
+            return []
+        hits = self.lexical.search(query, k or self.k)
+        return list(zip(self._docs([i for i, _ in hits]), [score for _, score in hits]))
+
+    def title_match(self, query: str) -> list:
+        if self.lexical is None:
+            return []
+        return self._docs(self.lexical.title_match(query)[:self.k])
+
+
 def load_faiss_index(name: str, embeddings) -> FAISS | None:
     """Load a FAISS index from disk if it exists."""
     index_path = FAISS_INDEX_DIR / name
     if index_path.exists():
         try:
-            return FAISS.load_local(
+            vs = FAISS.load_local(
                 str(index_path), 
                 embeddings,
                 allow_dangerous_deserialization=True
             )
+            # Approximate indexes carry their nprobe/efSearch in index.json
+            settings = read_descriptor(index_path).get("search", {}).get("default", {})
+            apply_search_settings(vs.index, settings)
+            return vs
         except Exception as e:
-            st.warning(f"Failed to load index '{name}': {e}")
+            logger.warning(f"Failed to load index '{name}': {e}")
     return None
 
 
-@st.cache_resource
-def load_vector_dbs():
+def with_score(doc: Document, key: str, value) -> Document:
+    """Copy of doc with a retrieval score in its metadata (index docstores stay untouched)."""
+    return Document(page_content=doc.page_content, metadata={**doc.metadata, key: value})
+
+
+def search_by_vector(retriever, vector) -> list:
     """
-    Load vector databases. Tries to load pre-built indexes from disk first.
-    If not available, builds them in-memory (slower).
+    Search a local retriever with a query vector computed once by the caller.
+    Each document carries its L2 distance in metadata["vector_distance"].
     """
-    embeddings = DPEmbeddings()
+    if hasattr(retriever, "vectorstore"):  # LangChain VectorStoreRetriever over FAISS
+        pairs = retriever.vectorstore.similarity_search_with_score_by_vector(vector, **retriever.search_kwargs)
+    else:
+        pairs = retriever.similarity_search_with_score_by_vector(vector)
+    return [with_score(doc, "vector_distance", float(distance)) for doc, distance in pairs]
+
+
+def search_by_vectors(retriever, vectors) -> list:
+    """Batched search_by_vector: one index search for a (n, dim) matrix, one doc list per row."""
+    if hasattr(retriever, "vectorstore"):
+        store = retriever.vectorstore
+        distances, ids = store.index.search(np.asarray(vectors, dtype=np.float32), retriever.k)
+        return [
+            [with_score(store.docstore.search(store.index_to_docstore_id[int(i)]), "vector_distance", float(d))
+             for i, d in zip(row_ids, row_distances) if i != -1]
+            for row_ids, row_distances in zip(ids, distances)
+        ]
+    if hasattr(retriever, "similarity_search_with_score_by_vectors"):
+        return [[with_score(doc, "vector_distance", float(distance)) for doc, distance in pairs]
+                for pairs in retriever.similarity_search_with_score_by_vectors(vectors)]
+    return [search_by_vector(retriever, vector) for vector in vectors]
+
+
+def lexical_search(retriever, query: str) -> list:
+    """BM25 matches (score in metadata["bm25_score"]); [] when the retriever has no lexical index."""
+    if not hasattr(retriever, "lexical_search_with_score"):
+        return []
+    return [with_score(doc, "bm25_score", score) for doc, score in retriever.lexical_search_with_score(query)]
+
+
+def title_match(retriever, query: str) -> list:
+    """Chunks of a term whose title is exactly the query (metadata["title_match"]); [] when there is none."""
+    if not hasattr(retriever, "title_match"):
+        return []
+    return [with_score(doc, "title_match", True) for doc in retriever.title_match(query)]
+
+
+def faiss_retriever(vs: FAISS, k: int, lexical: BM25Index | None) -> HybridFAISSRetriever:
+    return HybridFAISSRetriever(vectorstore=vs, search_kwargs={"k": k}, lexical=lexical)
+
+
+@lru_cache(maxsize=1)
+def get_vector_dbs():
+    """
+    Load vector databases, once per process. Tries to load pre-built indexes
+    from disk first. If not available, builds them in-memory (slower).
+    """
+    embeddings = get_embeddings()
     dbs = {}
     
     # Check if indexes exist
+    shared_exists = Settings.INDEX_STORAGE == "shared" and SharedVectorStore.exists(SHARED_INDEX_DIR)
     indexes_exist = (FAISS_INDEX_DIR / "all").exists()
     
-    if indexes_exist:
-        st.info("Loading pre-built FAISS indexes...")
+    if shared_exists:
+        # Nothing is read here beyond the range table; vectors are mapped on first search
+        store = SharedVectorStore(SHARED_INDEX_DIR, embeddings)
+        for name in store.ranges:
+            dbs[name] = store.as_retriever(name, k=8 if name == "all" else 5)
+        logger.info(f"Opened shared vector store with {len(store.ranges)} index views.")
+    elif indexes_exist:
+        logger.info("Loading pre-built FAISS indexes...")
         
         # Load individual domain indexes
         for name in ["investments", "terms", "economic_government", "banking_loans_payments", "currency_crypto"]:
             vs = load_faiss_index(name, embeddings)
             if vs:
-                dbs[name] = vs.as_retriever(search_kwargs={"k": 5})
+                dbs[name] = faiss_retriever(vs, 5, BM25Index.load(FAISS_INDEX_DIR / name))
         
         # Load combined index
         all_vs = load_faiss_index("all", embeddings)
         if all_vs:
-            dbs["all"] = all_vs.as_retriever(search_kwargs={"k": 8})
+            dbs["all"] = faiss_retriever(all_vs, 8, BM25Index.load(FAISS_INDEX_DIR / "all"))
         
-        st.success(f"Loaded {len(dbs)} indexes from disk.")
+        logger.info(f"Loaded {len(dbs)} indexes from disk.")
     else:
-        st.warning("No pre-built indexes found. Building in-memory (run 'python scripts/ingest.py' for faster startup)...")
+        logger.warning("No pre-built indexes found. Building in-memory (run 'python scripts/ingest.py' for faster startup)...")
         
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=Settings.CHUNK_SIZE, 
             chunk_overlap=Settings.CHUNK_OVERLAP
         )
         all_docs = []
+        domains = []
         
         # Build each index in memory
         datasets = [
@@ -113,14 +212,16 @@ def load_vector_dbs():
             
             docs = splitter.split_documents(raw_docs)
             if docs:
-                dbs[name] = FAISS.from_documents(docs, embeddings).as_retriever(search_kwargs={"k": 5})
+                dbs[name] = faiss_retriever(FAISS.from_documents(docs, embeddings), 5, build_for_docs([(name, docs)]))
                 all_docs.extend(docs)
+                domains.append((name, docs))
         
         if all_docs:
-            dbs["all"] = FAISS.from_documents(all_docs, embeddings).as_retriever(search_kwargs={"k": 8})
+            dbs["all"] = faiss_retriever(FAISS.from_documents(all_docs, embeddings), 8, build_for_docs(domains))
     
     # External retrievers (always available)
     dbs["wiki"] = WikipediaRetriever()
     dbs["arxiv"] = ArxivRetriever()
     
-    return dbs
\ No newline at end of file
+    return dbs
+
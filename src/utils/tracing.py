@@ -0,0 +1,210 @@
+# src/utils/tracing.py
+"""
+Structured per-stage tracing and metrics.
+
+    with span("retrieve", source="terms") as s:
+        docs = ...
+        s.set("docs", len(docs))
+
+Every finished span is written as one JSON line to Settings.TRACE_FILE by a
+background thread (the request thread only enqueues), and feeds in-process
+Prometheus-style metrics: a latency histogram per span name plus counters
+such as cache hits. start_metrics_server() exposes them on /metrics.
+Spans nest through contextvars; use submit_with_context() to keep the
+parent span when work moves to a thread pool. Generators use start_span()
+instead: their steps may be resumed in a different context (LangChain runs
+each chunk of a chain step with context.run), so they must not hold a
+context variable across yields.
+"""
+import contextvars
+import itertools
+import json
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.config.settings import Settings
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf")]
+
+
+class Span:
+    def __init__(self, name: str, attrs: dict):
+        parent = _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = dict(attrs)
+        self.start = time.time()
+        self.duration = None
+        self._perf_start = time.perf_counter()
+
+    def set(self, key: str, value):
+        self.attrs[key] = value
+
+    def finish(self):
+        """Record the span: latency histogram and trace line."""
+        self.duration = time.perf_counter() - self._perf_start
+        metrics.observe("span", self.duration, stage=self.name)
+        _emit(self.to_record())
+
+    def to_record(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            **self.attrs,
+        }
+
+
+class Metrics:
+    """Thread-safe counters and latency histograms, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self.histograms.setdefault(key, [0] * len(BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+
+    @staticmethod
+    def _labels(labels: tuple, extra: str = "") -> str:
+        parts = [f'{k}="{v}"' for k, v in labels] + ([extra] if extra else [])
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"chatbot_{name}_total{self._labels(labels)} {value}")
+            for (name, labels), hist in sorted(self.histograms.items()):
+                for bound, count in zip(BUCKETS, hist):
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                    lines.append(f"chatbot_{name}_seconds_bucket{self._labels(labels, le)} {count}")
+                lines.append(f"chatbot_{name}_seconds_sum{self._labels(labels)} {hist[-2]}")
+                lines.append(f"chatbot_{name}_seconds_count{self._labels(labels)} {hist[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+_trace_queue = queue.SimpleQueue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _write_traces():
+    Settings.TRACE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(Settings.TRACE_FILE, "a", encoding="utf-8") as f:
+        while True:
+            record = _trace_queue.get()
+            f.write(json.dumps(record, default=str) + "\n")
+            # Flush once the backlog is drained, not per line
+            if _trace_queue.empty():
+                f.flush()
+
+
+def _emit(record: dict):
+    global _writer
+    if not Settings.TRACE_ENABLED:
+        return
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_traces, name="trace-writer", daemon=True)
+                _writer.start()
+    _trace_queue.put(record)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a stage; the span is recorded even if the block raises."""
+    current = Span(name, attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set("error", type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+
+
+def start_span(name: str, **attrs) -> Span:
+    """
+    A span under the current one that is not made current itself; call .finish() when done.
+    For generators, which cannot keep span() open across yields.
+    """
+    return Span(name, attrs)
+
+
+def count(name: str, value: float = 1, **labels):
+    """Increment a counter, e.g. count("cache_hits", cache="answer")."""
+    metrics.inc(name, value, **labels)
+
+
+def submit_with_context(executor, fn, *args, **kwargs):
+    """executor.submit that keeps the caller's current span as the parent."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are not worth a log line each
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = Settings.METRICS_PORT):
+    """Serve /metrics on a daemon thread, once per process. Port 0 disables it."""
+    global _server
+    if not port:
+        return
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError:
+                return  # Another worker process on this host already serves it
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
@@ -0,0 +1,306 @@
+# src/utils/vector_store.py
+"""
+Shared on-disk vector storage.
+All chunk vectors live in one FAISS file, ordered so each domain occupies a
+contiguous ID range. Domain indexes are range views over that file, and the
+"all" index is the whole file, so no vector is stored or loaded twice.
+The FAISS file is memory-mapped and opened lazily on the first search;
+chunk text comes from a SQLite chunk store, fetched only for the hits.
+The index type (flat, IVF, HNSW, PQ) and its search settings are recorded
+in an index descriptor next to the vector file. A BM25 index with the same
+ids (bm25.json) serves lexical search and exact term-title lookups.
+"""
+import json
+import threading
+from pathlib import Path
+from typing import Any
+
+import faiss
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from src.utils.bm25 import BM25Index, build_for_docs
+from src.utils.chunk_store import ChunkStore, write_chunk_store
+from src.utils.logger import get_logger
+
+logger = get_logger()
+
+VECTORS_FILE = "vectors.faiss"
+CHUNKS_FILE = "chunks.sqlite"
+RANGES_FILE = "ranges.json"
+DESCRIPTOR_FILE = "index.json"
+
+INDEX_TYPES = ["flat", "ivf", "hnsw", "pq", "ivfpq"]
+
+# PQ trains 2**8 centroids per sub-quantizer, so it needs at least that many vectors
+PQ_MIN_TRAINING = 256
+
+
+def index_factory_string(index_type: str, ntotal: int, nlist: int = 0, hnsw_m: int = 32, pq_m: int = 16) -> str:
+    """
+    FAISS factory string for an index type. nlist=0 picks ~4*sqrt(N), bounded by training size.
+    Too few vectors to train PQ gives a flat index instead (exact, and small at that size).
+    """
+    if index_type in ("pq", "ivfpq") and ntotal < PQ_MIN_TRAINING:
+        logger.warning(f"{ntotal} vectors are too few to train '{index_type}' "
+                       f"(needs {PQ_MIN_TRAINING}); building a flat index instead")
+        return "Flat"
+    if not nlist:
+        nlist = int(max(1, min(4 * np.sqrt(ntotal), ntotal // 39)))
+    elif index_type in ("ivf", "ivfpq") and nlist > ntotal:
+        logger.warning(f"nlist={nlist} exceeds the {ntotal} training vectors; using nlist={ntotal}")
+        nlist = ntotal
+    factories = {
+        "flat": "Flat",
+        "ivf": f"IVF{nlist},Flat",
+        "hnsw": f"HNSW{hnsw_m}",
+        "pq": f"PQ{pq_m}",
+        "ivfpq": f"IVF{nlist},PQ{pq_m}",
+    }
+    if index_type not in factories:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+    return factories[index_type]
+
+
+def build_index(matrix: np.ndarray, factory: str):
+    """Build, train (if the type needs it) and fill a FAISS index."""
+    index = faiss.index_factory(matrix.shape[1], factory, faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(matrix)
+    index.add(matrix)
+    return index
+
+
+def search_parameters(id_range: tuple | None = None, nprobe: int | None = None, ef_search: int | None = None):
+    """Per-call search parameters: an optional ID range plus IVF nprobe or HNSW efSearch."""
+    sel = faiss.IDSelectorRange(*id_range) if id_range is not None else None
+    kwargs = {"sel": sel} if sel is not None else {}
+    if nprobe:
+        return faiss.SearchParametersIVF(nprobe=nprobe, **kwargs)
+    if ef_search:
+        return faiss.SearchParametersHNSW(efSearch=ef_search, **kwargs)
+    return faiss.SearchParameters(**kwargs) if kwargs else None
+
+
+def supports_id_selector(index) -> bool:
+    """IndexPQ ignores search parameters, so it cannot be restricted to an ID range."""
+    return not isinstance(index, faiss.IndexPQ)
+
+
+def _search_post_filtered(index, queries: np.ndarray, k: int, id_range: tuple) -> tuple:
+    """Range-restricted search by over-fetching from the whole index and keeping ids inside the range."""
+    start, end = id_range
+    fetch = min(index.ntotal, 4 * k)
+    while True:
+        distances, ids = index.search(queries, fetch)
+        inside = (ids >= start) & (ids < end)
+        if fetch >= index.ntotal or inside.sum(axis=1).min() >= k:
+            break
+        fetch = min(index.ntotal, 4 * fetch)
+    out_distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+    out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+    for row in range(len(queries)):
+        kept = np.flatnonzero(inside[row])[:k]
+        out_distances[row, :len(kept)] = distances[row, kept]
+        out_ids[row, :len(kept)] = ids[row, kept]
+    return out_distances, out_ids
+
+
+def search_index(index, queries: np.ndarray, k: int, id_range: tuple | None = None,
+                 settings: dict | None = None) -> tuple:
+    """
+    index.search restricted to [start, end) with the given nprobe/efSearch settings.
+    Index types without ID selector support (PQ) fall back to over-fetch and post-filtering.
+    """
+    settings = settings or {}
+    if id_range is not None and tuple(id_range) == (0, index.ntotal):
+        id_range = None
+    if id_range is not None and not supports_id_selector(index):
+        return _search_post_filtered(index, queries, k, id_range)
+    # IVF indexes only accept IVF search parameters, so pass their own nprobe when none is set
+    nprobe = settings.get("nprobe") or (index.nprobe if isinstance(index, faiss.IndexIVF) and id_range else None)
+    params = search_parameters(id_range, nprobe, settings.get("ef_search"))
+    return index.search(queries, k, params=params)
+
+
+def apply_search_settings(index, settings: dict):
+    """Set nprobe/efSearch on an index itself, for callers that cannot pass search parameters."""
+    space = faiss.ParameterSpace()
+    if settings.get("nprobe"):
+        space.set_index_parameter(index, "nprobe", settings["nprobe"])
+    if settings.get("ef_search"):
+        space.set_index_parameter(index, "efSearch", settings["ef_search"])
+
+
+def write_descriptor(path: Path, descriptor: dict):
+    with open(Path(path) / DESCRIPTOR_FILE, "w", encoding="utf-8") as f:
+        json.dump(descriptor, f, indent=2)
+
+
+def read_descriptor(path: Path) -> dict:
+    """Index descriptor, or the flat default for stores written before descriptors existed."""
+    descriptor_path = Path(path) / DESCRIPTOR_FILE
+    if descriptor_path.exists():
+        with open(descriptor_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"type": "flat", "factory": "Flat", "search": {}}
+
+
+def write_shared_store(path: Path, domains: list, index_type: str = "flat", nlist: int = 0,
+                       hnsw_m: int = 32, pq_m: int = 16, search: dict | None = None):
+    """
+    Write a shared store from [(name, docs, vectors), ...].
+    Domains are laid out back to back; "all" spans every vector.
+    search holds default query-time settings ({"nprobe": 8} or {"ef_search": 64}).
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    all_docs = []
+    all_vectors = []
+    ranges = {}
+    for name, docs, vectors in domains:
+        start = len(all_docs)
+        all_docs.extend(docs)
+        all_vectors.append(np.asarray(vectors, dtype=np.float32))
+        ranges[name] = [start, len(all_docs)]
+    ranges["all"] = [0, len(all_docs)]
+
+    matrix = np.vstack(all_vectors)
+    factory = index_factory_string(index_type, len(matrix), nlist, hnsw_m, pq_m)
+    if factory == "Flat":  # including PQ types that fell back for lack of training data
+        index_type, search = "flat", {}
+    index = build_index(matrix, factory)
+    faiss.write_index(index, str(path / VECTORS_FILE))
+    write_descriptor(path, {
+        "type": index_type,
+        "factory": factory,
+        "dim": int(matrix.shape[1]),
+        "ntotal": int(index.ntotal),
+        "search": {"default": search or {}},
+    })
+
+    write_chunk_store(path / CHUNKS_FILE, all_docs)
+    build_for_docs([(name, docs) for name, docs, _ in domains]).save(path)
+    with open(path / RANGES_FILE, "w", encoding="utf-8") as f:
+        json.dump(ranges, f, indent=2)
+
+
+def read_index_mmap(file_path: Path):
+    """Open a FAISS index memory-mapped and read-only, falling back to a normal read."""
+    # Newer faiss builds can map flat codes directly; older ones only map inverted lists
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    try:
+        return faiss.read_index(str(file_path), flags)
+    except RuntimeError:
+        return faiss.read_index(str(file_path))
+
+
+class SharedVectorStore:
+    def __init__(self, path: Path, embeddings):
+        self.path = Path(path)
+        self.embeddings = embeddings
+        with open(self.path / RANGES_FILE, "r", encoding="utf-8") as f:
+            self.ranges = {name: tuple(r) for name, r in json.load(f).items()}
+        self.descriptor = read_descriptor(self.path)
+        self._index = None
+        self._chunks = None
+        self._lexical = None
+        self._lexical_loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return (Path(path) / RANGES_FILE).exists()
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = read_index_mmap(self.path / VECTORS_FILE)
+        return self._index
+
+    @property
+    def chunks(self):
+        if self._chunks is None:
+            with self._lock:
+                if self._chunks is None:
+                    self._chunks = ChunkStore(self.path / CHUNKS_FILE)
+        return self._chunks
+
+    @property
+    def lexical(self) -> BM25Index | None:
+        """BM25 index over the same ids; None for stores built before it existed."""
+        if not self._lexical_loaded:
+            with self._lock:
+                if not self._lexical_loaded:
+                    self._lexical = BM25Index.load(self.path)
+                    self._lexical_loaded = True
+        return self._lexical
+
+    def search_settings(self, name: str) -> dict:
+        """Query-time settings for a domain: its own entry in the descriptor, else the default."""
+        search = self.descriptor.get("search", {})
+        return {**search.get("default", {}), **search.get(name, {})}
+
+    def search_by_vector(self, vector, k: int, id_range: tuple | None = None, settings: dict | None = None) -> list:
+        """Return [(Document, distance)] for the k nearest vectors inside id_range."""
+        return self.search_by_vectors([vector], k, id_range, settings)[0]
+
+    def search_by_vectors(self, vectors, k: int, id_range: tuple | None = None, settings: dict | None = None) -> list:
+        """Batched search_by_vector: one FAISS call and one chunk read for a matrix of queries."""
+        distances, ids = search_index(self.index, np.asarray(vectors, dtype=np.float32), k, id_range, settings)
+        hits = [[(int(i), float(d)) for i, d in zip(row_ids, row_distances) if i != -1]
+                for row_ids, row_distances in zip(ids, distances)]
+        unique = list(dict.fromkeys(i for row in hits for i, _ in row))
+        docs = dict(zip(unique, self.chunks.get(unique)))
+        return [[(docs[i], d) for i, d in row if i in docs] for row in hits]
+
+    def lexical_search(self, query: str, k: int, id_range: tuple | None = None) -> list:
+        """Return [(Document, BM25 score)] for the k best lexical matches inside id_range."""
+        if self.lexical is None:
+            return []
+        hits = self.lexical.search(query, k, id_range)
+        docs = self.chunks.get([i for i, _ in hits])
+        return list(zip(docs, [score for _, score in hits]))
+
+    def title_match(self, query: str, k: int, id_range: tuple | None = None) -> list:
+        """Chunks of the term titled exactly like the query (up to k), or []."""
+        if self.lexical is None:
+            return []
+        return self.chunks.get(self.lexical.title_match(query, id_range)[:k])
+
+    def as_retriever(self, name: str, k: int = 5) -> "IndexRangeRetriever":
+        return IndexRangeRetriever(
+            store=self, name=name, id_range=self.ranges[name], k=k,
+            search_settings=self.search_settings(name)
+        )
+
+
+class IndexRangeRetriever(BaseRetriever):
+    """Retriever over one domain's ID range of a SharedVectorStore."""
+    store: Any
+    name: str
+    id_range: tuple
+    k: int = 5
+    search_settings: dict = {}
+
+    def similarity_search_with_score_by_vector(self, vector, k: int | None = None) -> list:
+        return self.store.search_by_vector(vector, k or self.k, self.id_range, self.search_settings)
+
+    def similarity_search_with_score_by_vectors(self, vectors, k: int | None = None) -> list:
+        return self.store.search_by_vectors(vectors, k or self.k, self.id_range, self.search_settings)
+
+    def similarity_search_by_vector(self, vector, k: int | None = None) -> list:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(vector, k)]
+
+    def lexical_search_with_score(self, query: str, k: int | None = None) -> list:
+        return self.store.lexical_search(query, k or self.k, self.id_range)
+
+    def title_match(self, query: str) -> list:
+        return self.store.title_match(query, self.k, self.id_range)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        return self.similarity_search_by_vector(self.store.embeddings.embed_query(query))
@@ -2,6 +2,7 @@
 import matplotlib.pyplot as plt
 import io
 import streamlit as st
+from src.utils.tracing import span
 
 def generate_chart(data: dict, title: str):
     """Generate simple line chart, e.g., for stock prices."""
@@ -17,5 +18,6 @@ def generate_chart(data: dict, title: str):
 
 def display_chart_in_response(query: str, data: dict):
     if "chart" in query.lower() or "trend" in query.lower():
-        chart_buf = generate_chart(data, "Financial Trend")
-        st.image(chart_buf, caption="Generated Visualization")
\ No newline at end of file
+        with span("visualization"):
+            chart_buf = generate_chart(data, "Financial Trend")
+            st.image(chart_buf, caption="Generated Visualization")
\ No newline at end of file
@@ -1,50 +1,166 @@
 # src/utils/web_search.py
+"""
+Web search fallback: Serper search, Firecrawl scraping, LLM answer.
+HTTP calls go through one pooled keep-alive session. The top results are
+scraped concurrently under a shared deadline: pages that miss it fall back
+to their search snippet, so the answer is built from partial results rather
+than waiting for the slowest page. Scraped markdown is cached per URL.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
 import requests
-from firecrawl import FirecrawlApp
+from requests.adapters import HTTPAdapter
 from src.models.llm import get_llm
 from src.config.settings import Settings
-from datetime import datetime
+from src.utils.cache import TTLCache
+from src.utils.tracing import count, span, submit_with_context
+
+# Shared by every WebFallback instance (one is built per Streamlit rerun)
+_session = None
+_session_lock = threading.Lock()
+_scrape_cache = TTLCache(maxsize=Settings.SCRAPE_CACHE_SIZE, ttl=Settings.SCRAPE_CACHE_TTL)
+_scrape_executor = ThreadPoolExecutor(max_workers=Settings.SCRAPE_WORKERS, thread_name_prefix="scrape")
+
+
+def _scraped(future) -> bool:
+    """Whether a scrape produced content; failures and empty pages are not cached, so the next query retries them."""
+    return future.exception() is None and bool(future.result().strip())
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide session with a keep-alive connection pool."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=Settings.HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
 
 class WebFallback:
     def __init__(self):
         self.serper_key = Settings.SERPER_API_KEY
-        self.firecrawl = FirecrawlApp(api_key=Settings.FIRECRAWL_API_KEY) if Settings.FIRECRAWL_API_KEY else None
+        self.firecrawl_key = Settings.FIRECRAWL_API_KEY
+        self.session = get_http_session()
         self.llm = get_llm()
 
-    def search_and_scrape(self, query: str) -> str:
-        if not self.serper_key:
-            return "Web search unavailable. Using static data only."
-
+    def search(self, query: str) -> list | None:
+        """Organic Serper results, or None if the search failed."""
         # Serper search with financial focus
         payload = {"q": query + " site:finance.yahoo.com OR site:coingecko.com OR site:fred.stlouisfed.org", "num": 5}
         headers = {"X-API-KEY": self.serper_key, "Content-Type": "application/json"}
-        response = requests.post("https://google.serper.dev/search", json=payload, headers=headers)
-        if response.status_code != 200:
-            return "Search error."
+        with span("web_search") as s:
+            try:
+                response = self.session.post(Settings.SERPER_API_URL, json=payload, headers=headers,
+                                             timeout=Settings.SEARCH_TIMEOUT)
+            except requests.RequestException as e:
+                s.set("error", type(e).__name__)
+                return None
+            s.set("status", response.status_code)
+            if response.status_code != 200:
+                return None
+            results = response.json().get("organic", [])
+            s.set("results", len(results))
+            return results
 
-        results = response.json().get("organic", [])
+    def scrape(self, url: str) -> str:
+        """Main-content markdown of a page via the Firecrawl scrape API."""
+        with span("scrape", url=url) as s:
+            response = self.session.post(
+                Settings.FIRECRAWL_API_URL,
+                json={"url": url, "formats": ["markdown"], "onlyMainContent": True},
+                headers={"Authorization": f"Bearer {self.firecrawl_key}"},
+                timeout=Settings.SCRAPE_TIMEOUT
+            )
+            s.set("status", response.status_code)
+            response.raise_for_status()
+            return response.json().get("data", {}).get("markdown", "")
+
+    def scrape_many(self, urls: list) -> dict:
+        """
+        Scrape urls concurrently. Returns {url: markdown} for pages that were
+        cached or finished before SCRAPE_DEADLINE; the rest are left out.
+        """
+        pages = {}
+        futures = {}
+        for url in urls:
+            cached = _scrape_cache.get(url)
+            count("cache_hits" if cached is not None else "cache_misses", cache="scrape")
+            if cached is not None:
+                pages[url] = cached
+            elif self.firecrawl_key:
+                future = submit_with_context(_scrape_executor, self.scrape, url)
+                # Cache on completion, so a page that misses this deadline still helps the next query
+                future.add_done_callback(lambda f, url=url: _scraped(f) and _scrape_cache.set(url, f.result()))
+                futures[future] = url
+
+        if futures:
+            done, not_done = wait(futures, timeout=Settings.SCRAPE_DEADLINE)
+            count("scrape_deadline_misses", len(not_done))
+            for future in done:
+                if _scraped(future):
+                    pages[futures[future]] = future.result()
+                # Failed or empty pages fall back to their snippet
+        return pages
+
+    def search_and_scrape(self, query: str) -> str:
+        return "".join(self.stream_search_and_scrape(query))
+
+    def gather(self, query: str, cancel=None) -> dict:
+        """
+        Search and scrape without generating: {"error": message} or {"top": results, "context": text}.
+        Can run ahead of time (e.g. alongside RAG generation) and be passed to stream_search_and_scrape.
+        If the cancel event is set once the search returns, the scrape is skipped.
+        """
+        if not self.serper_key:
+            return {"error": "Web search unavailable. Using static data only."}
+
+        results = self.search(query)
+        if results is None:
+            return {"error": "Search error."}
+
+        if cancel is not None and cancel.is_set():
+            return {"error": "Search cancelled."}
+
+        top = results[:3]
+        pages = self.scrape_many([item["link"] for item in top])
 
         context = ""
-        for item in results[:3]:
+        for item in top:
             url = item["link"]
-            if self.firecrawl:
-                try:
-                    scraped = self.firecrawl.scrape_url(url, params={"onlyMainContent": True, "formats": ["markdown"]})
-                    context += f"\n\nFrom {item['title']} ({url}):\n{scraped.get('markdown', '')[:3000]}"
-                except Exception as e:
-                    context += f"\n\nSnippet from {item['title']}: {item.get('snippet', '')}"
+            if url in pages:
+                context += f"\n\nFrom {item['title']} ({url}):\n{pages[url][:3000]}"
+            else:
+                context += f"\n\nSnippet from {item['title']}: {item.get('snippet', '')}"
+        return {"top": top, "context": context}
+
+    def stream_search_and_scrape(self, query: str, gathered: dict | None = None):
+        """
+        Same as search_and_scrape, but yields the answer token by token, then the sources.
+        gathered is a prefetched gather(query) result; without it the search runs now.
+        """
+        gathered = gathered or self.gather(query)
+        if "error" in gathered:
+            yield gathered["error"]
+            return
+        top, context = gathered["top"], gathered["context"]
 
         # Generate response with LLM
         prompt = f"Use this current web context to answer factually. Include disclaimer: 'Data as of {datetime.now().strftime('%Y-%m-%d')}'. Context: {context}\n\nQuestion: {query}\nAnswer:"
-        answer = self.llm.invoke(prompt).content
+        for chunk in self.llm.stream(prompt):
+            if chunk.content:
+                yield chunk.content
 
         # Add sources for transparency with better formatting
-        if results:
+        if top:
             sources_text = "\n\n---\n📌 **Sources:**\n"
-            for i, r in enumerate(results[:3], 1):
+            for i, r in enumerate(top, 1):
                 title = r.get("title", "Source")
                 link = r.get("link", "")
                 sources_text += f"{i}. [{title}]({link})\n"
-            answer += sources_text
-
-        return answer
\ No newline at end of file
+            yield sources_text
@@ -0,0 +1,11 @@
+# tests/conftest.py
+import os
+import sys
+
+# Make `src` importable; keep test runs offline and out of logs/trace.jsonl
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("TRACE_ENABLED", "false")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY", "0")
+os.environ.setdefault("FAKE_LLM_TOKENS_PER_SECOND", "100000")
+os.environ.setdefault("HISTORY_BACKEND", "memory")
@@ -0,0 +1,45 @@
+# tests/test_api.py
+import asyncio
+import socket
+from src.api.client import stream_query
+from src.api.service import QueryService
+
+
+class BrokenPipeline:
+    """Streams one token, then fails the way an unexpected worker error would."""
+
+    def stream(self, query, mode, hardcoded_intent=None, session_id="default"):
+        yield {"event": "token", "source": "rag", "data": "Partial "}
+        raise RuntimeError("index went away")
+
+
+def collect(service):
+    async def run():
+        events = [event async for event in service.stream("What is float?", "all_db")]
+        await asyncio.sleep(0.05)  # the slot is released by a callback once the worker stops
+        return events
+    return asyncio.run(run())
+
+
+def test_worker_failure_ends_the_stream_with_an_error_event():
+    service = QueryService(pipeline=BrokenPipeline(), workers=1, queue_size=0)
+    try:
+        events = collect(service)
+    finally:
+        service.shutdown()
+
+    assert [event["event"] for event in events] == ["token", "error"]
+    assert events[-1]["message"]
+    assert service.in_flight == 0
+
+
+def test_unreachable_api_yields_an_error_event():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]  # nothing listens here once the socket closes
+
+    events = list(stream_query("What is float?", "all_db", api_url=f"http://127.0.0.1:{port}"))
+
+    assert len(events) == 1
+    assert events[0]["event"] == "error"
+    assert "unavailable" in events[0]["message"]
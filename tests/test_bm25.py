@@ -0,0 +1,68 @@
+# tests/test_bm25.py
+import pytest
+from langchain_core.documents import Document
+from src.utils.bm25 import BM25Index, build_for_docs, document_titles, source_title, title_query
+
+INVESTOPEDIA_SOURCE = "dataset/terms/www.investopedia.com_terms_double-exempt.asp.json"
+# Shaped like the scraped pages: zero-width space, hero image and credits before the title heading
+INVESTOPEDIA_PAGE = (
+    "​\n\n![Double Exempt](https://www.investopedia.com/thmb/x=/1500x0/double-exempt.jpg)\n\n"
+    "Investopedia / Jake Shi\n\nClose\n\n## What is Double Exempt?\n\n"
+    "Double exempt refers to the tax status of a security, such as a municipal bond."
+)
+
+
+def terms_docs():
+    return [
+        Document(page_content=INVESTOPEDIA_PAGE, metadata={"source": INVESTOPEDIA_SOURCE}),
+        Document(page_content="### Key Takeaways\n\n- Coupon payments escape federal and state tax.",
+                 metadata={"source": INVESTOPEDIA_SOURCE}),
+        Document(page_content="## Understanding the Problem Loan Ratio\n\nThe ratio compares problem loans.",
+                 metadata={"source": "dataset/terms/www.investopedia.com_terms_problem-loan-ratio.asp.json"}),
+        Document(page_content="**401K**\n\nEmployer-sponsored retirement savings plan.",
+                 metadata={"source": "dataset/terms/401k.json"}),
+    ]
+
+
+def test_source_title_from_scraped_file_name():
+    assert source_title(INVESTOPEDIA_SOURCE) == "double exempt"
+    assert source_title("dataset/terms/www.investopedia.com_terms_float_time.asp.json") == "float time"
+    assert source_title("dataset/terms/absolute_advantage.json") == "absolute advantage"
+
+
+def test_one_title_per_source_file():
+    titles = document_titles(terms_docs())
+    assert titles[0] == titles[1] == ("double exempt",)
+    assert titles[2] == ("problem loan ratio",)  # a section heading is not an alias
+    assert titles[3] == ("401k",)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("What is a problem loan ratio?", [2]),
+    ("double exempt", [0, 1]),
+    ("What does double exempt mean?", [0, 1]),
+    ("What is a 401k?", [3]),
+    ("key takeaways", []),
+    ("special considerations", []),
+])
+def test_title_match_on_real_shaped_pages(query, expected):
+    index = build_for_docs([("terms", terms_docs())])
+    assert index.title_match(query) == expected
+
+
+def test_title_match_respects_id_range():
+    index = build_for_docs([("other", terms_docs()), ("terms", terms_docs())])
+    assert index.title_match("double exempt") == [4, 5]
+    assert index.title_match("double exempt", id_range=(0, 4)) == []
+
+
+def test_title_query_strips_definition_wrappers():
+    assert title_query("define collateral value") == "collateral value"
+    assert title_query("What does double exempt mean?") == "double exempt"
+
+
+def test_search_ranks_matching_document_first(tmp_path):
+    index = BM25Index.build(["bonds pay coupons", "stocks pay dividends", "coupon bonds and municipal bonds"])
+    assert index.search("municipal bonds", k=2)[0][0] == 2
+    index.save(tmp_path)
+    assert BM25Index.load(tmp_path).search("municipal bonds", k=2) == index.search("municipal bonds", k=2)
@@ -0,0 +1,17 @@
+# tests/test_classifiers.py
+from src.utils import classifiers
+
+
+def test_nli_sees_the_original_text_and_is_memoized_per_normalized_query(monkeypatch):
+    seen = []
+
+    def nli_scores(query):
+        seen.append(query)
+        return [("investments", 0.7), ("terms", 0.2)]
+
+    monkeypatch.setattr(classifiers, "nli_scores", nli_scores)
+    monkeypatch.setattr(classifiers, "_scores_cache", classifiers.TTLCache(maxsize=8, ttl=float("inf")))
+
+    assert classifiers.classify_intent("What is the S&P 500 ETF?", backend="nli") == ["investments"]
+    assert classifiers.classify_intent("what is   the s&p 500 etf?", backend="nli") == ["investments"]
+    assert seen == ["What is the S&P 500 ETF?"]
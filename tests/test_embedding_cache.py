@@ -0,0 +1,34 @@
+# tests/test_embedding_cache.py
+import numpy as np
+from src.utils.embedding_cache import EmbeddingCache
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.embedded = []
+
+    def embed_array(self, texts):
+        self.embedded.extend(texts)
+        return np.asarray([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_prune_drops_chunks_not_seen_in_the_current_run(tmp_path):
+    path = tmp_path / "embeddings.sqlite"
+    cache = EmbeddingCache(path, "model")
+    cache.embed(["kept chunk", "deleted chunk"], CountingEmbeddings())
+    cache.close()
+
+    # Re-ingest after "deleted chunk" was removed from the corpus
+    cache = EmbeddingCache(path, "model")
+    embeddings = CountingEmbeddings()
+    cache.embed(["kept chunk", "new chunk"], embeddings)
+    assert embeddings.embedded == ["new chunk"]
+    assert cache.prune() == 1
+    cache.close()
+
+    cache = EmbeddingCache(path, "model")
+    assert cache.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 2
+    embeddings = CountingEmbeddings()
+    cache.embed(["kept chunk", "new chunk", "deleted chunk"], embeddings)
+    assert embeddings.embedded == ["deleted chunk"]
+    cache.close()
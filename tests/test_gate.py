@@ -0,0 +1,47 @@
+# tests/test_gate.py
+import pytest
+from langchain_core.documents import Document
+from src.config.settings import Settings
+from src.core import gate as gate_module
+from src.core.gate import decide, gate, sigmoid
+
+
+def doc(text: str, **metadata) -> Document:
+    return Document(page_content=text, metadata=metadata)
+
+
+@pytest.fixture
+def reranked(monkeypatch):
+    """Cross-encoder stand-in returning fixed logits, best first."""
+    def rerank(query, docs):
+        return [Document(page_content=d.page_content, metadata={**d.metadata, "rerank_score": logit})
+                for d, logit in zip(docs, [-1.0, -6.0, -9.0])]
+    monkeypatch.setattr(Settings, "GATE_ENABLED", True)
+    monkeypatch.setattr(Settings, "RERANK_ENABLED", True)
+    monkeypatch.setattr(gate_module, "rerank", rerank)
+
+
+def test_sigmoid_is_stable_at_the_extremes():
+    assert sigmoid(0.0) == 0.5
+    assert sigmoid(1000.0) == 1.0
+    assert sigmoid(-1000.0) == 0.0
+
+
+def test_rerank_logits_become_probabilities(reranked):
+    decision, docs, confidence = gate("What is float?", [doc("a"), doc("b"), doc("c")])
+    assert confidence == pytest.approx(sigmoid(-1.0))
+    assert decision == decide(confidence)
+    assert docs[0].metadata["rerank_score"] == -1.0
+
+
+def test_title_match_is_full_confidence(reranked):
+    assert gate("float", [doc("a", title_match=True)])[0] == "rag"
+
+
+def test_without_reranker_the_gate_is_skipped(monkeypatch):
+    monkeypatch.setattr(Settings, "GATE_ENABLED", True)
+    monkeypatch.setattr(Settings, "RERANK_ENABLED", False)
+    # DP-noised squared distances are ~1500 for relevant and irrelevant chunks alike
+    decision, _, confidence = gate("What is float?", [doc("a", vector_distance=1480.0)])
+    assert (decision, confidence) == ("rag", None)
+    assert gate("What is float?", [])[0] == "web"
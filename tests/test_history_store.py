@@ -0,0 +1,43 @@
+# tests/test_history_store.py
+import pytest
+from src.utils.history_store import HistoryStore, InMemoryHistoryStore, SQLiteHistoryStore
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteHistoryStore(tmp_path / "history.db")
+    return InMemoryHistoryStore()
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    class AppendOnly(HistoryStore):
+        def append(self, session_id, role, content):
+            return 1
+
+    with pytest.raises(TypeError, match="abstract"):
+        AppendOnly()
+
+
+def test_tail_range_and_count(store):
+    seqs = [store.append("s", "human" if i % 2 == 0 else "ai", f"message {i}") for i in range(6)]
+    store.append("other", "human", "elsewhere")
+
+    assert seqs == sorted(seqs)
+    assert [m.content for m in store.tail("s", 2)] == ["message 4", "message 5"]
+    assert [m.content for m in store.range("s", seqs[0], seqs[4], 2)] == ["message 1", "message 2"]
+    assert store.count("s") == 6
+    assert store.count("s", after=seqs[3]) == 2
+    assert store.tail("s", 1)[0].role == "ai"
+
+
+def test_set_summary_is_compare_and_set(store):
+    assert store.get_summary("s") == ("", 0)
+    assert store.set_summary("s", "first", 3, expected_upto=0)
+    assert not store.set_summary("s", "stale", 5, expected_upto=0)
+    assert tuple(store.get_summary("s")) == ("first", 3)
+
+    store.append("s", "human", "hi")
+    store.clear("s")
+    assert store.count("s") == 0
+    assert store.get_summary("s") == ("", 0)
@@ -0,0 +1,28 @@
+# tests/test_llm.py
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from src.models.llm import get_llm
+from src.utils.tracing import metrics, span
+
+
+def llm_spans() -> int:
+    return metrics.histograms.get(metrics._key("span", {"stage": "llm"}), [0])[-1]
+
+
+def test_lcel_chain_streams_through_the_registry_model():
+    chain = ChatPromptTemplate.from_messages([("human", "{question}")]) | get_llm() | StrOutputParser()
+    before = llm_spans()
+
+    with span("unit_query"):  # the llm span must not disturb the caller's current span
+        text = "".join(chain.stream({"question": "What is float?"}))
+
+    assert "What is float?" in text
+    assert llm_spans() == before + 1
+
+
+def test_stream_closed_early_still_records_the_span():
+    before = llm_spans()
+    stream = get_llm().stream("What is float?")
+    next(stream)
+    stream.close()
+    assert llm_spans() == before + 1
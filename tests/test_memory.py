@@ -0,0 +1,85 @@
+# tests/test_memory.py
+import time
+from types import SimpleNamespace
+import pytest
+from langchain_core.messages import SystemMessage
+from src.core import memory as memory_module
+from src.core.memory import SummarizingChatHistory
+from src.utils.history_store import InMemoryHistoryStore
+
+
+class Summarizer:
+    """Chat-model stand-in: returns a fixed summary, or raises while `failing` is set."""
+
+    def __init__(self, failing: bool = False):
+        self.failing = failing
+        self.calls = 0
+        self.summarized = []  # prompts that produced a summary
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if self.failing:
+            raise RuntimeError("model unavailable")
+        self.summarized.append(prompt)
+        return SimpleNamespace(content=f"summary {self.calls}")
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def chat(history, turns: int):
+    for i in range(turns):
+        history.add_user_message(f"question {i} " + "word " * 40)
+        history.add_ai_message(f"answer {i} " + "word " * 40)
+
+
+def make_history(summarizer) -> SummarizingChatHistory:
+    return SummarizingChatHistory("session", InMemoryHistoryStore(), token_budget=100, summarizer=summarizer)
+
+
+def idle(history) -> bool:
+    return (id(history.store), history.session_id) not in memory_module._folding
+
+
+def test_old_turns_are_folded_into_the_summary():
+    history = make_history(Summarizer())
+    chat(history, 4)
+    wait_until(lambda: history.store.get_summary("session")[1] > 0 and idle(history))
+
+    messages = history.messages
+    assert isinstance(messages[0], SystemMessage) and "summary" in messages[0].content
+    assert messages[-1].content.startswith("answer 3")
+    assert len(history.transcript()) == 8  # the UI still sees every turn verbatim
+
+
+def test_failed_summary_keeps_turns_pending_and_retries(monkeypatch):
+    monkeypatch.setattr(memory_module, "FOLD_RETRY_DELAY", 0.2)
+    summarizer = Summarizer(failing=True)
+    history = make_history(summarizer)
+    chat(history, 4)
+    wait_until(lambda: summarizer.calls > 0 and idle(history))
+    assert history.store.get_summary("session") == ("", 0)
+
+    # Within the backoff window new turns do not trigger another attempt
+    calls = summarizer.calls
+    chat(history, 1)
+    time.sleep(0.05)
+    assert summarizer.calls == calls
+
+    summarizer.failing = False
+    time.sleep(0.2)
+    chat(history, 1)
+    wait_until(lambda: history.store.get_summary("session")[0] != "" and idle(history))
+    # The turns whose summary failed were folded later, not skipped
+    assert "question 0" in summarizer.summarized[0]
+
+
+@pytest.fixture(autouse=True)
+def reset_backoff():
+    memory_module._fold_backoff.clear()
+    yield
+    memory_module._fold_backoff.clear()
@@ -0,0 +1,63 @@
+# tests/test_pipeline.py
+import uuid
+import numpy as np
+import pytest
+from src.config.settings import Settings
+from src.core.pipeline import QueryPipeline, cacheable
+
+
+def test_real_answers_are_cacheable():
+    assert cacheable("Collateral value is the fair market value of an asset pledged to secure a loan.")
+
+
+@pytest.mark.parametrize("answer", [
+    "",
+    "The provided context does not contain information about float time.",
+    "I don't have information about that in the documents.",
+    "Web search unavailable. Using static data only.",
+    "Search error.",
+    "Search cancelled.",
+    "Web search timed out. Please try again.",
+])
+def test_fallback_answers_are_not_cached(answer):
+    assert not cacheable(answer)
+
+
+class StubWeb:
+    """Web fallback that answers every query the same way, counting calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def stream_search_and_scrape(self, query, gathered=None):
+        self.calls += 1
+        yield "Float is the time between writing a check and the funds leaving the account."
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    from src.core import pipeline as pipeline_module
+    from src.core.answer_cache import SemanticAnswerCache
+
+    vector = np.ones(8, dtype=np.float32)
+    monkeypatch.setattr(pipeline_module, "get_embeddings",
+                        lambda: type("E", (), {"embed_query_raw": lambda self, q: vector})())
+    monkeypatch.setattr(Settings, "ANSWER_CACHE_ENABLED", True)
+    # No local indexes: every query is gated to the web stub
+    p = QueryPipeline(retrievers={}, web_fallback=StubWeb())
+    p.answer_cache = SemanticAnswerCache()
+    return p
+
+
+def test_answer_cache_is_shared_by_opening_questions_only(pipeline):
+    question = "What is float time in banking?"
+    first = pipeline.answer(question, "hardcoded", "terms", session_id=f"a-{uuid.uuid4().hex}")
+    other = pipeline.answer(question, "hardcoded", "terms", session_id=f"b-{uuid.uuid4().hex}")
+    assert not first["cached"] and other["cached"]
+
+    # A follow-up in a session with history never reads or writes the cache
+    session = f"c-{uuid.uuid4().hex}"
+    pipeline.answer("What is a float?", "hardcoded", "banking_loans_payments", session_id=session)
+    follow_up = pipeline.answer(question, "hardcoded", "terms", session_id=session)
+    assert not follow_up["cached"]
+    assert pipeline.web_fallback.calls == 3
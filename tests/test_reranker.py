@@ -0,0 +1,25 @@
+# tests/test_reranker.py
+from langchain_core.documents import Document
+from src.core.reranker import pack_context
+
+SHARED = "Collateral value is the fair market value of an asset pledged as security."
+
+
+def doc(text: str, source: str | None) -> Document:
+    return Document(page_content=text, metadata={"source": source} if source else {})
+
+
+def test_overlap_with_an_adjacent_chunk_of_the_same_page_is_trimmed():
+    first = doc("Lenders look at the loan-to-value ratio first. " + SHARED, "collateral.json")
+    second = doc(SHARED + " Banks revalue it periodically during the loan, and ask for more if it falls.", "collateral.json")
+    packed = pack_context([first, second], budget=1000, dedup_threshold=1.0)
+    assert packed[1].page_content == "Banks revalue it periodically during the loan, and ask for more if it falls."
+
+
+def test_text_repeated_by_another_source_is_kept():
+    first = doc("Lenders look at the loan-to-value ratio first. " + SHARED, "collateral.json")
+    second = doc(SHARED + " Insurers use it to price the policy, to set the deductible and to settle any claims made on it.", "insurance.json")
+    unsourced = doc(SHARED + " Appraisers document it in a written report for the lender, with comparable sales nearby.", None)
+    packed = pack_context([first, second, unsourced], budget=1000, dedup_threshold=1.0)
+    assert packed[1].page_content == second.page_content
+    assert packed[2].page_content == unsourced.page_content
@@ -0,0 +1,60 @@
+# tests/test_router.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from langchain_core.documents import Document
+from src.config.constants import LOCAL_DOMAINS
+from src.config.settings import Settings
+from src.core import router
+
+
+class SlowAPI:
+    """External retriever that hangs well past its timeout."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, query):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        return [Document(page_content=f"external {query}")]
+
+
+@pytest.fixture
+def routed(monkeypatch):
+    monkeypatch.setattr(Settings, "EXTERNAL_RETRIEVAL_TIMEOUT", 0.1)
+    monkeypatch.setattr(Settings, "LOCAL_RETRIEVAL_TIMEOUT", 1.0)
+    monkeypatch.setattr(router, "get_embeddings", lambda: type("E", (), {"embed_query": lambda self, q: [0.0]})())
+    monkeypatch.setattr(router, "title_match", lambda retriever, query: [])
+    monkeypatch.setattr(router, "hybrid_search",
+                        lambda retriever, query, vector: [Document(page_content=f"{retriever} {query}")])
+    apis = {"wiki": SlowAPI(1.0), "arxiv": SlowAPI(1.0)}
+    return {**apis, **{domain: domain for domain in LOCAL_DOMAINS}}
+
+
+def test_hanging_external_sources_do_not_starve_local_search(routed):
+    queries = [f"question {i}" for i in range(3 * Settings.RETRIEVAL_WORKERS)]
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        results = list(pool.map(lambda q: router.route_query(q, "all_db", None, routed), queries))
+
+    for query, docs in zip(queries, results):
+        local = [doc for doc in docs if not doc.page_content.startswith("external")]
+        assert len(local) == len(LOCAL_DOMAINS), query
+    for source in router.EXTERNAL_SOURCES:
+        assert routed[source].peak <= Settings.EXTERNAL_MAX_IN_FLIGHT
+
+
+def test_disabled_external_sources_are_never_called(routed, monkeypatch):
+    monkeypatch.setattr(Settings, "EXTERNAL_RETRIEVAL_ENABLED", False)
+    docs = router.route_query("What is float?", "all_db", None, routed)
+
+    assert len(docs) == len(LOCAL_DOMAINS)
+    assert routed["wiki"].peak == routed["arxiv"].peak == 0
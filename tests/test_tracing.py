@@ -0,0 +1,30 @@
+# tests/test_tracing.py
+import pytest
+from src.utils.tracing import count, metrics, span
+
+
+def test_span_enter_and_exit_records_latency():
+    with span("unit_stage", docs=3) as s:
+        s.set("tokens", 10)
+    assert s.duration is not None
+    assert 'chatbot_span_seconds_count{stage="unit_stage"} 1' in metrics.render()
+
+
+def test_span_records_errors_and_reraises():
+    with pytest.raises(ValueError):
+        with span("unit_failing") as s:
+            raise ValueError("boom")
+    assert s.attrs["error"] == "ValueError"
+    assert 'chatbot_span_seconds_count{stage="unit_failing"} 1' in metrics.render()
+
+
+def test_nested_spans_link_to_parent():
+    with span("unit_outer") as outer:
+        with span("unit_inner") as inner:
+            pass
+    assert inner.to_record()["parent_id"] == outer.to_record()["span_id"]
+
+
+def test_count_renders_counter():
+    count("unit_hits", cache="test")
+    assert 'chatbot_unit_hits_total{cache="test"}' in metrics.render()
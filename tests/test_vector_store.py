@@ -0,0 +1,70 @@
+# tests/test_vector_store.py
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from src.utils.vector_store import (
+    SharedVectorStore, build_index, index_factory_string, search_index, write_shared_store,
+)
+
+DIM = 16
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).random((600, DIM)).astype(np.float32)
+
+
+@pytest.mark.parametrize("factory", ["Flat", "PQ4x4", "IVF8,Flat", "IVF8,PQ4x4", "HNSW16"])
+def test_search_index_stays_inside_id_range(vectors, factory):
+    index = build_index(vectors, factory)
+    _, ids = search_index(index, vectors[:10], 5, (200, 300))
+    assert ((ids >= 200) & (ids < 300)).all()
+
+
+def test_pq_range_search_matches_unrestricted_order(vectors):
+    index = build_index(vectors, "PQ4x4")
+    # With the range covering every id, post-filtering must return the plain top-k
+    _, everything = search_index(index, vectors[:5], 5, None)
+    _, ranged = search_index(index, vectors[:5], 5, (0, len(vectors) - 1))
+    kept = [[i for i in row if i < len(vectors) - 1][:5] for row in everything]
+    assert [list(row[:len(k)]) for row, k in zip(ranged, kept)] == kept
+
+
+@pytest.mark.parametrize("index_type", ["flat", "pq"])
+def test_shared_store_domain_views(tmp_path, vectors, index_type):
+    domains = []
+    for d, name in enumerate(["terms", "investments"]):
+        rows = vectors[d * 300:(d + 1) * 300]
+        docs = [Document(page_content=f"{name} chunk {i}", metadata={"source": name}) for i in range(len(rows))]
+        domains.append((name, docs, rows))
+    write_shared_store(tmp_path, domains, index_type=index_type, pq_m=4)
+
+    store = SharedVectorStore(tmp_path, embeddings=None)
+    for name, _, rows in domains:
+        hits = store.as_retriever(name).similarity_search_with_score_by_vector(rows[0])
+        assert len(hits) == 5
+        assert all(doc.metadata["source"] == name for doc, _ in hits)
+
+
+@pytest.mark.parametrize("index_type", ["pq", "ivfpq"])
+@pytest.mark.parametrize("ntotal", [1, 4, 57])
+def test_pq_falls_back_to_flat_below_training_minimum(vectors, index_type, ntotal):
+    factory = index_factory_string(index_type, ntotal, pq_m=4)
+    assert factory == "Flat"
+    assert build_index(vectors[:ntotal], factory).ntotal == ntotal
+
+
+def test_ivf_nlist_is_capped_by_training_size(vectors):
+    factory = index_factory_string("ivf", 12, nlist=64)
+    assert factory == "IVF12,Flat"
+    assert build_index(vectors[:12], factory).ntotal == 12
+
+
+def test_small_pq_shared_store_is_written_as_flat(tmp_path, vectors):
+    docs = [Document(page_content=f"chunk {i}", metadata={"source": "terms"}) for i in range(12)]
+    write_shared_store(tmp_path, [("terms", docs, vectors[:12])], index_type="pq", search={"nprobe": 8})
+
+    store = SharedVectorStore(tmp_path, embeddings=None)
+    assert store.descriptor["type"] == "flat"
+    assert store.search_settings("terms") == {}
+    assert len(store.as_retriever("terms").similarity_search_with_score_by_vector(vectors[0])) == 5
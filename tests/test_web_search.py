@@ -0,0 +1,143 @@
+# tests/test_web_search.py
+"""WebFallback against a local stub of the Serper and Firecrawl APIs."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.config.settings import Settings
+from src.utils import web_search
+from src.utils.cache import TTLCache
+from src.utils.tracing import metrics
+from src.utils.web_search import WebFallback
+
+SLOW_SCRAPE = 1.0
+SCRAPE_DEADLINE = 0.3
+
+
+class StubAPI(BaseHTTPRequestHandler):
+    scraped = []  # urls the scrape endpoint was asked for
+    search_status = 200
+    broken = {}  # page name -> "empty" (no markdown) or "error" (HTTP 500)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path == "/search":
+            if self.search_status != 200:
+                self.send_error(self.search_status)
+                return
+            self._json({"organic": [
+                {"title": f"Page {name}", "link": f"https://example.com/{name}", "snippet": f"snippet {name}"}
+                for name in ("fast-1", "fast-2", "slow")
+            ]})
+        elif self.path == "/scrape":
+            StubAPI.scraped.append(body["url"])
+            if body["url"].endswith("slow"):
+                time.sleep(SLOW_SCRAPE)
+            failure = self.broken.get(body["url"].rsplit("/", 1)[-1])
+            if failure == "error":
+                self.send_error(500)
+                return
+            if failure == "empty":
+                self._json({"data": {"markdown": "  "}})
+                return
+            self._json({"data": {"markdown": f"# Markdown of {body['url']}"}})
+        else:
+            self.send_error(404)
+
+    def _json(self, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def web(stub_url, monkeypatch):
+    monkeypatch.setattr(Settings, "SERPER_API_URL", f"{stub_url}/search")
+    monkeypatch.setattr(Settings, "FIRECRAWL_API_URL", f"{stub_url}/scrape")
+    monkeypatch.setattr(Settings, "SERPER_API_KEY", "stub")
+    monkeypatch.setattr(Settings, "FIRECRAWL_API_KEY", "stub")
+    monkeypatch.setattr(Settings, "SCRAPE_DEADLINE", SCRAPE_DEADLINE)
+    monkeypatch.setattr(web_search, "_scrape_cache", TTLCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(StubAPI, "scraped", [])
+    return WebFallback()
+
+
+def counter(name: str, **labels) -> float:
+    return metrics.counters.get(metrics._key(name, labels), 0)
+
+
+def wait_for_slow_scrape():
+    deadline = time.monotonic() + SLOW_SCRAPE + 2
+    while web_search._scrape_cache.get("https://example.com/slow") is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def test_deadline_returns_partial_results(web):
+    misses = counter("scrape_deadline_misses")
+    start = time.monotonic()
+    gathered = web.gather("bond yields")
+    elapsed = time.monotonic() - start
+
+    assert elapsed < SLOW_SCRAPE
+    assert "# Markdown of https://example.com/fast-1" in gathered["context"]
+    assert "# Markdown of https://example.com/fast-2" in gathered["context"]
+    # The page that missed the deadline falls back to its search snippet
+    assert "Snippet from Page slow: snippet slow" in gathered["context"]
+    assert counter("scrape_deadline_misses") == misses + 1
+    wait_for_slow_scrape()
+
+
+def test_repeat_query_is_served_from_the_scrape_cache(web):
+    web.gather("bond yields")
+    wait_for_slow_scrape()  # a page that missed the deadline is cached when it completes
+    scraped = len(StubAPI.scraped)
+    hits = counter("cache_hits", cache="scrape")
+
+    gathered = web.gather("bond yields")
+
+    assert len(StubAPI.scraped) == scraped
+    assert counter("cache_hits", cache="scrape") == hits + 3
+    assert "# Markdown of https://example.com/slow" in gathered["context"]
+
+
+def test_failed_and_empty_scrapes_are_not_cached(web, monkeypatch):
+    monkeypatch.setattr(StubAPI, "broken", {"fast-1": "error", "fast-2": "empty"})
+    gathered = web.gather("bond yields")
+    assert "Snippet from Page fast-1: snippet fast-1" in gathered["context"]
+    assert "Snippet from Page fast-2: snippet fast-2" in gathered["context"]
+    assert web_search._scrape_cache.get("https://example.com/fast-1") is None
+    assert web_search._scrape_cache.get("https://example.com/fast-2") is None
+
+    # Once the pages recover, the next query scrapes them again
+    monkeypatch.setattr(StubAPI, "broken", {})
+    gathered = web.gather("bond yields")
+    assert "# Markdown of https://example.com/fast-1" in gathered["context"]
+    assert "# Markdown of https://example.com/fast-2" in gathered["context"]
+    wait_for_slow_scrape()
+
+
+def test_search_error(web, monkeypatch):
+    monkeypatch.setattr(StubAPI, "search_status", 500)
+    assert web.gather("bond yields") == {"error": "Search error."}
+
+
+def test_stream_answer_ends_with_sources(web):
+    text = "".join(web.stream_search_and_scrape("bond yields"))
+    assert "Sources:" in text
+    assert "(https://example.com/fast-1)" in text
+    wait_for_slow_scrape()